@@ -62,6 +62,7 @@ class AllCodeWindow(wx.Frame):
         self.textBox.SetEditable(True)
         self.textBox.SetupWithText(self.text)
         self.MarkAllSyntaxErrors()
+        self.MarkHotLines()
         self.textBox.SetEditable(False)
 
     def AppendOnSetupCode(self, obj):
@@ -133,6 +134,17 @@ class AllCodeWindow(wx.Frame):
                     lineStartPos = self.textBox.GetLineEndPosition(lineNum) - self.textBox.GetLineLength(lineNum)
                     self.textBox.MarkSyntaxError(lineStartPos + linePos, 2)
 
+    def MarkHotLines(self):
+        # Highlight the lines where the last run's handlers spent the most time, if it was sampled
+        self.textBox.ClearHotLineMarks()
+        for path, lineNum, fraction in self.designer.lastRunHotLines:
+            for info in self.methodStartLines:
+                infoPath = info[2].GetPath() + "." + info[3]
+                if infoPath == path:
+                    line = lineNum + info[0]
+                    lineStartPos = self.textBox.GetLineEndPosition(line) - self.textBox.GetLineLength(line)
+                    self.textBox.MarkHotLine(lineStartPos, self.textBox.GetLineLength(line))
+
     def OnResize(self, event):
         self.textBox.SetSize(self.GetClientSize())
 
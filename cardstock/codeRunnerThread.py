@@ -16,6 +16,7 @@ import inspect
 import queue
 from wx import CallAfter
 import ctypes
+from traceRecorder import TraceRecorder
 
 # -----------------------------------------
 # Handle Stopping the runner thread, by injecting an exception, and then catching it in
@@ -90,6 +91,9 @@ def to_main_sync(func, *args, **kwargs):
         thread = threading.current_thread()
         # no more to_main calls once we're terminated
         if not thread.is_terminated:
+            tracer = TraceRecorder.current
+            if tracer:
+                return to_main_sync_traced(tracer, thread, func, *args, **kwargs)
             CallAfter(to_main_sync_helper, thread, func, *args, **kwargs)
             ret = thread.returnQueue.get() # wait for return value
             return ret
@@ -109,6 +113,29 @@ def to_main_sync_helper(thread, func, *args, **kwargs):
         thread.returnQueue.put(None) # send empty return value to calling thread
 
 
+def to_main_sync_traced(tracer, thread, func, *args, **kwargs):
+    # On runnerThread, while tracing.  Records the whole round trip, including time spent waiting for the main thread.
+    name = getattr(func, "__qualname__", str(func))
+    flowId = tracer.NewFlowId()
+    postTime = tracer.Now()
+    tracer.FlowStart(name, "main_sync", flowId, postTime)
+    CallAfter(to_main_sync_traced_helper, tracer, flowId, postTime, thread, func, *args, **kwargs)
+    ret = thread.returnQueue.get() # wait for return value
+    tracer.Complete("sync " + name, "main_sync", postTime)
+    return ret
+
+
+def to_main_sync_traced_helper(tracer, flowId, postTime, thread, func, *args, **kwargs):
+    # On main thread
+    name = getattr(func, "__qualname__", str(func))
+    startTime = tracer.Now()
+    tracer.FlowEnd(name, "main_sync", flowId, startTime)
+    try:
+        to_main_sync_helper(thread, func, *args, **kwargs)
+    finally:
+        tracer.Complete(name, "main_sync", startTime, args={"wait_ms": (startTime - postTime) * 1000})
+
+
 def RunOnMainSync(func):
     """ Used as a decorator, to make Proxy object functions run on the main thread. """
     def wrapper_run_on_main(*args, **kwargs):
@@ -131,7 +158,15 @@ def to_main_async(func, *args, **kwargs):
         thread = threading.current_thread()
         # no more to_main calls once we're terminated
         if not thread.is_terminated:
-            CallAfter(to_main_async_helper, thread, func, *args, **kwargs)
+            tracer = TraceRecorder.current
+            if tracer:
+                name = getattr(func, "__qualname__", str(func))
+                flowId = tracer.NewFlowId()
+                postTime = tracer.Now()
+                tracer.FlowStart(name, "main_async", flowId, postTime)
+                CallAfter(to_main_async_traced_helper, tracer, flowId, postTime, thread, func, *args, **kwargs)
+            else:
+                CallAfter(to_main_async_helper, thread, func, *args, **kwargs)
         return None
 
 
@@ -141,6 +176,17 @@ def to_main_async_helper(thread, func, *args, **kwargs):
         func(*args, **kwargs)
 
 
+def to_main_async_traced_helper(tracer, flowId, postTime, thread, func, *args, **kwargs):
+    # On main thread
+    name = getattr(func, "__qualname__", str(func))
+    startTime = tracer.Now()
+    tracer.FlowEnd(name, "main_async", flowId, startTime)
+    try:
+        to_main_async_helper(thread, func, *args, **kwargs)
+    finally:
+        tracer.Complete(name, "main_async", startTime, args={"wait_ms": (startTime - postTime) * 1000})
+
+
 def RunOnMainAsync(func):
     """ Used as a decorator, to make Proxy object functions run on the main thread. """
     def wrapper_run_on_main_async(*args, **kwargs):
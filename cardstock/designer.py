@@ -189,6 +189,7 @@ class DesignerFrame(wx.Frame):
         self.consoleWindow = None
         self.wasConsoleOpen = False
         self.lastRunErrors = []
+        self.lastRunHotLines = []
         self.runnerFinishedCallback = None
 
         self.viewer = None
@@ -223,6 +224,7 @@ class DesignerFrame(wx.Frame):
             self.errorListWindow.Destroy()
             self.errorListWindow = None
         self.lastRunErrors = []
+        self.lastRunHotLines = []
 
     def SaveFile(self):
         if self.filename:
@@ -278,6 +280,7 @@ class DesignerFrame(wx.Frame):
                     self.errorListWindow.Destroy()
                     self.errorListWindow = None
                 self.lastRunErrors = []
+                self.lastRunHotLines = []
 
     def SetFrameSizeFromModel(self):
         size = self.stackManager.uiCard.model.GetProperty("size")
@@ -762,6 +765,7 @@ class DesignerFrame(wx.Frame):
 
     def OnRunnerFinished(self, runner):
         self.lastRunErrors = runner.errors
+        self.lastRunHotLines = runner.hotLines
         self.viewer = None
         ImageFactory.shared().ClearCache()
         self.Show()
@@ -775,6 +779,8 @@ class DesignerFrame(wx.Frame):
 
         if len(self.lastRunErrors):
             self.OnMenuShowErrorList(None)
+        if self.allCodeWindow:
+            self.allCodeWindow.MarkHotLines()
 
         if self.runnerFinishedCallback:
             self.runnerFinishedCallback()
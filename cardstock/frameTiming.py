@@ -0,0 +1,127 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from time import perf_counter
+
+
+class FrameTiming(object):
+    """
+    Records how long each phase of StackManager.OnPeriodicTimer() takes on each tick, and how long each OnPaint() takes,
+    into fixed-size ring buffers, so we can find out which phase is at fault when a stack drops frames.  Paints also
+    record how many pixels they repainted.  Also tracks each tick's jitter against the 60 Hz frame target, and how many
+    whole frames were skipped between ticks.  Optionally also writes a line per tick and paint to a log file.
+    """
+
+    PHASES = ("animations", "on_finished", "collisions", "bounces", "on_periodic", "refresh")
+    TARGET_INTERVAL = 1.0 / 60
+    BUFFER_SIZE = 600  # 10 seconds of ticks at 60 Hz
+
+    def __init__(self, logFilename=None):
+        # Each tick record is [startTime, interval, jitter, skipped, total, phase durations...]
+        self.ticks = [None] * self.BUFFER_SIZE
+        self.tickIndex = 0
+        self.numTicks = 0
+        # Each paint record is [startTime, duration, pixels]
+        self.paints = [None] * self.BUFFER_SIZE
+        self.paintIndex = 0
+        self.numPaints = 0
+
+        self.totalSkipped = 0
+        self.lastTickStart = None
+        self.tickStart = None
+        self.phaseStart = None
+        self.current = None
+        self.paintStart = None
+
+        self.logFile = open(logFilename, 'w') if logFilename else None
+        if self.logFile:
+            self.logFile.write("kind,start,interval,jitter,skipped,total," + ",".join(self.PHASES) + "\n")
+
+    def Close(self):
+        if self.logFile:
+            self.logFile.close()
+            self.logFile = None
+
+    def StartTick(self):
+        now = perf_counter()
+        interval = (now - self.lastTickStart) if self.lastTickStart else self.TARGET_INTERVAL
+        skipped = max(0, round(interval / self.TARGET_INTERVAL) - 1)
+        self.totalSkipped += skipped
+        self.lastTickStart = now
+        self.tickStart = now
+        self.phaseStart = now
+        self.current = [now, interval, interval - self.TARGET_INTERVAL, skipped, 0.0] + [0.0] * len(self.PHASES)
+
+    def EndPhase(self, phaseIndex):
+        now = perf_counter()
+        self.current[5 + phaseIndex] += now - self.phaseStart
+        self.phaseStart = now
+
+    def EndTick(self):
+        record = self.current
+        record[4] = perf_counter() - self.tickStart
+        self.ticks[self.tickIndex] = record
+        self.tickIndex = (self.tickIndex + 1) % self.BUFFER_SIZE
+        self.numTicks += 1
+        self.current = None
+        if self.logFile:
+            self.logFile.write("tick," + ",".join(f"{v:.6f}" if isinstance(v, float) else str(v) for v in record) + "\n")
+
+    def StartPaint(self):
+        self.paintStart = perf_counter()
+
+    def EndPaint(self, pixels=0):
+        record = [self.paintStart, perf_counter() - self.paintStart, pixels]
+        self.paints[self.paintIndex] = record
+        self.paintIndex = (self.paintIndex + 1) % self.BUFFER_SIZE
+        self.numPaints += 1
+        if self.logFile:
+            self.logFile.write(f"paint,{record[0]:.6f},,,,{record[1]:.6f},{record[2]}\n")
+
+    @staticmethod
+    def RecentRecords(buffer, index, count, n):
+        n = min(n, count, len(buffer))
+        return [buffer[(index - n + i) % len(buffer)] for i in range(n)]
+
+    def GetRecentTicks(self, n=BUFFER_SIZE):
+        """ Returns up to the last n tick records, oldest first, as dicts, with times in seconds. """
+        ticks = []
+        for r in self.RecentRecords(self.ticks, self.tickIndex, self.numTicks, n):
+            tick = {"start": r[0], "interval": r[1], "jitter": r[2], "skipped": r[3], "total": r[4]}
+            for i, phase in enumerate(self.PHASES):
+                tick[phase] = r[5 + i]
+            ticks.append(tick)
+        return ticks
+
+    def GetRecentPaints(self, n=BUFFER_SIZE):
+        """ Returns up to the last n paint records, oldest first, as dicts, with times in seconds. """
+        return [{"start": r[0], "duration": r[1], "pixels": r[2]}
+                for r in self.RecentRecords(self.paints, self.paintIndex, self.numPaints, n)]
+
+    def GetSummary(self):
+        """ Returns the mean, p95 and max times for each phase, paints, and tick jitter, over the buffered records. """
+        ticks = self.RecentRecords(self.ticks, self.tickIndex, self.numTicks, self.BUFFER_SIZE)
+        paints = self.RecentRecords(self.paints, self.paintIndex, self.numPaints, self.BUFFER_SIZE)
+
+        def meanMax(values):
+            if not values:
+                return {"mean": 0.0, "p95": 0.0, "max": 0.0}
+            values = sorted(values)
+            return {"mean": sum(values) / len(values),
+                    "p95": values[min(len(values)-1, int(len(values) * 0.95))],
+                    "max": values[-1]}
+
+        summary = {"ticks": self.numTicks,
+                   "skipped": self.totalSkipped,
+                   "total": meanMax([r[4] for r in ticks]),
+                   "jitter": meanMax([abs(r[2]) for r in ticks]),
+                   "paint": meanMax([r[1] for r in paints]),
+                   "pixels": meanMax([r[2] for r in paints])}
+        for i, phase in enumerate(self.PHASES):
+            summary[phase] = meanMax([r[5 + i] for r in ticks])
+        return summary
@@ -0,0 +1,407 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Pure-Python geometry for deciding whether objects are touching, without rasterizing them into wx.Regions, so it only
+reads model data, and can run on the runnerThread.
+
+Each object's hit shape, in absolute card coordinates, is a list of Parts.  A Part is a polygon (filled or not) or an
+open polyline, swept by a disk of some radius: a line or pen is a polyline swept by half its pen thickness, a filled
+shape is its filled polygon plus its outline swept by half its pen thickness, a roundrect is its inner rect swept by
+its corner radius (plus half its pen thickness), an oval is a finely tessellated polygon, and a group is the union of
+its children's Parts.  These match the regions drawn by UiView.MakeHitRegion() and its subclasses, including the extra
+thickness that lines and polygons get for easier clicking.
+
+Regions are sets of whole pixels, so two objects touch when they share a pixel, which is when their shapes overlap
+with some area.  We treat shapes as touching only when they overlap by more than EPSILON, so objects laid out
+exactly edge to edge on whole pixels are not touching, just like with regions.  Near anti-aliased edges, like those
+of rotated objects and ovals, the two methods can disagree by up to about a pixel.
+"""
+
+import math
+
+EPSILON = 1e-6
+OVAL_MAX_ERROR = 0.1  # Max distance in pixels between a true ellipse and its tessellation
+CORNER_SETBACK = 4  # How far is_touching_edge() pulls its edge strips away from each corner
+
+
+class Part(object):
+    __slots__ = ("points", "closed", "filled", "convex", "radius", "box")
+
+    def __init__(self, points, closed, filled, convex, radius):
+        self.points = points
+        self.closed = closed
+        self.filled = filled
+        self.convex = convex
+        self.radius = radius
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        self.box = (min(xs) - radius, min(ys) - radius, max(xs) + radius, max(ys) + radius)
+
+    def Segments(self):
+        pts = self.points
+        if len(pts) == 1:
+            return [(pts[0], pts[0])]
+        segs = list(zip(pts, pts[1:]))
+        if self.closed and len(pts) > 2:
+            segs.append((pts[-1], pts[0]))
+        return segs
+
+
+# Affine transforms are tuples of (m11, m12, m21, m22, tx, ty), with the same meanings and order of operations as
+# wx.AffineMatrix2D.  ViewModel.GetAbsoluteAffine() builds and caches each model's transform with these.
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def AffineTranslate(m, dx, dy):
+    return (m[0], m[1], m[2], m[3], m[4] + m[0]*dx + m[2]*dy, m[5] + m[1]*dx + m[3]*dy)
+
+
+def AffineRotate(m, radians):
+    c = math.cos(radians)
+    s = math.sin(radians)
+    return (c*m[0] + s*m[2], c*m[1] + s*m[3], -s*m[0] + c*m[2], -s*m[1] + c*m[3], m[4], m[5])
+
+
+def AffineTransformPoints(m, points):
+    return [(m[0]*x + m[2]*y + m[4], m[1]*x + m[3]*y + m[5]) for x, y in points]
+
+
+def AffineForModel(model):
+    """ Returns the transform from the model's local coords to absolute card coords, which the model caches. """
+    return model.GetAbsoluteAffine()
+
+
+def RectPoints(x1, y1, x2, y2):
+    return [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+
+
+def EllipsePoints(x, y, w, h):
+    rx = abs(w) / 2
+    ry = abs(h) / 2
+    cx = x + w/2
+    cy = y + h/2
+    r = max(rx, ry)
+    if r <= OVAL_MAX_ERROR:
+        return [(cx, cy)]
+    n = int(math.ceil(math.pi / math.acos(1 - OVAL_MAX_ERROR / r)))
+    n = min(256, max(8, n))
+    return [(cx + rx*math.cos(2*math.pi*i/n), cy + ry*math.sin(2*math.pi*i/n)) for i in range(n)]
+
+
+def PenRadius(thickness):
+    # A pen width of 0 still strokes the thinnest possible line
+    return max(1, int(thickness)) / 2
+
+
+def ShapeForModel(model):
+    """ Returns the list of Parts that make up this model's hit shape, in absolute card coords. """
+    if model.type == "group":
+        parts = []
+        for child in model.childModels:
+            parts.extend(ShapeForModel(child))
+        return parts
+
+    aff = AffineForModel(model)
+    with model.animLock:
+        if model.type in ["line", "pen", "polygon", "rect", "oval", "roundrect"]:
+            shapeType = model.type
+            points = model.GetScaledPoints()
+            thickness = model.properties["pen_thickness"]
+            cornerRadius = model.properties.get("corner_radius", 0)
+        else:
+            shapeType = None
+            size = model.properties["size"]
+
+    if not shapeType:
+        # Views fill their size, plus one pixel, in each direction
+        return [Part(AffineTransformPoints(aff, RectPoints(0, 0, size[0]+1, size[1]+1)), True, True, True, 0)]
+
+    if shapeType in ["line", "pen", "polygon"]:
+        # Lines and polygons are drawn extra thick for easier clicking
+        radius = PenRadius(thickness + 6)
+        if len(points) < 2:
+            return []
+        absPoints = AffineTransformPoints(aff, points)
+        if shapeType == "polygon":
+            return [Part(absPoints, True, True, False, radius)]
+        return [Part(absPoints, False, False, False, radius)]
+
+    if len(points) != 2:
+        return []
+    radius = PenRadius(thickness)
+    # Match the rect that UiShape.MakeShapePath() builds from LineModel.RectFromPoints()
+    xs = [int(p[0]) for p in points]
+    ys = [int(p[1]) for p in points]
+    x1, y1, x2, y2 = min(xs), min(ys), max(xs) - 1, max(ys) - 1
+    if shapeType == "rect":
+        return [Part(AffineTransformPoints(aff, RectPoints(x1, y1, x2, y2)), True, True, True, radius)]
+    if shapeType == "oval":
+        return [Part(AffineTransformPoints(aff, EllipsePoints(x1, y1, x2-x1, y2-y1)), True, True, True, radius)]
+    # A roundrect is its inner rect, swept by the corner radius
+    r = min(cornerRadius, abs(x2-x1)/2, abs(y2-y1)/2)
+    inner = RectPoints(x1+r, y1+r, x2-r, y2-r)
+    return [Part(AffineTransformPoints(aff, inner), True, True, True, radius + r)]
+
+
+def BoxesOverlap(a, b, margin=0.0):
+    return a[0] < b[2] + margin and b[0] < a[2] + margin and a[1] < b[3] + margin and b[1] < a[3] + margin
+
+
+def UnionBox(a, b):
+    if a is None: return b
+    if b is None: return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def ConvexSeparated(a, b):
+    # Separating axis theorem, for two convex polygons with no radius.  Touching edges don't count as overlapping.
+    for pts in (a, b):
+        n = len(pts)
+        if n < 2:
+            continue
+        for i in range(n):
+            p1 = pts[i]
+            p2 = pts[(i+1) % n]
+            ax = p1[1] - p2[1]
+            ay = p2[0] - p1[0]
+            if ax == 0 and ay == 0:
+                continue
+            minA = maxA = a[0][0]*ax + a[0][1]*ay
+            for p in a:
+                d = p[0]*ax + p[1]*ay
+                if d < minA: minA = d
+                elif d > maxA: maxA = d
+            minB = maxB = b[0][0]*ax + b[0][1]*ay
+            for p in b:
+                d = p[0]*ax + p[1]*ay
+                if d < minB: minB = d
+                elif d > maxB: maxB = d
+            eps = EPSILON * math.hypot(ax, ay)
+            if maxA <= minB + eps or maxB <= minA + eps:
+                return True
+    return False
+
+
+def PointInPolygon(pt, points):
+    # Even-odd rule, like wx.GraphicsContext.FillPath()
+    x, y = pt
+    inside = False
+    n = len(points)
+    j = n - 1
+    for i in range(n):
+        xi, yi = points[i]
+        xj, yj = points[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def PointSegmentDistSq(p, a, b):
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    lenSq = dx*dx + dy*dy
+    t = 0.0 if lenSq == 0 else max(0.0, min(1.0, ((p[0]-a[0])*dx + (p[1]-a[1])*dy) / lenSq))
+    ex = a[0] + t*dx - p[0]
+    ey = a[1] + t*dy - p[1]
+    return ex*ex + ey*ey
+
+
+def SegmentsCross(a, b, c, d):
+    def orient(p, q, r):
+        return (q[0]-p[0])*(r[1]-p[1]) - (q[1]-p[1])*(r[0]-p[0])
+    o1 = orient(a, b, c)
+    o2 = orient(a, b, d)
+    o3 = orient(c, d, a)
+    o4 = orient(c, d, b)
+    return ((o1 > 0 and o2 < 0) or (o1 < 0 and o2 > 0)) and ((o3 > 0 and o4 < 0) or (o3 < 0 and o4 > 0))
+
+
+def SegmentDistSq(a, b, c, d):
+    if SegmentsCross(a, b, c, d):
+        return 0.0
+    return min(PointSegmentDistSq(a, c, d), PointSegmentDistSq(b, c, d),
+               PointSegmentDistSq(c, a, b), PointSegmentDistSq(d, a, b))
+
+
+def PartsTouch(a, b):
+    if not BoxesOverlap(a.box, b.box):
+        return False
+    limit = a.radius + b.radius
+    if limit == 0 and a.convex and b.convex and a.filled and b.filled:
+        return not ConvexSeparated(a.points, b.points)
+
+    if a.filled and len(a.points) > 2 and PointInPolygon(b.points[0], a.points):
+        return True
+    if b.filled and len(b.points) > 2 and PointInPolygon(a.points[0], b.points):
+        return True
+
+    limitSq = (limit - EPSILON) ** 2 if limit > EPSILON else 0.0
+    bSegs = []
+    for c, d in b.Segments():
+        bSegs.append((c, d, min(c[0], d[0]) - limit, min(c[1], d[1]) - limit,
+                      max(c[0], d[0]) + limit, max(c[1], d[1]) + limit))
+    for p1, p2 in a.Segments():
+        x1, x2 = (p1[0], p2[0]) if p1[0] < p2[0] else (p2[0], p1[0])
+        y1, y2 = (p1[1], p2[1]) if p1[1] < p2[1] else (p2[1], p1[1])
+        for c, d, bx1, by1, bx2, by2 in bSegs:
+            if x1 > bx2 or bx1 > x2 or y1 > by2 or by1 > y2:
+                continue
+            if limit == 0:
+                if SegmentsCross(p1, p2, c, d):
+                    return True
+            elif SegmentDistSq(p1, p2, c, d) < limitSq:
+                return True
+    return False
+
+
+def ShapesTouch(partsA, partsB):
+    for a in partsA:
+        for b in partsB:
+            if PartsTouch(a, b):
+                return True
+    return False
+
+
+def ShapeBox(parts):
+    if not parts:
+        return None
+    return (min(p.box[0] for p in parts), min(p.box[1] for p in parts),
+            max(p.box[2] for p in parts), max(p.box[3] for p in parts))
+
+
+def FrameBox(model):
+    """
+    Returns a cheap (x1, y1, x2, y2) box that contains this model's whole hit shape, from its absolute frame, plus
+    how far its pen can reach outside of it, or None for groups, whose frames don't account for their children's pens.
+    """
+    if model.type == "group":
+        return None
+    if model.type in ["line", "pen", "polygon"]:
+        margin = PenRadius(model.properties["pen_thickness"] + 6)
+    elif model.type in ["rect", "oval", "roundrect"]:
+        margin = PenRadius(model.properties["pen_thickness"])
+    else:
+        margin = 0
+    margin += 2  # Covers views' extra pixel, even when rotated
+    f = model.GetAbsoluteFrame()
+    return (f.x - margin, f.y - margin, f.x + f.width + margin, f.y + f.height + margin)
+
+
+def FindTouching(model, candidates):
+    """
+    Returns the candidate models that are touching model, in candidate order.  Builds model's shape only once, and
+    skips building the shapes of candidates whose frames are nowhere near it.
+    """
+    parts = ShapeForModel(model)
+    box = ShapeBox(parts)
+    if not box:
+        return []
+    found = []
+    for c in candidates:
+        cBox = FrameBox(c)
+        if cBox and not BoxesOverlap(box, cBox):
+            continue
+        if ShapesTouch(parts, ShapeForModel(c)):
+            found.append(c)
+    return found
+
+
+def SweptBoxImpact(boxA, moveA, boxB, moveB):
+    """
+    Checks whether box A passed right through box B during the last tick, where each box is where an object ended up,
+    and each move is how far it moved during the tick.  Returns (toi, edge), where toi is the fraction of the tick at
+    which they first touched, and edge is the name of B's edge that A hit, in card coords, or None if they didn't
+    meet, or are still overlapping at the end of the tick, which the regular, discrete tests handle.
+    """
+    entry = -math.inf
+    exit = math.inf
+    edge = None
+    for axis, (low, high) in enumerate((("Left", "Right"), ("Bottom", "Top"))):
+        # Move A relative to B, from where they both started the tick
+        d = moveA[axis] - moveB[axis]
+        a1 = boxA[axis] - d
+        a2 = boxA[axis+2] - d
+        b1, b2 = boxB[axis], boxB[axis+2]
+        if d == 0:
+            if a2 <= b1 or b2 <= a1:
+                return None
+            continue
+        if d > 0:
+            tEntry, tExit, hitEdge = (b1 - a2) / d, (b2 - a1) / d, low
+        else:
+            tEntry, tExit, hitEdge = (b2 - a1) / d, (b1 - a2) / d, high
+        if tEntry > entry:
+            entry, edge = tEntry, hitEdge
+        exit = min(exit, tExit)
+    if edge is None or entry >= exit or not 0 <= entry <= 1 or exit >= 1:
+        return None
+    return entry, edge
+
+
+def ShapeContainsPoint(parts, pt):
+    """ Returns True if the pixel at integer point pt is part of the shape, like wx.Region.Contains() would. """
+    center = (int(pt[0]) + 0.5, int(pt[1]) + 0.5)
+    for part in parts:
+        if not (part.box[0] <= center[0] + 0.5 and center[0] - 0.5 <= part.box[2] and
+                part.box[1] <= center[1] + 0.5 and center[1] - 0.5 <= part.box[3]):
+            continue
+        if part.filled and len(part.points) > 2 and PointInPolygon(center, part.points):
+            return True
+        limitSq = (part.radius + 0.5) ** 2
+        for a, b in part.Segments():
+            if PointSegmentDistSq(center, a, b) < limitSq:
+                return True
+    return False
+
+
+def EdgeStripShapes(model):
+    """
+    Returns the Parts for the thin strips along the bottom, right, top and left edges of this model's frame, in that
+    order, in absolute card coords, pulled back from the corners by CORNER_SETBACK.  Edge names are in the model's
+    local, unrotated, frame.  Strips that are too short to exist are None.
+    """
+    aff = AffineForModel(model)
+    w, h = [int(x) for x in model.properties["size"]]
+    s = CORNER_SETBACK
+    boxes = [(s, 0, w-s, 2), (w-2, s, w, h-s), (s, h-2, w-s, h), (0, s, 2, h-s)]
+    strips = []
+    for x1, y1, x2, y2 in boxes:
+        if x2 <= x1 or y2 <= y1:
+            strips.append(None)
+        else:
+            strips.append([Part(AffineTransformPoints(aff, RectPoints(x1, y1, x2, y2)), True, True, True, 0)])
+    return strips
+
+
+def RotatedEdgeNames(rot):
+    # Rotate reported edge hits according to the other object's rotation
+    edgesMap = [["Top"], ["Top", "Right"], ["Right"], ["Bottom", "Right"],
+                ["Bottom"], ["Bottom", "Left"], ["Left"], ["Top", "Left"]]
+    return edgesMap[int(((rot + 22.5) % 360) / 45)]
+
+
+def TouchingEdges(parts, otherModel):
+    """ Returns the set of edge names of otherModel that the shape made of parts is touching. """
+    bottom, right, top, left = EdgeStripShapes(otherModel)
+    rot = otherModel.properties.get("rotation") or 0
+
+    edges = set()
+    if top and ShapesTouch(parts, top): edges.update(RotatedEdgeNames(rot))
+    if bottom and ShapesTouch(parts, bottom): edges.update(RotatedEdgeNames(rot+180))
+    if left and ShapesTouch(parts, left): edges.update(RotatedEdgeNames(rot+270))
+    if right and ShapesTouch(parts, right): edges.update(RotatedEdgeNames(rot+90))
+    if len(edges) == 3 and "Top" in edges and "Bottom" in edges:
+        edges.remove("Top")
+        edges.remove("Bottom")
+    if len(edges) == 3 and "Left" in edges and "Right" in edges:
+        edges.remove("Left")
+        edges.remove("Right")
+    return edges
@@ -0,0 +1,170 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import ast
+import marshal
+import hashlib
+import threading
+import importlib.util
+
+
+class ReturnRewriter(ast.NodeTransformer):
+    """
+    Replace each return statement at the module level of a handler with raise RuntimeError('Return'), which the Runner
+    catches, so that handler code can return early.  Returns inside function and class definitions are left alone.
+    """
+
+    def visit_FunctionDef(self, node):
+        return node
+
+    def visit_AsyncFunctionDef(self, node):
+        return node
+
+    def visit_ClassDef(self, node):
+        return node
+
+    def visit_Return(self, node):
+        raiseNode = ast.Raise(exc=ast.Call(func=ast.Name(id="RuntimeError", ctx=ast.Load()),
+                                           args=[ast.Constant(value="Return")], keywords=[]),
+                              cause=None)
+        ast.copy_location(raiseNode, node)
+        if node.value:
+            # Still evaluate the returned expression, in case it has side effects
+            valueNode = ast.copy_location(ast.Expr(value=node.value), node)
+            return [valueNode, raiseNode]
+        return raiseNode
+
+
+def HasModuleReturn(node):
+    """ Returns whether node has a return statement anywhere outside of function and class definitions. """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, ast.Return):
+            return True
+        if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and HasModuleReturn(child):
+            return True
+    return False
+
+
+def CompileHandlerSource(handlerStr):
+    """ Compile a handler, rewriting any module-level returns.  Raises SyntaxError for bad code. """
+    tree = ast.parse(handlerStr, "<string>", "exec")
+    if HasModuleReturn(tree):
+        tree = ast.fix_missing_locations(ReturnRewriter().visit(tree))
+    return compile(tree, "<string>", "exec")
+
+
+class HandlerCache(object):
+    """
+    Keep compiled event handler code objects around between runs, in a file in the user's cache folder, so that
+    launching a stack doesn't need to rewrite and re-compile every handler on its first call.  Entries are keyed by
+    a hash of the handler's path and source, so a changed handler just misses the cache, and the whole file is dropped
+    if it was written by a different Python version, or an older version of this cache format.  Handlers with the same
+    source still each get their own code object, so a code object always identifies a single handler.
+    """
+
+    sharedCache = None
+
+    CACHE_VERSION = 3     # Bump this when handler rewriting changes, to invalidate old entries
+    MAX_ENTRIES = 5000    # Stop keeping entries that haven't been used recently, past this many
+
+    @classmethod
+    def shared(cls):
+        if not cls.sharedCache:
+            cls.sharedCache = HandlerCache()
+        return cls.sharedCache
+
+    def __init__(self):
+        cache_folder = os.path.join(os.path.expanduser("~"), '.cache', 'cardstock')
+        self.path = os.path.join(cache_folder, "handlers.cache")
+        self.header = importlib.util.MAGIC_NUMBER + self.CACHE_VERSION.to_bytes(4, 'little')
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> marshalled code bytes
+        self.codeMap = {}  # key -> code objects unmarshalled, or compiled, during this session
+        self.isDirty = False
+        self.hits = 0
+        self.misses = 0
+        self.Load()
+
+    @staticmethod
+    def KeyForHandler(path, handlerStr):
+        return hashlib.sha256((path + "\0" + handlerStr).encode('utf-8')).hexdigest()
+
+    def Load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(self.header)) != self.header:
+                    # Written by a different Python or cache version, so none of it is usable
+                    return
+                entries = marshal.load(f)
+            if isinstance(entries, dict):
+                self.entries = entries
+        except (OSError, EOFError, ValueError, TypeError):
+            self.entries = {}
+
+    def Save(self):
+        with self.lock:
+            if not self.isDirty:
+                return
+            # Keep this session's entries, and as many older ones as fit
+            entries = {k: marshal.dumps(c) for k, c in self.codeMap.items()}
+            for k, v in self.entries.items():
+                if len(entries) >= self.MAX_ENTRIES:
+                    break
+                if k not in entries:
+                    entries[k] = v
+            self.isDirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmpPath = self.path + ".tmp"
+            with open(tmpPath, 'wb') as f:
+                f.write(self.header)
+                marshal.dump(entries, f)
+            os.replace(tmpPath, self.path)
+        except OSError:
+            pass
+
+    def Get(self, path, handlerStr):
+        """ Returns the cached code object for the handler at path with this source, or None on a miss. """
+        key = self.KeyForHandler(path, handlerStr)
+        with self.lock:
+            code = self.codeMap.get(key)
+            if code is None and key in self.entries:
+                try:
+                    code = marshal.loads(self.entries[key])
+                    self.codeMap[key] = code
+                except (EOFError, ValueError, TypeError):
+                    del self.entries[key]
+                    code = None
+            if code is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return code
+
+    def Put(self, path, handlerStr, code):
+        key = self.KeyForHandler(path, handlerStr)
+        with self.lock:
+            self.codeMap[key] = code
+            self.isDirty = True
+
+    def GetStats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(set(self.entries.keys()) | set(self.codeMap.keys()))}
+
+    def ResetStats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def ClearCache(self):
+        with self.lock:
+            self.entries = {}
+            self.codeMap = {}
+            self.isDirty = True
@@ -0,0 +1,65 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import threading
+from collections import deque
+
+
+class HandlerProfiler(object):
+    """
+    Collects wall times of event handler runs, and of each call to a user function, keyed by (object path, handler
+    name, function name), where the handler is the one that defined the function.  The function name is "" for a
+    handler's own code.  Times include any calls nested inside, so a handler's time includes the functions it calls.
+    The Runner only calls Record() while profiling is turned on.
+    """
+
+    MAX_SAMPLES = 1000  # Recent samples kept per key, for computing percentiles
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> [count, total, max, deque of recent durations]
+
+    def Record(self, path, handlerName, funcName, duration):
+        key = (path, handlerName, funcName)
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                entry = [0, 0.0, 0.0, deque(maxlen=self.MAX_SAMPLES)]
+                self.entries[key] = entry
+            entry[0] += 1
+            entry[1] += duration
+            if duration > entry[2]:
+                entry[2] = duration
+            entry[3].append(duration)
+
+    def Clear(self):
+        with self.lock:
+            self.entries = {}
+
+    def GetStats(self):
+        """ Returns a list of stats dicts, one per key, sorted by total time, highest first.  Times are in seconds. """
+        with self.lock:
+            items = [(key, entry[0], entry[1], entry[2], sorted(entry[3])) for key, entry in self.entries.items()]
+        stats = []
+        for (path, handlerName, funcName), count, total, maxTime, samples in items:
+            p95 = samples[min(len(samples)-1, int(len(samples) * 0.95))] if samples else 0.0
+            stats.append({"path": path,
+                          "handler": handlerName,
+                          "function": funcName,
+                          "count": count,
+                          "total": total,
+                          "mean": total / count,
+                          "p95": p95,
+                          "max": maxTime})
+        stats.sort(key=lambda s: s["total"], reverse=True)
+        return stats
+
+    def ExportJSON(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.GetStats(), f, indent=2)
@@ -357,6 +357,11 @@ class HelpDataObject():
                                      "object passed into this function.  If this object is touching any edges of the "
                                      "other object, the return value will be a list including one or more of the strings:"
                                      " 'Top', 'Bottom', 'Left', or 'Right', accordingly."},
+        "touching_any": {"args": {"objects": {"type": "list", "info": "A list of other objects to compare to this one"}},
+                         "return": "list",
+                         "info": "Returns a list of the objects from <b>objects</b> that this object is touching, in the "
+                                 "same order, or an empty list if it isn't touching any of them.  This is much faster "
+                                 "than calling is_touching() on each object in a loop."},
         "animate_position": {"args": {"duration": {"type": "float", "info": "time in seconds for the animation to run"},
                                       "end_position": {"type": "point",
                                                        "info": "the destination bottom-left corner position at the end of the animation, "
@@ -1030,6 +1035,14 @@ class HelpDataCard():
             "info": "Visually animates this card's <b>fill_color</b> to <b>end_color</b>, "
                     "over <b>duration</b> seconds.  When the animation completes, runs the <b>on_finished</b> function, "
                     "if one was passed in."},
+        "find_touching": {"args": {"obj": {"type": "object", "info": "The object to check for touching"},
+                                   "candidates": {"type": "list", "info": "An optional list of objects to check against "
+                                                                          "<b>obj</b>.  If left blank, checks against all "
+                                                                          "objects on this card."}},
+                          "return": "list",
+                          "info": "Returns a list of the objects on this card that <b>obj</b> is touching, in card order, "
+                                  "or in the order of <b>candidates</b> if it was passed in.  This is much faster than "
+                                  "calling is_touching() on each object in a loop."},
         "stop_all_animating": {"args": {"property_name": {"type": "string",
                                                           "info": "optional name of the property to stop animating, for "
                                                                   "example: \"size\" or \"position\".  If left blank, stops "
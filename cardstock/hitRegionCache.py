@@ -0,0 +1,35 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import wx
+from lruCache import LruCache
+
+
+class HitRegionCache(LruCache):
+    """
+    Keep rasterized hit regions around, keyed by the geometry they were drawn from, so objects with the same shape,
+    size, rotation and pen thickness, like clones, share one rasterization.  Each entry is a (wx.Region, relOrigin)
+    tuple, where relOrigin is the region's origin relative to the object's absolute position, so it can be placed
+    anywhere by offsetting a copy.  The regions are shared, so copy one before changing it.  The least recently used
+    entries are dropped once their estimated size goes over MAX_BYTES.
+    """
+
+    MAX_BYTES = 16 * 1024 * 1024
+
+    @staticmethod
+    def RegionBytes(region):
+        # wx.Regions are stored as lists of rects, so estimate from the rect count
+        count = 0
+        it = wx.RegionIterator(region)
+        while it.HaveRects():
+            count += 1
+            it.Next()
+        return 64 + 16 * count
+
+    def EntryBytes(self, value):
+        return self.RegionBytes(value[0])
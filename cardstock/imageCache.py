@@ -0,0 +1,47 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from lruCache import LruCache
+
+
+class ImageCache(LruCache):
+    """
+    Keep decoded wx.Images around, keyed by file path, so image objects don't need to load and decode their files again.
+    Each image is counted as width x height x channels bytes, and the least recently used images are dropped once the
+    total goes over MAX_BYTES, so stacks that show lots of different pictures don't grow forever.  Images on the current
+    card are pinned, and never dropped while pinned.
+    """
+
+    MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self):
+        self.pinnedPaths = set()
+        super().__init__()
+
+    @staticmethod
+    def ImageBytes(img):
+        return img.GetWidth() * img.GetHeight() * (4 if img.HasAlpha() else 3)
+
+    def EntryBytes(self, img):
+        return self.ImageBytes(img)
+
+    def CanEvict(self, path):
+        return path not in self.pinnedPaths
+
+    def SetPinnedPaths(self, paths):
+        """ Pin just these paths, and unpin any others, which may then get evicted. """
+        self.pinnedPaths = set(paths)
+        self.EvictIfNeeded()
+
+    def AddPinnedPath(self, path):
+        self.pinnedPaths.add(path)
+
+    def GetStats(self):
+        stats = super().GetStats()
+        stats["pinned"] = sum(1 for path in self.pinnedPaths if path in self.entries)
+        return stats
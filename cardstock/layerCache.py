@@ -0,0 +1,156 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import wx
+import flippedGCDC
+import geometry
+
+
+class LayerCache(object):
+    """
+    While a stack is running, most of a card is usually a static backdrop with just a few objects changing.  So we split
+    the card's objects, in z-order, into runs, and keep each run of objects that haven't changed for a while
+    pre-rendered into a bitmap layer.  Each paint then only draws those layers, plus the live objects between them.
+    An object is static once STATIC_PAINTS paints have gone by since it, or anything inside it, last changed, or since
+    it first showed up.  A run needs at least MIN_LAYER_OBJECTS static objects in a row, counting the card background,
+    to get its own layer.  Layers are keyed by the exact objects in their run, so when an object in a layer changes, or
+    the z-order changes, that run gets split or rebuilt.  Objects count as changed when they're refreshed, or when their
+    model's paintGen moves, which also catches changes made with notify=False.
+    """
+
+    STATIC_PAINTS = 30
+    MIN_LAYER_OBJECTS = 4
+    MAX_LAYERS = 4
+
+    def __init__(self, stackManager):
+        self.stackManager = stackManager
+        self.uiCard = None
+        self.size = None
+        self.scale = 1.0
+        self.layers = {}  # tuple of UiViews in the run -> bitmap
+        self.lastChange = {}  # top-level UiView -> paintCount when it last changed
+        self.paintGens = {}  # UiView -> its model's paintGen as of the last paint
+        self.paintCount = 0
+        self.ResetStats()
+
+    def ResetStats(self):
+        self.rebuilds = 0
+
+    def Clear(self):
+        self.layers = {}
+        self.lastChange = {}
+        self.paintGens = {}
+
+    def MarkChanged(self, ui):
+        """ Called whenever ui needs repainting.  Layers are per card, so changing the card itself drops them all. """
+        uiCard = self.stackManager.uiCard
+        if not uiCard or ui is uiCard or ui.model.type in ["card", "stack"]:
+            self.Clear()
+            return
+        while ui.parent and ui.parent is not uiCard:
+            ui = ui.parent
+        self.lastChange[ui] = self.paintCount
+
+    def IsStatic(self, item):
+        return self.paintCount - self.lastChange[item] >= self.STATIC_PAINTS
+
+    def SplitRuns(self, items):
+        """ Returns a list of (isLayer, items) runs, in z-order. """
+        runs = []
+        run = []
+        runIsStatic = None
+        for item in items:
+            isStatic = self.IsStatic(item)
+            if isStatic != runIsStatic and run:
+                runs.append([runIsStatic, run])
+                run = []
+            runIsStatic = isStatic
+            run.append(item)
+        if run:
+            runs.append([runIsStatic, run])
+
+        numLayers = 0
+        for r in runs:
+            if r[0]:
+                if len(r[1]) >= self.MIN_LAYER_OBJECTS and numLayers < self.MAX_LAYERS:
+                    numLayers += 1
+                else:
+                    r[0] = False
+        return runs
+
+    def PaintItem(self, gc, item, updateBox):
+        if item is self.uiCard:
+            item.Paint(gc)
+        else:
+            if updateBox:
+                box = item.GetPaintBox()
+                if box and not geometry.BoxesOverlap(box, updateBox):
+                    return
+            item.DoPaint(gc, updateBox)
+
+    def BuildLayer(self, run):
+        # Allocate at the view's backing resolution, so layers stay sharp on HiDPI screens
+        bitmap = wx.Bitmap.FromRGBA(int(self.size.width * self.scale), int(self.size.height * self.scale))
+        bitmap.SetScaleFactor(self.scale)
+        dc = wx.MemoryDC(bitmap)
+        gc = flippedGCDC.FlippedGCDC(dc, self.stackManager)
+        gc.cachedGC = gc.GetGraphicsContext()
+        self.uiCard.PrePaint(gc)
+        for item in run:
+            self.PaintItem(gc, item, None)
+        self.uiCard.PostPaint(gc)
+        del gc.cachedGC
+        del gc
+        dc.SelectObject(wx.NullBitmap)
+        self.rebuilds += 1
+        return bitmap
+
+    def Paint(self, gc, updateBox=None):
+        """ Paints the current card like UiCard.DoPaint() does, but using and updating the cached layers. """
+        uiCard = self.stackManager.uiCard
+        size = self.stackManager.view.GetSize()
+        scale = self.stackManager.view.GetContentScaleFactor()
+        if uiCard is not self.uiCard or size != self.size or scale != self.scale:
+            self.Clear()
+            self.uiCard = uiCard
+            self.size = wx.Size(size)
+            self.scale = scale
+        if self.paintGens.get(uiCard) != uiCard.model.paintGen:
+            self.Clear()
+        self.paintCount += 1
+
+        # Objects we haven't seen yet, or whose paintGen moved, count as just changed, so ones that are moving never
+        # make it into a layer
+        items = [uiCard] + uiCard.uiViews
+        paintGens = {item: item.model.paintGen for item in items}
+        self.lastChange = {item: self.lastChange.get(item, self.paintCount)
+                           if self.paintGens.get(item) == paintGens[item] else self.paintCount
+                           for item in items}
+        self.paintGens = paintGens
+
+        layers = {}
+        uiCard.PrePaint(gc)
+        for isLayer, run in self.SplitRuns(items):
+            if isLayer:
+                key = tuple(run)
+                bitmap = self.layers.get(key)
+                if not bitmap:
+                    bitmap = self.BuildLayer(run)
+                layers[key] = bitmap
+                gc.cachedGC.DrawBitmap(bitmap, 0, 0, self.size.width, self.size.height)
+            else:
+                for item in run:
+                    self.PaintItem(gc, item, updateBox)
+        uiCard.PostPaint(gc)
+        self.layers = layers  # Drops layers for runs that have changed
+
+    def GetStats(self):
+        return {"layers": len(self.layers),
+                "layeredObjects": sum(len(key) for key in self.layers),
+                "rebuilds": self.rebuilds,
+                "bytes": int(4 * self.size.width * self.size.height * self.scale**2 * len(self.layers)) if self.size else 0}
@@ -0,0 +1,103 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from collections import OrderedDict
+
+
+class LruCache(object):
+    """
+    The base class for our shared caches.  Entries are dropped, least recently used first, once there are more than
+    MAX_ENTRIES of them, or once their total size, as estimated by EntryBytes(), goes over MAX_BYTES.  A limit of None
+    means no limit.  Subclasses set the limits, and can override EntryBytes(), and CanEvict() to keep some entries
+    around no matter what.  Each subclass gets its own shared() instance.
+    """
+
+    MAX_ENTRIES = None
+    MAX_BYTES = None
+
+    @classmethod
+    def shared(cls):
+        if not cls.__dict__.get("sharedCache"):
+            cls.sharedCache = cls()
+        return cls.sharedCache
+
+    def __init__(self):
+        self.entries = None
+        self.ClearCache()
+
+    def ClearCache(self):
+        self.entries = OrderedDict()  # key -> (value, numBytes)
+        self.numBytes = 0
+        self.ResetStats()
+
+    def ResetStats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def EntryBytes(self, value):
+        return 0
+
+    def CanEvict(self, key):
+        return True
+
+    def Get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def Put(self, key, value):
+        self.Remove(key)
+        numBytes = self.EntryBytes(value)
+        self.entries[key] = (value, numBytes)
+        self.numBytes += numBytes
+        self.EvictIfNeeded()
+
+    def Lookup(self, key, make):
+        """ Returns the value for key, calling make() to build it and add it on a miss. """
+        value = self.Get(key)
+        if value is None:
+            value = make()
+            self.Put(key, value)
+        return value
+
+    def Remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.numBytes -= entry[1]
+
+    def IsOverBudget(self, numKept=0):
+        return ((self.MAX_ENTRIES is not None and len(self.entries) + numKept > self.MAX_ENTRIES) or
+                (self.MAX_BYTES is not None and self.numBytes > self.MAX_BYTES))
+
+    def EvictIfNeeded(self):
+        kept = []  # Entries we couldn't evict, which still count against the limits
+        while self.entries and self.IsOverBudget(len(kept)):
+            key, entry = self.entries.popitem(last=False)
+            if self.CanEvict(key):
+                self.numBytes -= entry[1]
+                self.evictions += 1
+            else:
+                kept.append((key, entry))
+        # Put them back as the least recently used, in their old order
+        for key, entry in reversed(kept):
+            self.entries[key] = entry
+            self.entries.move_to_end(key, last=False)
+
+    def GetStats(self):
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries),
+                "bytes": self.numBytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions}
@@ -0,0 +1,43 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import wx
+from lruCache import LruCache
+
+
+class PaintResources(LruCache):
+    """
+    Share the wx.Colours, wx.Pens, wx.Brushes and wx.Fonts used while painting, instead of parsing colour strings and
+    building new GDI objects for every object on every paint.  Pen widths and font sizes are passed in device pixels,
+    after FromDIP(), so the DPI scale is part of each key.  The least recently used resources are dropped once there
+    are more than MAX_ENTRIES.  Resources are shared, so never change one you got from here.
+    """
+
+    MAX_ENTRIES = 1024
+
+    def Colour(self, spec, default='black'):
+        """ Returns the wx.Colour for spec, or for default if spec isn't a valid colour. """
+        def make():
+            colour = wx.Colour(spec)
+            return colour if colour.IsOk() else wx.Colour(default)
+        return self.Lookup(("colour", spec, default), make)
+
+    def Pen(self, colour, width, style=wx.PENSTYLE_SOLID, join=wx.JOIN_ROUND, default='black'):
+        def make():
+            pen = wx.Pen(self.Colour(colour, default), width, style)
+            pen.SetJoin(join)
+            return pen
+        return self.Lookup(("pen", colour, width, style, join, default), make)
+
+    def Brush(self, colour, style=wx.BRUSHSTYLE_SOLID, default='white'):
+        return self.Lookup(("brush", colour, style, default),
+                           lambda: wx.Brush(self.Colour(colour, default), style))
+
+    def Font(self, pixelHeight, family=wx.FONTFAMILY_DEFAULT):
+        return self.Lookup(("font", pixelHeight, family),
+                           lambda: wx.Font(wx.FontInfo(wx.Size(0, pixelHeight)).Family(family)))
@@ -0,0 +1,1011 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Benchmarks for CardStock internals.  Run with the names of the benchmarks to run, or with no arguments to run them all:
+    python perfBench.py [benchmark ...]
+"""
+
+import os
+import re
+import sys
+import json
+import glob
+import random
+import tempfile
+import contextlib
+from time import perf_counter
+from handlerCache import HandlerCache, CompileHandlerSource
+import geometry
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def LoadExampleHandlers(examplesDir=None):
+    """ Returns a list of (path, handlerStr) for every non-empty handler in the example stacks. """
+    if not examplesDir:
+        examplesDir = os.path.join(HERE, "examples")
+    handlers = []
+
+    def collect(data, path):
+        for handlerName, handlerStr in data.get("handlers", {}).items():
+            handlerStr = handlerStr.strip()
+            if handlerStr != "":
+                handlers.append((".".join(path + [handlerName]), handlerStr))
+        for child in data.get("cards", []) + data.get("childModels", []):
+            collect(child, path + [child["properties"].get("name", "")])
+
+    for filename in sorted(glob.glob(os.path.join(examplesDir, "*.cds"))):
+        with open(filename, 'r') as f:
+            collect(json.load(f), [os.path.basename(filename)])
+    return handlers
+
+
+def TimeIt(func, repeat):
+    """ Returns the best time in seconds of repeat calls to func. """
+    best = None
+    for i in range(repeat):
+        start = perf_counter()
+        func()
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+wxApp = None
+
+
+def StartApp():
+    """ Creates the one wx.App that all of the benchmarks that need wx share. """
+    global wxApp
+    import wx
+    if not wxApp:
+        wxApp = wx.App()
+    return wxApp
+
+
+class BenchCard(object):
+    """
+    The setup shared by benchmarks that need real views: a StackManager showing an empty card in a hidden frame, with
+    its periodic timer stopped, and optionally an offscreen gc to paint the card into.  Call Destroy() when done.
+    """
+
+    def __init__(self, deferredRefresh=False):
+        import wx
+        from stackManager import StackManager
+        StartApp()
+        self.frame = wx.Frame(None)
+        self.stackManager = StackManager(self.frame, False)
+        self.stackManager.timer.Stop()
+        if deferredRefresh:
+            self.stackManager.view.UseDeferredRefresh(True)
+        self.dc = None
+        self.gc = None
+
+    def MakeGC(self, width, height):
+        """ Returns a gc that paints into a width x height bitmap, set up like the one StackManager.OnPaint() uses. """
+        import wx
+        import flippedGCDC
+        self.dc = wx.MemoryDC(wx.Bitmap.FromRGBA(width, height))
+        self.gc = flippedGCDC.FlippedGCDC(self.dc, self.stackManager)
+        self.gc.cachedGC = self.gc.GetGraphicsContext()
+        return self.gc
+
+    def Destroy(self):
+        import wx
+        if self.gc:
+            del self.gc.cachedGC
+            self.gc = None
+            self.dc.SelectObject(wx.NullBitmap)
+            self.dc = None
+        self.frame.Destroy()
+
+
+def RegexRewriteHandler(handlerStr):
+    # The line-scanning return rewriter that Runner used before switching to handlerCache.ReturnRewriter.
+    # Kept here only as a baseline to compare against.
+    if "return" not in handlerStr:
+        return handlerStr
+    funcIndent = None
+    updatedLines = []
+    for line in handlerStr.split('\n'):
+        if funcIndent is not None:
+            m = re.match(rf"^(\s{{{funcIndent}}})\b", line)
+            if m:
+                funcIndent = None
+        if funcIndent is None:
+            m = re.match(r"^(\s*)def ", line)
+            if m:
+                funcIndent = len(m.group(1))
+                updatedLines.append(line)
+            else:
+                u = re.sub(r"^(\s*)return\b", r"\1raise RuntimeError('Return')", line)
+                u = re.sub(r":\s+return\b", ": raise RuntimeError('Return')", u)
+                updatedLines.append(u)
+        else:
+            updatedLines.append(line)
+    return '\n'.join(updatedLines)
+
+
+def BenchReturnRewriting(repeat=5):
+    """ Compare regex-rewrite-then-compile against a single AST parse/rewrite/compile, over all example handlers. """
+    handlers = LoadExampleHandlers()
+    failures = {"regex": 0, "ast": 0}
+
+    def runRegex():
+        failures["regex"] = 0
+        for path, handlerStr in handlers:
+            try:
+                compile(RegexRewriteHandler(handlerStr), "<string>", "exec")
+            except SyntaxError:
+                failures["regex"] += 1
+
+    def runAst():
+        failures["ast"] = 0
+        for path, handlerStr in handlers:
+            try:
+                CompileHandlerSource(handlerStr)
+            except SyntaxError:
+                failures["ast"] += 1
+
+    numReturns = 0
+    for path, handlerStr in handlers:
+        try:
+            compile(handlerStr, "<string>", "exec")
+        except SyntaxError as e:
+            if e.msg == "'return' outside function":
+                numReturns += 1
+
+    regexTime = TimeIt(runRegex, repeat)
+    astTime = TimeIt(runAst, repeat)
+    print(f"return rewriting: {len(handlers)} handlers, {numReturns} with module-level returns")
+    print(f"  regex + compile: {regexTime*1000:8.2f} ms  ({failures['regex']} failed to compile)")
+    print(f"  ast + compile:   {astTime*1000:8.2f} ms  ({failures['ast']} failed to compile)")
+
+
+@contextlib.contextmanager
+def TempHandlerCache():
+    """ Point HandlerCache.shared() at an empty temp folder, instead of the user's real cache, until exiting. """
+    envKeys = ("HOME", "USERPROFILE")
+    oldEnv = {k: os.environ.get(k) for k in envKeys}
+    with tempfile.TemporaryDirectory() as home:
+        for k in envKeys:
+            os.environ[k] = home
+        HandlerCache.sharedCache = None
+        try:
+            yield HandlerCache.shared()
+        finally:
+            HandlerCache.sharedCache = None
+            for k, v in oldEnv.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def BenchHandlerDispatch(count=20000):
+    """ Measure how many handler calls per second Runner.RunHandlerInternal can dispatch, for a few kinds of events. """
+    import wx
+    from runner import Runner
+    from stackModel import StackModel
+    from uiCard import CardModel
+    from uiButton import ButtonModel
+
+    stack = StackModel(None)
+    card = CardModel(None)
+    card.parent = stack
+    stack.childModels.append(card)
+    button = ButtonModel(None)
+    button.properties["name"] = "button_1"
+    button.parent = card
+    card.childModels.append(button)
+
+    class StubRunner(Runner):
+        # Never run the queue, so there's no stack or viewer needed, and nothing to stop afterwards
+        def StartRunLoop(self):
+            pass
+
+    events = [("on_setup", None, None, None),
+              ("on_periodic", None, None, None),
+              ("on_mouse_move", wx.RealPoint(10, 10), None, None),
+              ("on_key_hold", None, "Space", "Space"),
+              ("on_bounce", None, None, (card.GetProxy(), "Top"))]
+
+    with TempHandlerCache():
+        runner = StubRunner(None, None)
+        runner.didSetup = True
+        runner.keyTimings["Space"] = perf_counter()
+
+        print(f"handler dispatch: {count} calls per event")
+        for handlerName, mouse_pos, key_name, arg in events:
+            handlerStr = "x = 1"
+            runner.RunHandlerInternal(button, handlerName, handlerStr, mouse_pos, key_name, arg)
+            start = perf_counter()
+            for i in range(count):
+                runner.RunHandlerInternal(button, handlerName, handlerStr, mouse_pos, key_name, arg)
+            elapsed = perf_counter() - start
+            print(f"  {handlerName:18} {count/elapsed:12,.0f} calls/sec")
+
+
+def BenchBounceBroadPhase(counts=(25, 50, 100, 200), ticks=120, seed=1):
+    """
+    Compare the collision phase of a tick, UiView.FindCollisions() on every moving object, when running the exact
+    test on every bouncing pair, against first building a broad phase with StackManager.BuildBounceBroadPhase(), as
+    OnPeriodicTimer() does.  N moving 30x30 buttons on a card each bounce off of the card's edges and all of the
+    others.  Both runs start from the same state and perform their bounces, so they should find the same collisions.
+    """
+    import generator
+
+    rng = random.Random(seed)
+    dt = 1/60
+    print(f"bounce broad phase: {ticks} ticks")
+    for n in counts:
+        starts = [((rng.uniform(0, 470), rng.uniform(0, 470)), (rng.uniform(-200, 200), rng.uniform(-200, 200)))
+                  for i in range(n)]
+        results = []
+        for useBroadPhase in (False, True):
+            bench = BenchCard()
+            stackManager = bench.stackManager
+            uis = []
+            for pos, speed in starts:
+                model = generator.StackGenerator.ModelFromType(stackManager, "button")
+                model.SetProperty("position", pos, notify=False)
+                model.SetProperty("size", (30, 30), notify=False)
+                uis.append(stackManager.AddUiViewInternal(model))
+            for ui, (pos, speed) in zip(uis, starts):
+                ui.model.SetBounceModels([stackManager.uiCard.model] + [o.model for o in uis if o is not ui])
+                ui.model.SetProperty("speed", speed, notify=False)
+
+            findTime = 0
+            numCollisions = 0
+            for t in range(ticks):
+                for ui in uis:
+                    ui.RunAnimations([], dt)
+                collisions = {}
+                start = perf_counter()
+                broadPhase = stackManager.BuildBounceBroadPhase(uis, dt) if useBroadPhase else None
+                for ui in uis:
+                    ui.FindCollisions(collisions, broadPhase, dt)
+                findTime += perf_counter() - start
+                numCollisions += len(collisions)
+                for v in collisions.values():
+                    v[0].PerformBounce(v, dt)
+            results.append((findTime, numCollisions))
+            bench.Destroy()
+
+        (allTime, allCollisions), (broadTime, broadCollisions) = results
+        print(f"  N={n:4}  all pairs: {allTime/ticks*1000:7.3f} ms/tick"
+              f"   broad phase: {broadTime/ticks*1000:7.3f} ms/tick"
+              f"   collisions: {allCollisions} / {broadCollisions}")
+
+
+def BenchMotion(counts=(50, 200, 1000), ticks=60, seed=1):
+    """
+    Compare the motion step of a tick, moving every object by its speed, when done one object at a time by
+    UiView.RunAnimations(), against doing it with vectorMotion.MoveBySpeed(), for N moving buttons on a card.
+    """
+    import generator
+    import vectorMotion
+
+    if not vectorMotion.numpy:
+        print("motion: skipped, NumPy is not installed")
+        return
+
+    rng = random.Random(seed)
+    dt = 1/60
+    print(f"motion: {ticks} ticks")
+    for n in counts:
+        bench = BenchCard()
+        stackManager = bench.stackManager
+        uis = []
+        for i in range(n):
+            model = generator.StackGenerator.ModelFromType(stackManager, "button")
+            model.SetProperty("position", (rng.randint(0, 500), rng.randint(0, 500)), notify=False)
+            model.SetProperty("size", (20, 20), notify=False)
+            uis.append(stackManager.AddUiViewInternal(model))
+        for ui in uis:
+            ui.model.SetProperty("speed", (rng.uniform(-100, 100), rng.uniform(-100, 100)))
+        models = [ui.model for ui in uis]
+
+        def runPerObject():
+            for t in range(ticks):
+                for ui in uis:
+                    ui.RunAnimations([], dt)
+
+        def runVectorized():
+            for t in range(ticks):
+                vectorMotion.MoveBySpeed(models, dt)
+                for ui in uis:
+                    ui.RunAnimations([], dt, False)
+
+        perObjectTime = TimeIt(runPerObject, 3)
+        vectorTime = TimeIt(runVectorized, 3)
+        print(f"  N={n:5}  per object: {perObjectTime/ticks*1000:7.3f} ms/tick"
+              f"   vectorized: {vectorTime/ticks*1000:7.3f} ms/tick")
+        bench.Destroy()
+
+
+def BenchSweptBounce(rates=(60, 30, 15), seconds=10, seed=1):
+    """
+    Count how many times fast 10x10 balls crossing an 800x600 card pass through a thin 2 pixel wall in its middle, at
+    a few tick rates, and how many of those crossings get caught when only checking for overlap at the end of each
+    tick, as the discrete tests do, against also using geometry.SweptBoxImpact().  Balls bounce off the card edges,
+    and pass through the wall, so every run sees the same motion.
+    """
+    rng = random.Random(seed)
+    wall = (399, 0, 401, 600)
+    balls = [(rng.uniform(0, 790), rng.uniform(0, 590), rng.uniform(-900, 900), rng.uniform(-900, 900))
+             for i in range(50)]
+    print(f"swept bounce: {len(balls)} balls, {seconds} seconds")
+    for rate in rates:
+        dt = 1 / rate
+        crossings = 0
+        discrete = 0
+        swept = 0
+        for (x, y, vx, vy) in balls:
+            wasOverlapping = geometry.BoxesOverlap((x, y, x + 10, y + 10), wall)
+            for t in range(seconds * rate):
+                if not 0 <= x + vx * dt <= 790: vx = -vx
+                if not 0 <= y + vy * dt <= 590: vy = -vy
+                side = x + 5 < 400
+                x += vx * dt
+                y += vy * dt
+                box = (x, y, x + 10, y + 10)
+                overlapping = geometry.BoxesOverlap(box, wall)
+                if side != (x + 5 < 400):
+                    crossings += 1
+                    if overlapping or wasOverlapping:
+                        discrete += 1
+                        swept += 1
+                    elif geometry.SweptBoxImpact(box, (vx * dt, vy * dt), wall, (0, 0)):
+                        swept += 1
+                wasOverlapping = overlapping
+        print(f"  {rate:3} Hz  {crossings:5} crossings   caught by discrete: {discrete:5}   by swept: {swept:5}")
+
+
+def RegionIsTouching(ui, oUi):
+    # The wx.Region based is_touching() that ViewProxy used before switching to the geometry module.
+    # Kept here only as a baseline to compare against.
+    import wx
+    sreg = wx.Region(ui.GetHitRegion())
+    sreg.Intersect(oUi.GetHitRegion())
+    return not sreg.IsEmpty()
+
+
+def RegionTouchingEdges(ui, oUi):
+    # The wx.Region based is_touching_edge() that ViewProxy used before switching to the geometry module.
+    import wx
+
+    def intersectTest(r, edge):
+        testReg = wx.Region(r)
+        testReg.Intersect(edge)
+        return not testReg.IsEmpty()
+
+    oModel = oUi.model
+    reg = ui.GetHitRegion()
+    oRot = oModel.GetProperty("rotation")
+    if oRot is None: oRot = 0
+
+    rect = oModel.GetFrame()
+    cornerSetback = 4
+    rects = [wx.Rect(rect.TopLeft+(cornerSetback,0), rect.TopRight+(-cornerSetback,1)),
+              wx.Rect(rect.TopRight+(-1,cornerSetback), rect.BottomRight+(0,-cornerSetback)),
+              wx.Rect(rect.BottomLeft+(cornerSetback,-1), rect.BottomRight+(-cornerSetback,0)),
+              wx.Rect(rect.TopLeft+(0,cornerSetback), rect.BottomLeft+(1,-cornerSetback))]
+    if oRot == 0:
+        bottom, right, top, left = rects
+    else:
+        for r in rects:
+            r.Offset(wx.Point(0,0)-rect.TopLeft)
+        bottom, right, top, left = [oUi.MakeRegionFromLocalRect(r) for r in rects]
+
+    edges = set()
+    if intersectTest(reg, top): edges.update(geometry.RotatedEdgeNames(oRot))
+    if intersectTest(reg, bottom): edges.update(geometry.RotatedEdgeNames(oRot+180))
+    if intersectTest(reg, left): edges.update(geometry.RotatedEdgeNames(oRot+270))
+    if intersectTest(reg, right): edges.update(geometry.RotatedEdgeNames(oRot+90))
+    if len(edges) == 3 and "Top" in edges and "Bottom" in edges:
+        edges.remove("Top")
+        edges.remove("Bottom")
+    if len(edges) == 3 and "Left" in edges and "Right" in edges:
+        edges.remove("Left")
+        edges.remove("Right")
+    return edges
+
+
+def MakeTouchingCorpus(stackManager, count, rng, area=300):
+    """ Adds count random objects to the stackManager's card: views and shapes, some rotated, in an area x area square. """
+    import generator
+    types = ["button", "label", "rect", "oval", "roundrect", "line", "pen", "polygon"]
+    uis = []
+    for i in range(count):
+        typeStr = rng.choice(types)
+        model = generator.StackGenerator.ModelFromType(stackManager, typeStr)
+        x, y = rng.randint(0, area - 40), rng.randint(0, area - 40)
+        w, h = rng.randint(4, 80), rng.randint(4, 80)
+        if typeStr in ["button", "label"]:
+            model.SetProperty("position", (x, y), notify=False)
+            model.SetProperty("size", (w, h), notify=False)
+        else:
+            if typeStr in ["rect", "oval", "roundrect", "line"]:
+                points = [(x, y), (x + w, y + h)]
+            else:
+                points = [(x + rng.randint(0, w), y + rng.randint(0, h)) for j in range(rng.randint(3, 8))]
+            model.SetShape({"type": typeStr, "pen_color": "black", "thickness": rng.choice([0, 1, 2, 4, 8]),
+                            "points": points})
+            model.ReCropShape()
+        if rng.random() < 0.4:
+            model.SetProperty("rotation", rng.choice([15.0, 30.0, 45.0, 90.0, 137.0, 180.0]), notify=False)
+        uis.append(stackManager.AddUiViewInternal(model))
+    return uis
+
+
+def BenchTouching(count=60, seed=1):
+    """
+    Compare is_touching() and is_touching_edge() results and speed between the old wx.Region based tests and the
+    geometry module, over a corpus of random, crowded, sometimes rotated views and shapes.  Disagreements should only
+    come from anti-aliased pixels along rotated or curved edges.
+    """
+    bench = BenchCard()
+    stackManager = bench.stackManager
+    uis = MakeTouchingCorpus(stackManager, count, random.Random(seed))
+    pairs = [(a, b) for a in uis for b in uis if a is not b]
+
+    def runRegions():
+        for ui in uis:
+            ui.ClearHitRegion()
+        return [RegionIsTouching(a, b) for a, b in pairs]
+
+    def runGeometry():
+        return [geometry.ShapesTouch(geometry.ShapeForModel(a.model), geometry.ShapeForModel(b.model))
+                for a, b in pairs]
+
+    start = perf_counter()
+    regionResults = runRegions()
+    regionTime = perf_counter() - start
+    start = perf_counter()
+    geometryResults = runGeometry()
+    geometryTime = perf_counter() - start
+
+    touchDisagree = [(a.model.type, b.model.type) for (a, b), r, g in zip(pairs, regionResults, geometryResults)
+                     if r != g]
+    edgeDisagree = 0
+    numEdgePairs = 0
+    for (a, b), touching in zip(pairs, regionResults):
+        if touching:
+            numEdgePairs += 1
+            if RegionTouchingEdges(a, b) != geometry.TouchingEdges(geometry.ShapeForModel(a.model), b.model):
+                edgeDisagree += 1
+
+    print(f"touching: {len(pairs)} pairs of {count} objects, {sum(regionResults)} touching")
+    print(f"  regions:  {regionTime/len(pairs)*1e6:8.1f} us/pair, including building hit regions")
+    print(f"  geometry: {geometryTime/len(pairs)*1e6:8.1f} us/pair")
+    print(f"  is_touching disagreements: {len(touchDisagree)}, by type: "
+          f"{sorted(set(touchDisagree)) if touchDisagree else 'none'}")
+    print(f"  is_touching_edge disagreements: {edgeDisagree} of {numEdgePairs} touching pairs")
+    bench.Destroy()
+
+
+def BenchFindTouching(count=200, seed=1):
+    """
+    Compare calling is_touching() on every other object in a loop, against one find_touching() query per object,
+    over a corpus of random views and shapes spread over a whole card.
+    """
+    bench = BenchCard()
+    stackManager = bench.stackManager
+    uis = MakeTouchingCorpus(stackManager, count, random.Random(seed), area=1000)
+    proxies = [ui.model.GetProxy() for ui in uis]
+    card = stackManager.uiCard.model.GetProxy()
+
+    def runLoop():
+        return [[o for o in proxies if o is not p and p.is_touching(o)] for p in proxies]
+
+    def runBatch():
+        return [card.find_touching(p, proxies) for p in proxies]
+
+    loopResults = runLoop()
+    batchResults = runBatch()
+    loopTime = TimeIt(runLoop, 3)
+    batchTime = TimeIt(runBatch, 3)
+
+    print(f"find_touching: {count} objects, {sum(len(r) for r in batchResults)} touching pairs, "
+          f"{'same' if loopResults == batchResults else 'DIFFERENT'} results")
+    print(f"  is_touching loop: {loopTime/count*1e3:8.3f} ms/query")
+    print(f"  find_touching:    {batchTime/count*1e3:8.3f} ms/query")
+    bench.Destroy()
+
+
+def LinearHitTestAll(stackManager, pt):
+    # The HitTestAll() that StackManager used before it had a hitIndex, which tries every view on the card.
+    # Kept here only as a baseline to compare against.
+    views = []
+    allViews = list(reversed(stackManager.uiCard.GetAllUiViews()))
+    for uiView in allViews:
+        if uiView.model.IsVisible() and uiView.view:
+            hit = uiView.HitTest(pt)
+            if hit:
+                views.append(uiView)
+    for uiView in allViews:
+        if uiView.model.IsVisible() and not uiView.view:
+            hit = uiView.HitTest(pt)
+            if hit:
+                views.append(uiView)
+    views.append(stackManager.uiCard)
+    return views
+
+
+def BenchHitTest(counts=(50, 200, 800), numPoints=2000, seed=1):
+    """
+    Measure mouse hit tests per second with StackManager.HitTestAll() and its hitIndex, against trying every view, for
+    cards with more and more objects, spread over a 1000x1000 card, and check that both find the same views.
+    """
+    import wx
+
+    print(f"hit testing: {numPoints} random points")
+    for count in counts:
+        bench = BenchCard()
+        stackManager = bench.stackManager
+        rng = random.Random(seed)
+        MakeTouchingCorpus(stackManager, count, rng, area=1000)
+        points = [wx.Point(rng.randint(0, 1000), rng.randint(0, 1000)) for i in range(numPoints)]
+
+        # Build all hit regions first, so both methods only time the hit tests
+        linearResults = [LinearHitTestAll(stackManager, pt) for pt in points]
+        start = perf_counter()
+        for pt in points:
+            LinearHitTestAll(stackManager, pt)
+        linearTime = perf_counter() - start
+        start = perf_counter()
+        indexResults = [stackManager.HitTestAll(pt) for pt in points]
+        indexTime = perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(linearResults, indexResults) if a != b)
+        print(f"  {count:5} objects:  all views {numPoints/linearTime:10,.0f} tests/sec"
+              f"   hitIndex {numPoints/indexTime:10,.0f} tests/sec   {mismatches} mismatches")
+        bench.Destroy()
+
+
+def UncachedAffineTransform(model):
+    # The GetAffineTransform() that ViewModel used before it cached absolute transforms, which walks the parent chain.
+    # Kept here only as a baseline to compare against.
+    import wx
+    import math
+    m = model
+    ancestors = []
+    aff = wx.AffineMatrix2D()
+    while m and m.type not in ["card", "stack"]:
+        ancestors.append(m)
+        m = m.parent
+    for m in reversed(ancestors):
+        pos = m.GetProperty("position")
+        size = m.GetProperty("size")
+        rot = m.GetProperty("rotation")
+        aff.Translate(pos[0] + size[0]/2, pos[1] + size[1]/2)
+        if rot:
+            aff.Rotate(math.radians(-rot))
+        aff.Translate(-size[0]/2, -size[1]/2)
+    return aff
+
+
+def BenchTransforms(count=200, depth=3, seed=1):
+    """
+    Compare getting every object's absolute transform and frame, as a tick's hit tests, edge tests and painting do,
+    with ViewModel's cached transforms against walking the parent chain each time, for objects nested in groups, and
+    check that both give the same transforms.
+    """
+    from uiView import ViewModel
+
+    bench = BenchCard()
+    stackManager = bench.stackManager
+    rng = random.Random(seed)
+    uis = MakeTouchingCorpus(stackManager, count, rng, area=1000)
+    models = [ui.model for ui in uis]
+    for d in range(depth):
+        # Group up the objects in small batches, and rotate some groups, to nest them deeper each time
+        groups = []
+        for i in range(0, len(models), 4):
+            group = stackManager.GroupModelsInternal(models[i:i+4])
+            if rng.random() < 0.5:
+                group.SetProperty("rotation", rng.choice([15.0, 45.0, 90.0]))
+            groups.append(group)
+        models = groups
+    allModels = stackManager.uiCard.model.GetAllChildModels()
+
+    def runUncached():
+        return [UncachedAffineTransform(m).Get() for m in allModels]
+
+    def runCached():
+        for m in allModels:
+            m.GetAbsoluteFrame()
+        return [m.GetAffineTransform().Get() for m in allModels]
+
+    def affTuple(vals):
+        return tuple(round(v, 6) for v in (vals[0].m_11, vals[0].m_12, vals[0].m_21, vals[0].m_22, vals[1].x, vals[1].y))
+
+    mismatches = sum(1 for a, b in zip(runUncached(), runCached()) if affTuple(a) != affTuple(b))
+    uncachedTime = TimeIt(runUncached, 5)
+    rebuilds = ViewModel.transformRebuilds
+    cachedTime = TimeIt(runCached, 5)
+    rebuilds = ViewModel.transformRebuilds - rebuilds
+    print(f"transforms: {len(allModels)} objects in groups {depth} deep, {mismatches} mismatches")
+    print(f"  parent chain walk: {uncachedTime*1000:7.3f} ms per pass")
+    print(f"  cached:            {cachedTime*1000:7.3f} ms per pass, including frames, {rebuilds} rebuilds in 5 passes")
+    bench.Destroy()
+
+
+def BenchNameLookup(counts=(20, 100, 500), lookups=20000, seed=1):
+    """
+    Measure how fast event code can look up objects by name, as in card.some_button, using each container model's
+    childNameIndex, against scanning childModels for the name, as ViewProxy.__getattr__() used to.
+    """
+    print(f"name lookups: {lookups} lookups")
+    for count in counts:
+        bench = BenchCard()
+        stackManager = bench.stackManager
+        rng = random.Random(seed)
+        uis = MakeTouchingCorpus(stackManager, count, rng, area=1000)
+        cardModel = stackManager.uiCard.model
+        card = cardModel.GetProxy()
+        names = [rng.choice(uis).model.properties["name"] for i in range(lookups)]
+
+        def runScan():
+            for name in names:
+                for m in cardModel.childModels:
+                    if m.properties["name"] == name:
+                        m.GetProxy()
+                        break
+
+        def runIndex():
+            for name in names:
+                getattr(card, name)
+
+        scanTime = TimeIt(runScan, 3)
+        indexTime = TimeIt(runIndex, 3)
+        print(f"  {count:5} objects:  scan {lookups/scanTime:12,.0f} lookups/sec   index {lookups/indexTime:12,.0f} lookups/sec")
+        bench.Destroy()
+
+
+def BenchPeriodicDispatch(counts=(100, 500, 2000), subscriberFraction=0.05, ticks=300, seed=1):
+    """
+    Measure how long each 30 Hz tick spends finding the objects to send on_periodic and on_mouse_move to, by walking
+    every view and checking its handlers, as UiCard.OnPeriodic() used to, against using the card's subscriber index,
+    when only a few objects have code for those events.
+    """
+    from uiCard import CardModel
+
+    print(f"periodic dispatch: {subscriberFraction*100:.0f}% of objects have on_periodic code")
+    for count in counts:
+        bench = BenchCard()
+        stackManager = bench.stackManager
+        rng = random.Random(seed)
+        uis = MakeTouchingCorpus(stackManager, count, rng, area=1000)
+        for ui in uis:
+            if rng.random() < subscriberFraction:
+                ui.model.SetHandler("on_periodic", "self.position.x += 1")
+        cardModel = stackManager.uiCard.model
+
+        def runWalk():
+            found = 0
+            for t in range(ticks):
+                for ui in reversed(stackManager.uiCard.GetAllUiViews()):
+                    if ui.hasMouseMoved and ui.model.GetHandler("on_mouse_move"):
+                        found += 1
+                    if ui.model.GetHandler("on_periodic"):
+                        found += 1
+            return found
+
+        def runIndex():
+            found = 0
+            for t in range(ticks):
+                for model in reversed(cardModel.GetSubscribers(CardModel.PERIODIC_EVENTS)):
+                    ui = stackManager.GetUiViewByModel(model)
+                    if ui.hasMouseMoved and ui.model.GetHandler("on_mouse_move"):
+                        found += 1
+                    if ui.model.GetHandler("on_periodic"):
+                        found += 1
+            return found
+
+        walkFound, indexFound = runWalk(), runIndex()
+        walkTime = TimeIt(runWalk, 3)
+        indexTime = TimeIt(runIndex, 3)
+        print(f"  {count:5} objects:  walk {walkTime/ticks*1e6:8.1f} us/tick   index {indexTime/ticks*1e6:8.1f} us/tick"
+              f"   {'same' if walkFound == indexFound else 'DIFFERENT'} subscribers")
+        bench.Destroy()
+
+
+def BenchDirtyPaint(counts=(50, 200, 800), movers=3, frames=60, area=800, seed=1):
+    """
+    Compare repainting the whole card each frame against repainting only the dirty rect, when a few objects move on a
+    card full of others.  Reports the pixels and time per frame for each.
+    """
+    print(f"dirty paint: {movers} objects moving on a {area}x{area} card, {frames} frames")
+    for count in counts:
+        bench = BenchCard()
+        stackManager = bench.stackManager
+        rng = random.Random(seed)
+        uis = MakeTouchingCorpus(stackManager, count, rng, area=area)
+        stackManager.view.SetSize((area, area))
+        movingUis = uis[:movers]
+        for ui in uis:
+            ui.lastPaintBox = ui.GetPaintBox()
+        stackManager.view.UseDeferredRefresh(True)
+
+        gc = bench.MakeGC(area, area)
+
+        dirtyRects = []
+        for f in range(frames):
+            for ui in movingUis:
+                pos = ui.model.GetProperty("position")
+                ui.model.SetProperty("position", (pos[0] + rng.choice([-4, 4]), pos[1] + rng.choice([-4, 4])),
+                                     notify=False)
+                ui.RefreshBounds()
+            dirtyRects.append(stackManager.view.dirtyRect)
+            stackManager.view.needsRefresh = False
+            stackManager.view.dirtyRect = None
+
+        def runFull():
+            for rect in dirtyRects:
+                stackManager.uiCard.DoPaint(gc)
+
+        def runDirty():
+            for rect in dirtyRects:
+                gc.SetClippingRegion(rect)
+                stackManager.uiCard.DoPaint(gc, stackManager.CardBoxForRect(rect))
+                gc.DestroyClippingRegion()
+
+        fullTime = TimeIt(runFull, 3)
+        dirtyTime = TimeIt(runDirty, 3)
+        dirtyPixels = sum(r.width * r.height for r in dirtyRects) / frames
+        print(f"  {count:5} objects:  full {area*area/1000:6.0f}K px {fullTime/frames*1000:7.2f} ms/frame"
+              f"   dirty {dirtyPixels/1000:6.1f}K px {dirtyTime/frames*1000:7.2f} ms/frame")
+        bench.Destroy()
+
+
+def BenchLayers(counts=(50, 200, 800), movers=3, frames=120, area=800, seed=1):
+    """
+    Compare painting every object each frame against painting through the LayerCache, where the objects that aren't
+    moving get pre-rendered into bitmap layers.  Reports the time per frame for each, and the layers built.
+    """
+    print(f"layers: {movers} objects moving on a {area}x{area} card, {frames} frames")
+    for count in counts:
+        bench = BenchCard(deferredRefresh=True)
+        stackManager = bench.stackManager
+        rng = random.Random(seed)
+        uis = MakeTouchingCorpus(stackManager, count, rng, area=area)
+        stackManager.view.SetSize((area, area))
+        movingUis = rng.sample(uis, movers)
+        layerCache = stackManager.layerCache
+
+        gc = bench.MakeGC(area, area)
+
+        def step():
+            for ui in movingUis:
+                pos = ui.model.GetProperty("position")
+                ui.model.SetProperty("position", (pos[0] + rng.choice([-4, 4]), pos[1] + rng.choice([-4, 4])),
+                                     notify=False)
+                ui.RefreshBounds()
+
+        def runFull():
+            for f in range(frames):
+                step()
+                stackManager.uiCard.DoPaint(gc)
+
+        def runLayers():
+            for f in range(frames):
+                step()
+                layerCache.Paint(gc)
+
+        # Let the static objects settle into layers first
+        for f in range(layerCache.STATIC_PAINTS + 1):
+            step()
+            layerCache.Paint(gc)
+        layerCache.ResetStats()
+
+        fullTime = TimeIt(runFull, 3)
+        layersTime = TimeIt(runLayers, 3)
+        stats = layerCache.GetStats()
+        print(f"  {count:5} objects:  full {fullTime/frames*1000:7.2f} ms/frame   layers {layersTime/frames*1000:7.2f} ms/frame"
+              f"   {stats['layers']} layers holding {stats['layeredObjects']} objects, {stats['rebuilds']} rebuilds")
+        bench.Destroy()
+
+
+def BenchTextLayout(count=50, frames=60, changeEvery=30, seed=1):
+    """
+    Measure painting a card of wrapped, auto-shrinking text labels, like scoreboards and HUDs, by laying out their text
+    on every paint, as UiTextLabel.Paint() used to, against using their cached TextLayouts.  Each label's text changes
+    every changeEvery frames.
+    """
+    import generator
+    from textLayoutCache import TextLayoutCache
+
+    bench = BenchCard(deferredRefresh=True)
+    stackManager = bench.stackManager
+    rng = random.Random(seed)
+    labels = []
+    for i in range(count):
+        model = generator.StackGenerator.ModelFromType(stackManager, "textlabel")
+        model.SetProperty("position", (rng.randint(0, 400), rng.randint(0, 400)), notify=False)
+        model.SetProperty("size", (rng.randint(60, 200), rng.randint(30, 80)), notify=False)
+        model.SetProperty("alignment", rng.choice(["Left", "Center", "Right"]), notify=False)
+        labels.append(stackManager.AddUiViewInternal(model))
+
+    gc = bench.MakeGC(500, 500)
+
+    def run(uncached):
+        for f in range(frames):
+            for i, ui in enumerate(labels):
+                if (f + i) % changeEvery == 0:
+                    ui.model.SetProperty("text", f"Score: {f * 10 + i}  Lives: {i % 5}  Level {f // changeEvery}",
+                                         notify=False)
+                    ui.OnPropertyChanged(ui.model, "text")
+                if uncached:
+                    ui.layout = None
+                    TextLayoutCache.shared().ClearCache()
+                ui.PrePaint(gc)
+                ui.Paint(gc)
+                ui.PostPaint(gc)
+
+    uncachedTime = TimeIt(lambda: run(True), 3)
+    TextLayoutCache.shared().ClearCache()
+    cachedTime = TimeIt(lambda: run(False), 3)
+    stats = TextLayoutCache.shared().GetStats()
+    print(f"text layout: {count} labels, {frames} frames, text changes every {changeEvery} frames")
+    print(f"  uncached: {uncachedTime/frames*1000:7.2f} ms/frame")
+    print(f"  cached:   {cachedTime/frames*1000:7.2f} ms/frame   {stats['entries']} layouts cached, "
+          f"{stats['hitRate']*100:.0f}% shared cache hits")
+    bench.Destroy()
+
+
+def BenchPaintResources(count=200, frames=60, seed=1):
+    """
+    Count how many wx.Colours, wx.Pens, wx.Brushes and wx.Fonts each paint of a card full of shapes, buttons and labels
+    allocates, and time it, with and without the shared PaintResources cache.
+    """
+    import wx
+    from paintResources import PaintResources
+
+    bench = BenchCard(deferredRefresh=True)
+    stackManager = bench.stackManager
+    uis = MakeTouchingCorpus(stackManager, count, random.Random(seed), area=500)
+
+    gc = bench.MakeGC(500, 500)
+
+    # Count allocations by swapping in subclasses of the wx classes that we're interested in
+    counts = {}
+    originals = {name: getattr(wx, name) for name in ("Colour", "Pen", "Brush", "Font")}
+
+    def counting(name, cls):
+        class Counting(cls):
+            def __init__(self, *args, **kwargs):
+                counts[name] = counts.get(name, 0) + 1
+                super().__init__(*args, **kwargs)
+        return Counting
+
+    resources = PaintResources.shared()
+
+    def run(uncached):
+        resources.MAX_ENTRIES = 0 if uncached else PaintResources.MAX_ENTRIES
+        resources.ClearCache()
+        for f in range(frames):
+            if uncached:
+                for ui in uis:
+                    if hasattr(ui, "paintTools"):
+                        ui.paintTools = None
+            stackManager.uiCard.DoPaint(gc)
+
+    for name, cls in originals.items():
+        setattr(wx, name, counting(name, cls))
+    try:
+        results = {}
+        for uncached in (True, False):
+            counts.clear()
+            run(uncached)
+            allocs = dict(counts)
+            results[uncached] = (TimeIt(lambda: run(uncached), 3), allocs)
+    finally:
+        for name, cls in originals.items():
+            setattr(wx, name, cls)
+        resources.MAX_ENTRIES = PaintResources.MAX_ENTRIES
+
+    print(f"paint resources: {count} objects, {frames} frames")
+    for uncached, label in ((True, "uncached"), (False, "cached  ")):
+        t, allocs = results[uncached]
+        perFrame = ", ".join(f"{allocs.get(name, 0)/frames:.1f} {name}s" for name in originals)
+        print(f"  {label}: {t/frames*1000:7.2f} ms/frame   allocations per frame: {perFrame}")
+    bench.Destroy()
+
+
+def BenchImageCache(numImages=60, size=(800, 600), budgetImages=10, passes=3, perCard=3):
+    """
+    Simulate a slideshow stack that shows numImages different pictures in turn, perCard at a time, and compare the old
+    unbounded dict of decoded images against the ImageCache with a budget of about budgetImages images.  Reports the
+    memory held, the hit rates, and the evictions.
+    """
+    import wx
+    import tempfile
+    from imageCache import ImageCache
+
+    StartApp()
+    tmpDir = tempfile.mkdtemp()
+    paths = []
+    for i in range(numImages):
+        img = wx.Image(size[0], size[1])
+        img.SetRGB(wx.Rect(0, 0, size[0], size[1]), i * 4 % 256, 128, 255 - i * 4 % 256)
+        path = os.path.join(tmpDir, f"img{i}.png")
+        img.SaveFile(path, wx.BITMAP_TYPE_PNG)
+        paths.append(path)
+    cards = [paths[i:i+perCard] for i in range(0, numImages, perCard)]
+
+    def runDict():
+        cache = {}
+        loads = 0
+        for p in range(passes):
+            for card in cards:
+                for path in card:
+                    if path not in cache:
+                        cache[path] = wx.Image(path, wx.BITMAP_TYPE_ANY)
+                        loads += 1
+        return sum(ImageCache.ImageBytes(img) for img in cache.values()), loads
+
+    def runCache():
+        cache = ImageCache()
+        cache.MAX_BYTES = budgetImages * size[0] * size[1] * 3
+        loads = 0
+        for p in range(passes):
+            for card in cards:
+                cache.SetPinnedPaths(card)
+                for path in card:
+                    if cache.Get(path) is None:
+                        cache.Put(path, wx.Image(path, wx.BITMAP_TYPE_ANY))
+                        loads += 1
+        return cache.numBytes, loads, cache.GetStats()
+
+    start = perf_counter()
+    dictBytes, dictLoads = runDict()
+    dictTime = perf_counter() - start
+    start = perf_counter()
+    cacheBytes, cacheLoads, stats = runCache()
+    cacheTime = perf_counter() - start
+
+    print(f"image cache: {numImages} {size[0]}x{size[1]} images, {perCard} per card, {passes} passes")
+    print(f"  dict:       {dictBytes/1024/1024:7.1f} MB held, {dictLoads} decodes, {dictTime:6.2f} s")
+    print(f"  ImageCache: {cacheBytes/1024/1024:7.1f} MB held, {cacheLoads} decodes, {cacheTime:6.2f} s, "
+          f"{stats['hitRate']*100:.0f}% hits, {stats['evictions']} evictions")
+    for path in paths:
+        os.remove(path)
+    os.rmdir(tmpDir)
+
+
+benchmarks = {
+    "returns": BenchReturnRewriting,
+    "dispatch": BenchHandlerDispatch,
+    "bounce": BenchBounceBroadPhase,
+    "motion": BenchMotion,
+    "swept": BenchSweptBounce,
+    "touching": BenchTouching,
+    "find_touching": BenchFindTouching,
+    "hittest": BenchHitTest,
+    "transforms": BenchTransforms,
+    "names": BenchNameLookup,
+    "periodic": BenchPeriodicDispatch,
+    "dirty_paint": BenchDirtyPaint,
+    "layers": BenchLayers,
+    "text_layout": BenchTextLayout,
+    "paint_resources": BenchPaintResources,
+    "images": BenchImageCache,
+}
+
+
+if __name__ == '__main__':
+    names = sys.argv[1:] if len(sys.argv) > 1 else list(benchmarks.keys())
+    for name in names:
+        if name not in benchmarks:
+            print(f"Unknown benchmark '{name}'.  Choose from: {', '.join(benchmarks.keys())}")
+            sys.exit(1)
+        benchmarks[name]()
@@ -0,0 +1,198 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import wx
+from traceRecorder import TraceRecorder
+from hitRegionCache import HitRegionCache
+from textLayoutCache import TextLayoutCache
+from paintResources import PaintResources
+from imageCache import ImageCache
+from uiView import ViewModel
+
+
+class ProfilerWindow(wx.Frame):
+    """
+    Shows how much time each event handler, and each user function called back later, has taken to run, while
+    profiling is turned on in the stack's Runner.  Also shows a summary of frame timing from the StackManager, and
+    can record a trace of the session, to save as Chrome trace-event JSON, and shows stats for shared caches.
+    """
+
+    columns = [("Handler", 220), ("Calls", 60), ("Total ms", 80), ("Mean ms", 70), ("p95 ms", 70), ("Max ms", 70)]
+
+    def __init__(self, parent, stackManager):
+        super().__init__(parent, title="Profiler", style=wx.DEFAULT_FRAME_STYLE|wx.FRAME_TOOL_WINDOW)
+        self.SetMinClientSize(wx.Size(self.FromDIP(300),self.FromDIP(100)))
+        self.SetClientSize(wx.Size(self.FromDIP(600),self.FromDIP(300)))
+
+        self.stackManager = stackManager
+        self.lastTransformCounts = (ViewModel.transformRebuilds, stackManager.timerCount)
+        self.lastLayerRebuilds = stackManager.layerCache.rebuilds
+        self.hasShown = False
+
+        self.enableCheckbox = wx.CheckBox(self, label="Profile Handlers")
+        self.enableCheckbox.Bind(wx.EVT_CHECKBOX, self.OnEnableCheckbox)
+        self.clearButton = wx.Button(self, label="Clear")
+        self.clearButton.Bind(wx.EVT_BUTTON, self.OnClearButton)
+        self.exportButton = wx.Button(self, label="Export JSON...")
+        self.exportButton.Bind(wx.EVT_BUTTON, self.OnExportButton)
+        self.sampleCheckbox = wx.CheckBox(self, label="Sample Hot Lines")
+        self.sampleCheckbox.Bind(wx.EVT_CHECKBOX, self.OnSampleCheckbox)
+        self.frameCheckbox = wx.CheckBox(self, label="Time Frames")
+        self.frameCheckbox.Bind(wx.EVT_CHECKBOX, self.OnFrameCheckbox)
+        self.frameLabel = wx.StaticText(self)
+        self.cacheLabel = wx.StaticText(self)
+        self.traceCheckbox = wx.CheckBox(self, label="Record Trace")
+        self.traceCheckbox.Bind(wx.EVT_CHECKBOX, self.OnTraceCheckbox)
+
+        self.listCtrl = wx.ListCtrl(self, style=wx.LC_REPORT|wx.LC_SINGLE_SEL)
+        for i, (name, width) in enumerate(self.columns):
+            self.listCtrl.InsertColumn(i, name, wx.LIST_FORMAT_LEFT if i == 0 else wx.LIST_FORMAT_RIGHT,
+                                       self.FromDIP(width))
+
+        headSizer = wx.BoxSizer(wx.HORIZONTAL)
+        headSizer.Add(self.enableCheckbox, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 3)
+        headSizer.Add(self.sampleCheckbox, 1, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 3)
+        headSizer.Add(self.clearButton, 0, wx.ALL, 3)
+        headSizer.Add(self.exportButton, 0, wx.ALL, 3)
+
+        footSizer = wx.BoxSizer(wx.HORIZONTAL)
+        footSizer.Add(self.frameCheckbox, 1, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 3)
+        footSizer.Add(self.traceCheckbox, 0, wx.ALIGN_CENTER_VERTICAL|wx.ALL, 3)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(headSizer, 0, wx.EXPAND|wx.ALL, 3)
+        sizer.Add(self.listCtrl, 1, wx.EXPAND|wx.ALL, 3)
+        sizer.Add(footSizer, 0, wx.EXPAND|wx.ALL, 3)
+        sizer.Add(self.frameLabel, 0, wx.EXPAND|wx.ALL, 3)
+        sizer.Add(self.cacheLabel, 0, wx.EXPAND|wx.ALL, 3)
+        self.SetSizer(sizer)
+        sizer.Layout()
+
+        # Refresh the list once per second while shown
+        self.updateTimer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.OnUpdateTimer, self.updateTimer)
+
+        self.Bind(wx.EVT_CLOSE, self.OnClose)
+
+        self.Hide()
+
+    def Show(self, doShow=True):
+        super().Show(doShow)
+        if doShow:
+            if not self.hasShown:
+                self.SetPosition(self.GetParent().GetPosition() + (0, self.GetParent().GetSize().Height))
+                self.hasShown = True
+            self.enableCheckbox.SetValue(self.stackManager.runner.isProfiling)
+            self.sampleCheckbox.SetValue(self.stackManager.runner.sampler is not None and
+                                         self.stackManager.runner.sampler.thread is not None)
+            self.frameCheckbox.SetValue(self.stackManager.frameTiming is not None)
+            self.traceCheckbox.SetValue(TraceRecorder.current is not None)
+            self.UpdateStats()
+            self.updateTimer.Start(1000)
+        else:
+            self.updateTimer.Stop()
+
+    def OnClose(self, event):
+        self.updateTimer.Stop()
+        event.Veto()
+        self.Hide()
+
+    def OnUpdateTimer(self, event):
+        if not self.IsShown():
+            self.updateTimer.Stop()
+            return
+        self.UpdateStats()
+
+    def OnEnableCheckbox(self, event):
+        self.stackManager.runner.EnableProfiling(self.enableCheckbox.GetValue())
+
+    def OnSampleCheckbox(self, event):
+        self.stackManager.runner.EnableSampling(self.sampleCheckbox.GetValue())
+
+    def OnFrameCheckbox(self, event):
+        self.stackManager.EnableFrameTiming(self.frameCheckbox.GetValue())
+        self.UpdateStats()
+
+    def OnTraceCheckbox(self, event):
+        if self.traceCheckbox.GetValue():
+            TraceRecorder.Start()
+            return
+        recorder = TraceRecorder.Stop()
+        if recorder:
+            dlg = wx.FileDialog(self, "Save Trace as...", defaultFile="trace.json",
+                                style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT, wildcard="JSON files (*.json)|*.json")
+            if dlg.ShowModal() == wx.ID_OK:
+                recorder.WriteJSON(dlg.GetPath())
+            dlg.Destroy()
+
+    def OnClearButton(self, event):
+        self.stackManager.runner.profiler.Clear()
+        self.UpdateStats()
+
+    def OnExportButton(self, event):
+        dlg = wx.FileDialog(self, "Export Profile as...", defaultFile="profile.json",
+                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT, wildcard="JSON files (*.json)|*.json")
+        if dlg.ShowModal() == wx.ID_OK:
+            self.stackManager.runner.profiler.ExportJSON(dlg.GetPath())
+        dlg.Destroy()
+
+    def UpdateStats(self):
+        self.UpdateFrameTiming()
+        self.UpdateCacheStats()
+        runner = self.stackManager.runner
+        if not runner or not runner.profiler:
+            return
+        stats = runner.profiler.GetStats()
+        self.listCtrl.Freeze()
+        self.listCtrl.DeleteAllItems()
+        for i, s in enumerate(stats):
+            name = f"{s['path']}.{s['handler']}" if s['path'] else s['handler']
+            if s['function']:
+                name += f" > {s['function']}()"
+            self.listCtrl.InsertItem(i, name)
+            self.listCtrl.SetItem(i, 1, str(s['count']))
+            for col, key in enumerate(("total", "mean", "p95", "max"), 2):
+                self.listCtrl.SetItem(i, col, f"{s[key]*1000:.2f}")
+        self.listCtrl.Thaw()
+
+    def UpdateFrameTiming(self):
+        timing = self.stackManager.frameTiming
+        if not timing:
+            self.frameLabel.SetLabel("")
+            return
+        summary = timing.GetSummary()
+        phases = ", ".join(f"{phase} {summary[phase]['mean']*1000:.2f}" for phase in timing.PHASES)
+        self.frameLabel.SetLabel(f"Tick {summary['total']['mean']*1000:.2f} ms (max {summary['total']['max']*1000:.2f}), "
+                                 f"paint {summary['paint']['mean']*1000:.2f} ms (max {summary['paint']['max']*1000:.2f}), "
+                                 f"{summary['pixels']['mean']/1000:.0f}K px/paint, "
+                                 f"jitter {summary['jitter']['mean']*1000:.2f} ms, {summary['skipped']} frames skipped\n"
+                                 f"Mean ms: {phases}")
+
+    def UpdateCacheStats(self):
+        regions = HitRegionCache.shared().GetStats()
+        texts = TextLayoutCache.shared().GetStats()
+        paints = PaintResources.shared().GetStats()
+        images = ImageCache.shared().GetStats()
+        counts = (ViewModel.transformRebuilds, self.stackManager.timerCount)
+        rebuilds = counts[0] - self.lastTransformCounts[0]
+        ticks = counts[1] - self.lastTransformCounts[1]
+        self.lastTransformCounts = counts
+        layers = self.stackManager.layerCache.GetStats()
+        layerRebuilds = layers['rebuilds'] - self.lastLayerRebuilds
+        self.lastLayerRebuilds = layers['rebuilds']
+        self.cacheLabel.SetLabel(f"Hit regions: {regions['entries']} cached, {regions['bytes']/1024:.0f} KB, "
+                                 f"{regions['hitRate']*100:.0f}% hits, {regions['evictions']} evicted\n"
+                                 f"Text layouts: {texts['entries']} cached, {texts['hitRate']*100:.0f}% hits, "
+                                 f"{texts['evictions']} evicted\n"
+                                 f"Pens, brushes, colours and fonts: {paints['entries']} cached, "
+                                 f"{paints['hitRate']*100:.0f}% hits, {paints['evictions']} evicted\n"
+                                 f"Images: {images['entries']} cached, {images['bytes']/1024/1024:.1f} MB, "
+                                 f"{images['pinned']} pinned, {images['hitRate']*100:.0f}% hits, {images['evictions']} evicted\n"
+                                 f"Transforms: {rebuilds/max(1, ticks):.1f} rebuilt per frame\n"
+                                 f"Layers: {layers['layers']} holding {layers['layeredObjects']} objects, "
+                                 f"{layers['bytes']/1024:.0f} KB, {layerRebuilds} rebuilt")
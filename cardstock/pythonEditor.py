@@ -96,6 +96,11 @@ class PythonEditor(stc.StyledTextCtrl):
         self.IndicatorSetAlpha(2, 127)
         self.IndicatorSetUnder(2, True)
 
+        self.IndicatorSetStyle(3, stc.STC_INDIC_FULLBOX)
+        self.IndicatorSetForeground(3, wx.Colour('orange'))
+        self.IndicatorSetAlpha(3, 80)
+        self.IndicatorSetUnder(3, True)
+
         self.AutoCompSetAutoHide(False)
         self.AutoCompSetIgnoreCase(True)
         self.AutoCompSetFillUps("\t\r\n")
@@ -241,6 +246,14 @@ class PythonEditor(stc.StyledTextCtrl):
         self.SetIndicatorCurrent(2)
         self.IndicatorFillRange(startPos, length)
 
+    def ClearHotLineMarks(self):
+        self.SetIndicatorCurrent(3)
+        self.IndicatorClearRange(0, self.GetLastPosition())
+
+    def MarkHotLine(self, startPos, length):
+        self.SetIndicatorCurrent(3)
+        self.IndicatorFillRange(startPos, length)
+
     def ScanFinished(self):
         if self.currentModel and self.cPanel:
             key = self.currentModel.GetPath() + "." + self.currentHandler
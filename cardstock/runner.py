@@ -6,7 +6,6 @@
 # This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
 # of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import re
 import sys
 import os
 import traceback
@@ -14,16 +13,22 @@ import traceback
 import requests
 import wx
 import types
+import functools
 from uiCard import Card
 import colorsys
-from time import sleep, time
+from time import sleep, time, perf_counter
 import math
 from errorListWindow import CardStockError
+from handlerCache import HandlerCache, CompileHandlerSource
 import threading
 from codeRunnerThread import CodeRunnerThread, RunOnMainSync, RunOnMainAsync
 import queue
+from taskQueue import TaskQueue
+from handlerProfiler import HandlerProfiler
+from sampleProfiler import SampleProfiler
+from traceRecorder import TraceRecorder
 import sanitizer
-from enum import Enum
+from enum import Enum, IntEnum
 import simpleaudio
 import consoleWindow
 
@@ -44,6 +49,17 @@ class TaskType (Enum):
     CallbackMain = 7    # Run a callback func on the main thread.  Used for synchronization.
 
 
+class TaskPriority (IntEnum):
+    """ Priority classes of tasks in the handlerQueue, from most to least urgent """
+    Input = 0       # Mouse, key, and other user input handlers, and console code
+    Setup = 1       # Setting up a new card, and other event handlers
+    Timer = 2       # run_after_delay() and animation on_finished functions, and on_bounce
+    Periodic = 3    # on_periodic, refreshes, and (as barriers) callbacks to the main thread and stopping
+
+
+noValue = ("no", "value")  # Marks a var that didn't exist/had no value (not even None) before a handler ran
+
+
 class Runner():
     """
     The Runner object runs all of the stack's user-written event handlers.  It keeps track of user variables, so that they
@@ -65,6 +81,69 @@ class Runner():
     injects a SystemExit("Return") exception into the runnerThread, so it will stop and allow us to close viewer.
     """
 
+    # For each event, the variables to set for its handlers, besides self, and how to get each value from
+    # (runner, uiModel, mouse_pos, key_name, arg).  If the event has a check function, only set these variables when it
+    # passes, for events that don't always get their arguments.  A getter can return noValue to leave its variable as is.
+    eventArgBindings = {
+        "on_message": (lambda p, k, a: a,
+                       (("message", lambda r, m, p, k, a: a),)),
+        "on_card_stock_link": (None,
+                               (("message", lambda r, m, p, k, a: a),)),
+        "on_done_loading": (lambda p, k, a: a,
+                            (("URL", lambda r, m, p, k, a: a[0]),
+                             ("did_load", lambda r, m, p, k, a: a[1]))),
+        "on_selection_changed": (None,
+                                 (("is_selected", lambda r, m, p, k, a: a),)),
+        "on_resize": (None,
+                      (("is_initial", lambda r, m, p, k, a: a),)),
+        "on_periodic": (None,
+                        (("elapsed_time", lambda r, m, p, k, a: r.PeriodicElapsedTime(m)),)),
+        "on_mouse_enter": (lambda p, k, a: p,
+                           (("mouse_pos", lambda r, m, p, k, a: p),)),
+        "on_mouse_press": (lambda p, k, a: p,
+                           (("mouse_pos", lambda r, m, p, k, a: p),)),
+        "on_mouse_move": (lambda p, k, a: p,
+                          (("mouse_pos", lambda r, m, p, k, a: p),)),
+        "on_mouse_release": (lambda p, k, a: p,
+                             (("mouse_pos", lambda r, m, p, k, a: p),)),
+        "on_mouse_exit": (lambda p, k, a: p,
+                          (("mouse_pos", lambda r, m, p, k, a: p),)),
+        "on_key_press": (lambda p, k, a: k,
+                         (("key_name", lambda r, m, p, k, a: k),)),
+        "on_key_release": (lambda p, k, a: k,
+                           (("key_name", lambda r, m, p, k, a: k),)),
+        "on_key_hold": (lambda p, k, a: k,
+                        (("key_name", lambda r, m, p, k, a: k),
+                         ("elapsed_time", lambda r, m, p, k, a: r.KeyHoldElapsedTime(k) if a else noValue))),
+        "on_bounce": (lambda p, k, a: a,
+                      (("other_object", lambda r, m, p, k, a: a[0]),
+                       ("edge", lambda r, m, p, k, a: a[1]))),
+    }
+    selfBinding = ("self", lambda r, m, p, k, a: m.GetProxy())
+
+    # Only the latest queued task for these events matters, so a new one replaces an older one still waiting in the
+    # handlerQueue for the same object (and key)
+    coalescedEvents = {"on_mouse_move", "on_key_hold", "on_resize"}
+
+    # Priority classes for handler tasks.  Events not listed here use TaskPriority.Setup.
+    handlerPriorities = {
+        "on_mouse_enter": TaskPriority.Input,
+        "on_mouse_press": TaskPriority.Input,
+        "on_mouse_move": TaskPriority.Input,
+        "on_mouse_release": TaskPriority.Input,
+        "on_mouse_exit": TaskPriority.Input,
+        "on_key_press": TaskPriority.Input,
+        "on_key_hold": TaskPriority.Input,
+        "on_key_release": TaskPriority.Input,
+        "on_click": TaskPriority.Input,
+        "on_text_changed": TaskPriority.Input,
+        "on_text_enter": TaskPriority.Input,
+        "on_selection_changed": TaskPriority.Input,
+        "on_card_stock_link": TaskPriority.Input,
+        "on_bounce": TaskPriority.Timer,
+        "on_periodic": TaskPriority.Periodic,
+    }
+
     def __init__(self, stackManager, viewer):
         self.stackManager = stackManager
         self.viewer = viewer
@@ -76,8 +155,12 @@ class Runner():
         self.lastHandlerStack = []
         self.didSetup = False
         self.runnerDepth = 0
+        self.savedVarsStack = []  # one reused list of saved var values per handler depth
+        self.selfOnlyBindings = (self.selfBinding,)
+        self.fullEventArgBindings = {name: (check, self.selfOnlyBindings + bindings)
+                                     for name, (check, bindings) in self.eventArgBindings.items()}
+        self.maxEventArgs = max(len(bindings) for check, bindings in self.fullEventArgBindings.values())
         self.numOnPeriodicsQueued = 0
-        self.rewrittenHandlerMap = {}
         self.onRunFinished = None
         self.funcDefs = {}
         self.lastCard = None
@@ -92,13 +175,21 @@ class Runner():
         # single item list means run SetupForCard
         # 5-item list means run a handler
         # 0-item list means just wake up to check if the thread is supposed to stop
-        self.handlerQueue = queue.Queue()
+        self.handlerQueue = TaskQueue(len(TaskPriority))
 
-        self.runnerThread = CodeRunnerThread(target=self.StartRunLoop)
+        self.runnerThread = CodeRunnerThread(target=self.StartRunLoop, name="Runner")
         self.runnerThread.start()
         self.stopRunnerThread = False
         self.generatingThumbnail = False
         self.compileCache = {}
+        self.compileLock = threading.Lock()
+        self.scrapedPaths = set()
+        self.precompileThread = None
+        self.handlerCache = HandlerCache.shared()
+        self.profiler = HandlerProfiler()
+        self.isProfiling = False
+        self.sampler = None
+        self.hotLines = []
 
         self.soundCache = {}
 
@@ -162,6 +253,8 @@ class Runner():
         self.keyCodeStringReverseMap = None
 
     def AddSyntaxErrors(self, analyzerSyntaxErrors):
+        if self.errors is None:
+            return
         for path, e in analyzerSyntaxErrors.items():
             parts = path.split('.')
             modelPath = '.'.join(path.split('.')[:-1])
@@ -169,11 +262,14 @@ class Runner():
             handlerName = parts[-1]
             lineNum = e[2]
             msg = f"SyntaxError in {self.HandlerPath(model, handlerName)}, line {lineNum}: {e[0]}"
+            if any(err.msg == msg for err in self.errors):
+                continue
             error = CardStockError(model.GetCard(), model, handlerName, lineNum, msg)
             self.errors.append(error)
 
     def AddCallbackToMain(self, func, *args):
-        self.handlerQueue.put((TaskType.CallbackMain, func, *args))
+        # Runs after every task queued before it, so callers can use it to sync up with them
+        self.handlerQueue.put((TaskType.CallbackMain, func, *args), TaskPriority.Periodic, isBarrier=True)
 
     def SetupForCard(self, cardModel):
         """
@@ -183,7 +279,47 @@ class Runner():
         if threading.currentThread() == self.runnerThread:
             self.SetupForCardInternal(cardModel)
         else:
-            self.handlerQueue.put((TaskType.SetupCard, cardModel))
+            if not self.precompileThread:
+                self.StartPrecompile()
+            self.handlerQueue.put((TaskType.SetupCard, cardModel), TaskPriority.Setup, isBarrier=True)
+
+    def StartPrecompile(self):
+        """
+        Compile all of the stack's handlers on a worker thread, so the runnerThread doesn't need to stop and compile
+        each handler the first time it runs.  Collect the handlers here on the main thread, where the model is stable.
+        """
+        handlers = []
+        def collect(model):
+            for handlerName, handlerStr in model.handlers.items():
+                handlerStr = handlerStr.strip()
+                if handlerStr != "":
+                    handlers.append((model, model.GetPath() + "." + handlerName, handlerName, handlerStr))
+            for child in model.childModels:
+                collect(child)
+        collect(self.stackManager.stackModel)
+
+        self.precompileThread = threading.Thread(target=self.PrecompileHandlers, args=(handlers,), daemon=True)
+        self.precompileThread.start()
+
+    def PrecompileHandlers(self, handlers):
+        """ Runs on the precompileThread. """
+        syntaxErrors = {}
+        for model, path, handlerName, handlerStr in handlers:
+            if self.stopRunnerThread:
+                return
+            if path in self.compileCache:
+                continue
+            try:
+                code = self.CompileHandler(path, handlerStr)
+            except SyntaxError as err:
+                syntaxErrors[path] = (err.msg, err.text, err.lineno, err.offset)
+                continue
+            with self.compileLock:
+                # Skip it if the handler changed or ran while we were compiling
+                if path not in self.compileCache and model.handlers.get(handlerName, "").strip() == handlerStr:
+                    self.compileCache[path] = code
+        if len(syntaxErrors) and not self.stopRunnerThread:
+            wx.CallAfter(self.AddSyntaxErrors, syntaxErrors)
 
     def SetupForCardInternal(self, cardModel):
         """
@@ -208,10 +344,43 @@ class Runner():
     def EnableUpdateVars(self, enable):
         self.shouldUpdateVars = enable
 
+    def EnableProfiling(self, enable):
+        self.isProfiling = enable
+
+    def EnableSampling(self, enable, rate=200):
+        """
+        Start or stop sampling which handler lines the runnerThread is running, rate times per second.  When the run
+        finishes, the hottest lines get reported in the error list.
+        """
+        if enable:
+            if not self.sampler:
+                self.sampler = SampleProfiler(self, rate)
+            self.sampler.Start()
+        elif self.sampler:
+            self.sampler.Stop()
+
+    def AddHotLineErrors(self):
+        # Report the lines where handlers spent the most time, from the sampler
+        self.sampler.Stop()
+        self.hotLines = self.sampler.GetHotLines()
+        for path, lineNum, fraction in self.hotLines:
+            parts = path.split('.')
+            model = self.stackManager.stackModel.GetModelFromPath('.'.join(parts[:-1]))
+            if not model:
+                continue
+            handlerName = parts[-1]
+            msg = f"Hot spot in {self.HandlerPath(model, handlerName)}, line {lineNum}: " \
+                  f"{int(fraction*100)}% of {self.sampler.numSamples} samples"
+            error = CardStockError(model.GetCard(), model, handlerName, lineNum, msg)
+            error.count = 1
+            self.errors.append(error)
+
     def HandlerChanged(self, model, handlerName):
         path = model.GetPath() + "." + handlerName
-        if path in self.compileCache:
-            del self.compileCache[path]
+        with self.compileLock:
+            if path in self.compileCache:
+                del self.compileCache[path]
+            self.scrapedPaths.discard(path)
 
     def StopTimers(self):
         for t in self.timers:
@@ -227,7 +396,7 @@ class Runner():
             self.stopRunnerThread = True
             self.StopTimers()
             self.stackReturnQueue.put(None)  # Stop waiting for a run_stack() call to return
-            self.handlerQueue.put((TaskType.Wake, )) # Wake up the runner thread get() call so it can see that we're stopping
+            self.handlerQueue.put((TaskType.Wake, ), TaskPriority.Periodic, isBarrier=True) # Wake up the runner thread get() call so it can see that we're stopping
 
             def waitAndYield(duration):
                 # wait up to duration seconds for the stack to finish running
@@ -264,6 +433,10 @@ class Runner():
 
             self.runnerThread = None
 
+        if self.sampler and self.errors is not None:
+            self.AddHotLineErrors()
+        self.sampler = None
+
         self.StopTimers()
         self.lastHandlerStack = None
         self.lastCard = None
@@ -273,7 +446,13 @@ class Runner():
         self.clientVars = None
         self.timers = None
         self.varUpdateTimer = None
-        self.rewrittenHandlerMap = None
+        if self.precompileThread:
+            # Let the precompileThread finish the handler it's on, so it's done using the handlerCache
+            self.stopRunnerThread = True
+            self.precompileThread.join()
+            self.precompileThread = None
+        self.handlerCache.Save()
+        self.handlerCache = None
         self.funcDefs = None
         self.handlerQueue = None
         self.stackManager = None
@@ -287,7 +466,7 @@ class Runner():
         self.stackSetupValue = None
 
     def EnqueueRefresh(self):
-        self.handlerQueue.put((TaskType.Wake, ))
+        self.handlerQueue.put((TaskType.Wake, ), TaskPriority.Periodic)
 
     def EnqueueFunction(self, func, *args, **kwargs):
         """
@@ -299,14 +478,14 @@ class Runner():
         """
         if not args: args = ()
         if not kwargs: kwargs = {}
-        self.handlerQueue.put((TaskType.Func, func, args, kwargs))
+        self.handlerQueue.put((TaskType.Func, func, args, kwargs), TaskPriority.Timer)
 
     def EnqueueCode(self, code, *args, **kwargs):
         """
         Add a code string to be run on the runner queue.
         This is used to run code from the Console window in the viewer app.
         """
-        self.handlerQueue.put((TaskType.Code, code))
+        self.handlerQueue.put((TaskType.Code, code), TaskPriority.Input)
 
     def StartRunLoop(self):
         """
@@ -325,7 +504,6 @@ class Runner():
                     # This is an enqueued task meant to Refresh after running all other tasks,
                     # and also serves to wake up the runner thread for stopping.
                     if not self.stopRunnerThread:
-                        self.stackManager.view.Refresh()  # TODO: This should not need to be called?
                         self.stackManager.view.RefreshIfNeeded()
                     if self.stopRunnerThread:
                         break
@@ -397,9 +575,86 @@ class Runner():
         else:
             if handlerName == "on_periodic":
                 self.numOnPeriodicsQueued += 1
-            self.handlerQueue.put((TaskType.Handler, uiModel, handlerName, handlerStr, mouse_pos, key_name, arg))
+            task = (TaskType.Handler, uiModel, handlerName, handlerStr, mouse_pos, key_name, arg)
+            priority = self.handlerPriorities.get(handlerName, TaskPriority.Setup)
+            if handlerName in self.coalescedEvents:
+                mergeFunc = self.MergeResizeTasks if handlerName == "on_resize" else None
+                self.handlerQueue.put(task, priority, (uiModel, handlerName, key_name), mergeFunc, handlerName)
+            else:
+                self.handlerQueue.put(task, priority)
         return True
 
+    @staticmethod
+    def MergeResizeTasks(oldTask, newTask):
+        # Keep is_initial=True if the dropped on_resize had it
+        return newTask[:6] + (oldTask[6] or newTask[6],)
+
+    def GetQueueStats(self):
+        """
+        Returns counts, by event name, of queued handler tasks that were dropped or merged into newer ones, and the
+        time tasks waited in the queue, by priority class name.
+        """
+        stats = self.handlerQueue.GetStats()
+        stats["wait"] = {p.name: stats["wait"][p] for p in TaskPriority}
+        return stats
+
+    def BindEventArgs(self, uiModel, handlerName, mouse_pos, key_name, arg):
+        """
+        Set self, and the variables this event's handlers expect, like mouse_pos or key_name, into clientVars.  Save
+        their old values into the saved list for this handler depth, which gets reused, so this doesn't allocate a new
+        container on every call.  Returns the bindings used, to pass to UnbindEventArgs() after the handler runs.
+        """
+        bindings = self.selfOnlyBindings
+        entry = self.fullEventArgBindings.get(handlerName)
+        if entry and (entry[0] is None or entry[0](mouse_pos, key_name, arg)):
+            bindings = entry[1]
+
+        depth = self.runnerDepth - 1
+        if depth >= len(self.savedVarsStack):
+            self.savedVarsStack.append([None] * self.maxEventArgs)
+        saved = self.savedVarsStack[depth]
+        clientVars = self.clientVars
+        i = 0
+        for name, getter in bindings:
+            saved[i] = clientVars.get(name, noValue)
+            value = getter(self, uiModel, mouse_pos, key_name, arg)
+            if value is not noValue:
+                clientVars[name] = value
+            i += 1
+        return bindings
+
+    def UnbindEventArgs(self, bindings):
+        """ Restore the values saved by BindEventArgs(), and remove vars that didn't exist before. """
+        saved = self.savedVarsStack[self.runnerDepth - 1]
+        clientVars = self.clientVars
+        i = 0
+        for name, getter in bindings:
+            v = saved[i]
+            if v is noValue:
+                clientVars.pop(name, None)
+            else:
+                clientVars[name] = v
+            saved[i] = None
+            i += 1
+
+    def PeriodicElapsedTime(self, uiModel):
+        now = time()
+        if uiModel.lastOnPeriodicTime:
+            elapsed_time = now - uiModel.lastOnPeriodicTime
+        else:
+            elapsed_time = now - self.stackStartTime
+        uiModel.lastOnPeriodicTime = now
+        return elapsed_time
+
+    def KeyHoldElapsedTime(self, key_name):
+        if key_name in self.keyTimings:
+            now = time()
+            elapsed_time = now - self.keyTimings[key_name]
+            self.keyTimings[key_name] = now
+            return elapsed_time
+        # Shouldn't happen!  But just in case, return something that won't crash if the users divides by it
+        return 0.01
+
     def RunHandlerInternal(self, uiModel, handlerName, handlerStr, mouse_pos, key_name, arg):
         """ Run an eventHandler.  This always runs on the runnerThread. """
         if not self.didSetup:
@@ -410,116 +665,15 @@ class Runner():
 
         self.runnerDepth += 1
 
-        noValue = ("no", "value")  # Use this if this var didn't exist/had no value (not even None)
-
         # Keep this method re-entrant, by storing old values (or lack thereof) of anything we set here,
         # (like self, key, etc.) and replacing or deleting them at the end of the run.
-        oldVars = {}
-
-        if "self" in self.clientVars:
-            oldVars["self"] = self.clientVars["self"]
-        else:
-            oldVars["self"] = noValue
-        self.clientVars["self"] = uiModel.GetProxy()
-
-        if arg and handlerName == "on_message":
-            if "message" in self.clientVars:
-                oldVars["message"] = self.clientVars["message"]
-            else:
-                oldVars["message"] = noValue
-            self.clientVars["message"] = arg
-
-        if arg and handlerName == "on_done_loading":
-            if "URL" in self.clientVars:
-                oldVars["URL"] = self.clientVars["URL"]
-            else:
-                oldVars["URL"] = noValue
-            self.clientVars["URL"] = arg[0]
-            if "did_load" in self.clientVars:
-                oldVars["did_load"] = self.clientVars["did_load"]
-            else:
-                oldVars["did_load"] = noValue
-            self.clientVars["did_load"] = arg[1]
-
-        if handlerName == "on_card_stock_link":
-            if "message" in self.clientVars:
-                oldVars["message"] = self.clientVars["message"]
-            else:
-                oldVars["message"] = noValue
-            self.clientVars["message"] = arg
-
-        if handlerName == "on_selection_changed":
-            if "is_selected" in self.clientVars:
-                oldVars["is_selected"] = self.clientVars["is_selected"]
-            else:
-                oldVars["is_selected"] = noValue
-            self.clientVars["is_selected"] = arg
-
-        if handlerName == "on_resize":
-            if "is_initial" in self.clientVars:
-                oldVars["is_initial"] = self.clientVars["is_initial"]
-            else:
-                oldVars["is_initial"] = noValue
-            self.clientVars["is_initial"] = arg
-
-        if handlerName == "on_periodic":
-            if "elapsed_time" in self.clientVars:
-                oldVars["elapsed_time"] = self.clientVars["elapsed_time"]
-            else:
-                oldVars["elapsed_time"] = noValue
-            now = time()
-            if uiModel.lastOnPeriodicTime:
-                elapsed_time = now - uiModel.lastOnPeriodicTime
-            else:
-                elapsed_time = now - self.stackStartTime
-            uiModel.lastOnPeriodicTime = now
-            self.clientVars["elapsed_time"] = elapsed_time
-
-        if mouse_pos and handlerName.startswith("on_mouse"):
-            if "mouse_pos" in self.clientVars:
-                oldVars["mouse_pos"] = self.clientVars["mouse_pos"]
-            else:
-                oldVars["mouse_pos"] = noValue
-            self.clientVars["mouse_pos"] = mouse_pos
+        bindings = self.BindEventArgs(uiModel, handlerName, mouse_pos, key_name, arg)
 
-        if key_name and handlerName.startswith("on_key"):
-            if "key_name" in self.clientVars:
-                oldVars["key_name"] = self.clientVars["key_name"]
-            else:
-                oldVars["key_name"] = noValue
-            self.clientVars["key_name"] = key_name
-
-        if arg and handlerName == "on_key_hold":
-            if "elapsed_time" in self.clientVars:
-                oldVars["elapsed_time"] = self.clientVars["elapsed_time"]
-            else:
-                oldVars["elapsed_time"] = noValue
-            if key_name in self.keyTimings:
-                now = time()
-                elapsed_time = now - self.keyTimings[key_name]
-                self.keyTimings[key_name] = now
-                self.clientVars["elapsed_time"] = elapsed_time
-            else:
-                # Shouldn't happen!  But just in case, return something that won't crash if the users divides by it
-                self.clientVars["elapsed_time"] = 0.01
-
-        if arg and handlerName == "on_bounce":
-            if "other_object" in self.clientVars:
-                oldVars["other_object"] = self.clientVars["other_object"]
-            else:
-                oldVars["other_object"] = noValue
-            self.clientVars["other_object"] = arg[0]
-            if "edge" in self.clientVars:
-                oldVars["edge"] = self.clientVars["edge"]
-            else:
-                oldVars["edge"] = noValue
-            self.clientVars["edge"] = arg[1]
-
-        # rewrite handlers that use return outside of a function, and replace with an exception that we catch, to
-        # act like a return.
         path = uiModel.GetPath() + "." + handlerName
 
         self.lastHandlerStack.append((uiModel, handlerName))
+        tracer = TraceRecorder.current
+        startTime = perf_counter() if self.isProfiling or tracer else None
 
         error = None
         error_class = None
@@ -531,13 +685,15 @@ class Runner():
 
         try:
             isNew = False
-            if path in self.compileCache:
-                ast = self.compileCache[path]
-            else:
-                handlerStr = self.RewriteHandler(handlerStr)
-                ast = compile(handlerStr, "<string>", "exec")
-                self.compileCache[path] = ast
-                isNew = True
+            ast = self.compileCache.get(path)
+            if ast is None:
+                ast = self.CompileHandler(path, handlerStr)
+                with self.compileLock:
+                    self.compileCache[path] = ast
+            # Handlers may have been precompiled, so track their first run separately
+            isNew = path not in self.scrapedPaths
+            if isNew:
+                self.scrapedPaths.add(path)
             # Use this for noticing user-definitions of new functions
             if isNew:
                 oldClientVars = self.clientVars.copy()
@@ -579,15 +735,17 @@ class Runner():
                             line_number = trace[i].lineno
                         in_func.append((trace[i].name, trace[i].lineno))
 
+        if startTime is not None:
+            endTime = perf_counter()
+            if self.isProfiling:
+                self.profiler.Record(path, handlerName, "", endTime - startTime)
+            if tracer:
+                tracer.Complete(path, "handler", startTime, endTime)
+
         del self.lastHandlerStack[-1]
 
         # restore the old values from before this handler was called
-        for k, v in oldVars.items():
-            if v == noValue:
-                if k in self.clientVars:
-                    self.clientVars.pop(k)
-            else:
-                self.clientVars[k] = v
+        self.UnbindEventArgs(bindings)
 
         if error_class and self.errors is not None:
             msg = f"{error_class} in {self.HandlerPath(errModel, errHandlerName)}, line {line_number}: {detail}"
@@ -611,45 +769,13 @@ class Runner():
         if self.shouldUpdateVars:
             self.stackManager.UpdateVars()
 
-    def RewriteHandler(self, handlerStr):
-        # rewrite handlers that use return outside of a function, and replace with an exception that we catch, to
-        # act like a return.
-        if "return" in handlerStr:
-            if handlerStr in self.rewrittenHandlerMap:
-                # we cache the rewritten handlers
-                return self.rewrittenHandlerMap[handlerStr]
-            else:
-                lines = handlerStr.split('\n')
-                funcIndent = None
-                updatedLines = []
-                for line in lines:
-                    if funcIndent is not None:
-                        # if we were inside a function definition, check if it's done
-                        m = re.match(rf"^(\s{{{funcIndent}}})\b", line)
-                        if m:
-                            funcIndent = None
-                    if funcIndent is None:
-                        m = re.match(r"^(\s*)def ", line)
-                        if m:
-                            # mark that we're inside a function def now, so don't replace returns.
-                            funcIndent = len(m.group(1))
-                            updatedLines.append(line)
-                        else:
-                            # not inside a function def, so replace returns with a RuntimeError('Return')
-                            # and catch these later, while running the handler
-                            u = re.sub(r"^(\s*)return\b", r"\1raise RuntimeError('Return')", line)
-                            u = re.sub(r":\s+return\b", ": raise RuntimeError('Return')", u)
-                            updatedLines.append(u)
-                    else:
-                        # now we're inside a function def, so don't replace returns.  they're valid here!
-                        updatedLines.append(line)
-
-                updated = '\n'.join(updatedLines)
-                self.rewrittenHandlerMap[handlerStr] = updated  # cache the updated handler
-                return updated
-        else:
-            # No return used, so keep the handler as-is
-            return handlerStr
+    def CompileHandler(self, path, handlerStr):
+        # Use the on-disk cache of compiled handlers if we can, and otherwise compile and add this one to it
+        code = self.handlerCache.Get(path, handlerStr)
+        if code is None:
+            code = CompileHandlerSource(handlerStr)
+            self.handlerCache.Put(path, handlerStr, code)
+        return code
 
     def RunCodeWithExceptionHandling(self, code):
         self.RunWithExceptionHandling(code, None)
@@ -682,6 +808,9 @@ class Runner():
                     oldSelf = self.clientVars["self"]
                 self.clientVars["self"] = uiModel.GetProxy()
 
+        tracer = TraceRecorder.current
+        startTime = perf_counter() if (self.isProfiling or tracer) and uiModel else None
+
         try:
             if func:
                 func(*args, **kwargs)
@@ -712,6 +841,16 @@ class Runner():
             elif code:
                 print(f"{error_class}: {detail}", file=sys.stderr)
 
+        if startTime is not None:
+            endTime = perf_counter()
+            if self.isProfiling and not getattr(func, "isProfiledFunc", False):
+                # Attribute time in user functions to the handler that defined them.  Wrapped functions record
+                # themselves, but ones passed as callbacks before their handler finished running aren't wrapped.
+                self.profiler.Record(uiModel.GetPath(), self.funcDefs[funcName][1], funcName, endTime - startTime)
+            if tracer:
+                tracer.Complete(funcName + "()", "callback", startTime, endTime,
+                                args={"handler": uiModel.GetPath() + "." + self.funcDefs[funcName][1]})
+
         if error_class and errModel and self.errors is not None:
             msg = f"{error_class} in {self.HandlerPath(errModel, errHandlerName)}, line {line_number}: {detail}"
             if len(in_func) > 1:
@@ -744,9 +883,28 @@ class Runner():
     def ScrapeNewFuncDefs(self, oldVars, newVars, model, handlerName):
         # Keep track of where each user function has been defined, so we can send you to the right handler's code in
         # the Designer when the user clicks on an error in the ErrorList.
-        for (k, v) in newVars.items():
-            if isinstance(v, types.FunctionType) and (k not in oldVars or oldVars[k] != v):
-                self.funcDefs[k] = (model, handlerName)
+        newFuncs = [(k, v) for (k, v) in newVars.items()
+                    if isinstance(v, types.FunctionType) and (k not in oldVars or oldVars[k] != v)]
+        for (k, v) in newFuncs:
+            self.funcDefs[k] = (model, handlerName)
+            newVars[k] = self.ProfiledFunc(v, k, model, handlerName)
+
+    def ProfiledFunc(self, func, funcName, model, handlerName):
+        # Wrap a user function so that, while profiling, each call is recorded under the handler that defined it,
+        # including calls from other handlers and functions, and not just the ones the Runner makes itself.
+        runner = self
+
+        @functools.wraps(func)
+        def profiledFunc(*args, **kwargs):
+            if not runner.isProfiling:
+                return func(*args, **kwargs)
+            startTime = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                runner.profiler.Record(model.GetPath(), handlerName, funcName, perf_counter() - startTime)
+        profiledFunc.isProfiledFunc = True
+        return profiledFunc
 
     def HandlerPath(self, model, handlerName, card=None):
         if model.type in ["card", "stack"]:
@@ -1162,7 +1320,7 @@ class Runner():
 
     def ResetStopHandlingMouseEvent(self):
         if self.handlerQueue:
-            self.handlerQueue.put((TaskType.StopHandlingMouseEvent, ))
+            self.handlerQueue.put((TaskType.StopHandlingMouseEvent, ), TaskPriority.Input)
 
     def stop_handling_mouse_event(self):
         self.stopHandlingMouseEvent = True
@@ -0,0 +1,139 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import sys
+import threading
+from time import sleep
+
+
+class SampleProfiler(object):
+    """
+    Periodically samples which lines of handler code the Runner's runnerThread is running, by reading its stack from
+    sys._current_frames() on a background thread.  This works even while a handler is stuck in a long or infinite
+    loop, so we can tell the user where their code was spending its time.
+
+    Frames of handler code all have the filename "<string>".  Module-level handler frames are mapped back to their
+    handler path through the Runner's compileCache, and user function frames through the Runner's funcDefs.  Each
+    sample is stored as a tuple of (handler path, function name, line number) frames, outermost first, where the
+    handler path is the object's path + "." + handler name, and the function name is "" for a handler's own code.
+    """
+
+    def __init__(self, runner, rate=200):
+        self.runner = runner
+        self.interval = 1.0 / rate
+        self.samples = {}  # sample stack tuple -> count
+        self.numSamples = 0
+        self.codeToPath = {}  # id(code) -> handler path.  Code objects compare equal by content, so key them by id
+        self.thread = None
+        self.shouldStop = False
+
+    def Start(self):
+        if not self.thread:
+            self.shouldStop = False
+            self.thread = threading.Thread(target=self.RunSampler, daemon=True)
+            self.thread.start()
+
+    def Stop(self):
+        self.shouldStop = True
+        if self.thread:
+            self.thread.join(self.interval * 4)
+            self.thread = None
+
+    def RunSampler(self):
+        while not self.shouldStop:
+            runnerThread = self.runner.runnerThread
+            if not runnerThread:
+                break
+            frame = sys._current_frames().get(runnerThread.ident)
+            if frame:
+                sample = self.SampleFromFrame(frame)
+                if sample:
+                    self.samples[sample] = self.samples.get(sample, 0) + 1
+                    self.numSamples += 1
+            frame = None
+            sleep(self.interval)
+
+    def PathForCode(self, code):
+        path = self.codeToPath.get(id(code))
+        if path is None:
+            # The compileCache has changed since we last looked, so rebuild our reverse map
+            try:
+                self.codeToPath = {id(c): p for p, c in list(self.runner.compileCache.items())}
+            except RuntimeError:
+                return None
+            path = self.codeToPath.get(id(code))
+        return path
+
+    def SampleFromFrame(self, frame):
+        frames = []
+        while frame:
+            if frame.f_code.co_filename == "<string>":
+                frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+
+        sample = []
+        path = None
+        funcDefs = self.runner.funcDefs
+        for f in frames:
+            code = f.f_code
+            funcName = ""
+            if code.co_name == "<module>":
+                path = self.PathForCode(code)
+            elif funcDefs and code.co_name in funcDefs:
+                model, handlerName = funcDefs[code.co_name]
+                path = model.GetPath() + "." + handlerName
+                funcName = code.co_name
+            else:
+                # Comprehensions, lambdas, etc. belong to the handler or function that contains them
+                funcName = sample[-1][1] if sample else code.co_name
+            if path is not None:
+                sample.append((path, funcName, f.f_lineno))
+        return tuple(sample)
+
+    def GetFlatProfile(self):
+        """
+        Returns a list of {"path", "line", "self", "total"} dicts, sorted by self count, highest first.  "self" counts
+        samples where this line was running, and "total" counts samples where this line was anywhere on the stack.
+        """
+        selfCounts = {}
+        totalCounts = {}
+        for sample, count in list(self.samples.items()):
+            key = (sample[-1][0], sample[-1][2])
+            selfCounts[key] = selfCounts.get(key, 0) + count
+            for key in set((path, line) for path, funcName, line in sample):
+                totalCounts[key] = totalCounts.get(key, 0) + count
+        flat = [{"path": path, "line": line, "self": selfCounts.get((path, line), 0), "total": total}
+                for (path, line), total in totalCounts.items()]
+        flat.sort(key=lambda e: (e["self"], e["total"]), reverse=True)
+        return flat
+
+    def GetCallTree(self):
+        """ Returns a tree of {(path, funcName, line): {"count": n, "children": {...}}}, from the outermost frames. """
+        tree = {}
+        for sample, count in list(self.samples.items()):
+            level = tree
+            for frame in sample:
+                node = level.get(frame)
+                if not node:
+                    node = {"count": 0, "children": {}}
+                    level[frame] = node
+                node["count"] += count
+                level = node["children"]
+        return tree
+
+    def GetHotLines(self, maxLines=5, minFraction=0.05):
+        """ Returns up to maxLines of (path, line, fraction of all samples) for the lines that ran the most. """
+        if not self.numSamples:
+            return []
+        hot = []
+        for entry in self.GetFlatProfile()[:maxLines]:
+            fraction = entry["self"] / self.numSamples
+            if fraction >= minFraction:
+                hot.append((entry["path"], entry["line"], fraction))
+        return hot
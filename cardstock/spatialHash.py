@@ -0,0 +1,119 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import math
+
+
+class SpatialHash(object):
+    """
+    A uniform grid of square cells, mapping each cell to the items whose bounding boxes overlap it, so we can quickly
+    find the few items that might overlap a given box, without checking every item.  Boxes are (x1, y1, x2, y2)
+    tuples in card coordinates, with x1 <= x2 and y1 <= y2.  Items can be any hashable objects, and can be inserted,
+    moved and removed individually, or the whole hash can be cleared and rebuilt.
+    """
+
+    def __init__(self, cellSize=64):
+        self.cellSize = cellSize
+        self.cells = {}  # (col, row) -> set of items
+        self.boxes = {}  # item -> (box, cell range)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def __contains__(self, item):
+        return item in self.boxes
+
+    def Clear(self):
+        self.cells = {}
+        self.boxes = {}
+
+    def CellRange(self, box):
+        s = self.cellSize
+        return (math.floor(box[0] / s), math.floor(box[1] / s), math.floor(box[2] / s), math.floor(box[3] / s))
+
+    def Insert(self, item, box):
+        if item in self.boxes:
+            self.Remove(item)
+        cr = self.CellRange(box)
+        cells = self.cells
+        for col in range(cr[0], cr[2]+1):
+            for row in range(cr[1], cr[3]+1):
+                cell = cells.get((col, row))
+                if cell is None:
+                    cells[(col, row)] = {item}
+                else:
+                    cell.add(item)
+        self.boxes[item] = (box, cr)
+
+    def Remove(self, item):
+        entry = self.boxes.pop(item, None)
+        if entry:
+            cr = entry[1]
+            cells = self.cells
+            for col in range(cr[0], cr[2]+1):
+                for row in range(cr[1], cr[3]+1):
+                    cell = cells.get((col, row))
+                    if cell is not None:
+                        cell.discard(item)
+                        if not cell:
+                            del cells[(col, row)]
+
+    def Update(self, item, box):
+        """ Move an item to a new box.  Only touches the cells if the item's cell range changed. """
+        entry = self.boxes.get(item)
+        if entry and self.CellRange(box) == entry[1]:
+            self.boxes[item] = (box, entry[1])
+        else:
+            self.Insert(item, box)
+
+    def GetBox(self, item):
+        entry = self.boxes.get(item)
+        return entry[0] if entry else None
+
+    def Query(self, box):
+        """ Returns the set of items whose boxes overlap box. """
+        cr = self.CellRange(box)
+        cells = self.cells
+        boxes = self.boxes
+        found = set()
+        checked = set()
+        for col in range(cr[0], cr[2]+1):
+            for row in range(cr[1], cr[3]+1):
+                cell = cells.get((col, row))
+                if cell:
+                    for item in cell:
+                        if item not in checked:
+                            checked.add(item)
+                            b = boxes[item][0]
+                            if b[0] <= box[2] and box[0] <= b[2] and b[1] <= box[3] and box[1] <= b[3]:
+                                found.add(item)
+        return found
+
+    def QueryPoint(self, pt):
+        """ Returns the set of items whose boxes contain the point pt. """
+        s = self.cellSize
+        cell = self.cells.get((math.floor(pt[0] / s), math.floor(pt[1] / s)))
+        if not cell:
+            return set()
+        boxes = self.boxes
+        x, y = pt[0], pt[1]
+        found = set()
+        for item in cell:
+            b = boxes[item][0]
+            if b[0] <= x <= b[2] and b[1] <= y <= b[3]:
+                found.add(item)
+        return found
+
+    def QueryItem(self, item):
+        """ Returns the set of other items whose boxes overlap this item's box. """
+        entry = self.boxes.get(item)
+        if not entry:
+            return set()
+        found = self.Query(entry[0])
+        found.discard(item)
+        return found
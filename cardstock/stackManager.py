@@ -17,6 +17,8 @@ import wx
 from wx.lib.docview import CommandProcessor
 from time import time
 import json
+import math
+import threading
 from tools import *
 from appCommands import *
 import generator
@@ -35,6 +37,12 @@ from uiGroup import UiGroup, GroupModel
 from codeRunnerThread import RunOnMainSync, RunOnMainAsync
 import mediaSearchDialogs
 import flippedGCDC
+from frameTiming import FrameTiming
+from traceRecorder import TraceRecorder
+from spatialHash import SpatialHash
+from layerCache import LayerCache
+from imageCache import ImageCache
+import vectorMotion
 
 # ----------------------------------------------------------------------
 
@@ -42,7 +50,8 @@ class DeferredRefreshWindow(wx.Window):
     """
     This wx.Window subclass allows deferring Refresh() calls.  When this feature is enabled, it flags
     when a Refresh() has been requested, but doesn't call wx.Window.Refresh() until receiving a
-    RefreshIfNeeded() call.
+    RefreshIfNeeded() call.  Refreshes of just a rect are collected into one dirty rect, unless anything asks for a
+    full Refresh().
     This class also helps with flipping the vertical coordinate axis of the stack, by using bottom-left corner as the
     origin, and making upwards==positive, on all calls to ScreenToClient(), which is used to wrap all
     event.GetPosition() calls throughout the code.
@@ -51,30 +60,57 @@ class DeferredRefreshWindow(wx.Window):
         super().__init__(*args, **kwargs)
         self.stackManager = stackManager
         self.needsRefresh = False
+        self.dirtyRect = None  # None means refresh everything
         self.deferredRefresh = False
         self.didResize = False
+        self.dirtyModels = set()  # Models changed without a Notify(), repainted by the next RefreshIfNeeded()
+        self.dirtyModelsLock = threading.Lock()
 
     def UseDeferredRefresh(self, deferred):
         self.deferredRefresh = deferred
 
     def Refresh(self, eraseBackground=True, rect=None):
         if not self.deferredRefresh:
-            super().Refresh(eraseBackground)
-        else:
+            super().Refresh(eraseBackground, rect)
+        elif rect is None:
+            self.needsRefresh = True
+            self.dirtyRect = None
+        elif not self.needsRefresh:
             self.needsRefresh = True
+            self.dirtyRect = wx.Rect(rect)
+        elif self.dirtyRect is not None:
+            self.dirtyRect = self.dirtyRect.Union(rect)
 
     def Update(self):
         if not self.deferredRefresh:
             super().Update()
 
+    def MarkModelDirty(self, model):
+        """
+        Called from any thread when a model changes how it looks without a Notify(), so its old and new
+        bounds still end up in the dirty rect.
+        """
+        if self.deferredRefresh:
+            with self.dirtyModelsLock:
+                self.dirtyModels.add(model)
+
     @RunOnMainAsync
     def RefreshIfNeeded(self):
         if self.didResize:
             self.stackManager.RepositionViews()
             self.didResize = False
+        if self.dirtyModels:
+            with self.dirtyModelsLock:
+                models = self.dirtyModels
+                self.dirtyModels = set()
+            for model in models:
+                ui = self.stackManager.GetUiViewByModel(model)
+                if ui:
+                    ui.RefreshBounds()
         if self.needsRefresh:
             self.needsRefresh = False
-            super().Refresh(True, None)
+            super().Refresh(True, self.dirtyRect)
+            self.dirtyRect = None
             super().Update()
 
     def ScreenToClient(self, *args, **kwargs):
@@ -106,6 +142,10 @@ class StackManager(object):
         self.resPathMan = resourcePathManager.ResourcePathManager(self)
         self.lastOnPeriodicTime = None
         self.lastMouseDownView = None
+        self.frameTiming = None
+        self.hitIndex = None
+        self.layerCache = LayerCache(self)
+        self.nameToViewMap = None  # name -> UiView, for this card's views, rebuilt by GetUiViewByName() when needed
 
         self.analyzer = analyzer.CodeAnalyzer(self)
         self.stackModel = StackModel(self)
@@ -130,6 +170,7 @@ class StackManager(object):
         if wx.Platform != '__WXMAC__':
             # Skip double-buffering on Mac, as it's much faster without it, and looks great
             self.buffer = None
+        self.needsFullPaint = True
 
         if not self.isEditing:
             self.timer = wx.Timer(self.view)
@@ -151,6 +192,7 @@ class StackManager(object):
         if self.timer:
             self.timer.Stop()
         self.timer = None
+        self.EnableFrameTiming(False)
 
         if self.runner:
             self.runner.CleanupFromRun()
@@ -201,8 +243,18 @@ class StackManager(object):
                 if uiView.view:
                     uiView.view.SetCursor(wx.Cursor(viewCursor if viewCursor else cursor))
 
+    def EnableFrameTiming(self, enable, logFilename=None):
+        """ Start or stop recording the time spent in each phase of OnPeriodicTimer() and in OnPaint(). """
+        if self.frameTiming:
+            self.frameTiming.Close()
+        self.frameTiming = FrameTiming(logFilename) if enable else None
+
     def OnPeriodicTimer(self, event):
         if not self.runner.stopRunnerThread:
+            timing = self.frameTiming
+            if timing: timing.StartTick()
+            tracer = TraceRecorder.current
+            if tracer: traceStart = tracer.Now()
             didRun = False
             self.timerCount += 1
             # Determine elapsed time since last round of on_periodic calls
@@ -214,31 +266,44 @@ class StackManager(object):
             # Run animations at 60 Hz / FPS
             allUi = self.uiCard.GetAllUiViews()
             onFinishedCalls = []
+            frames = None
+            moved = vectorMotion.MoveBySpeed([ui.model for ui in allUi], elapsed_time)
+            if moved:
+                (didMove, frames) = moved
+                if didMove:
+                    didRun = True
             if self.uiCard.RunAnimations(onFinishedCalls, elapsed_time):
                 didRun = True
             for ui in allUi:
-                if ui.RunAnimations(onFinishedCalls, elapsed_time):
+                if ui.RunAnimations(onFinishedCalls, elapsed_time, moved is None):
                     didRun = True
+            if timing: timing.EndPhase(0)
             # Let all animations process, before running their on_finished handlers,
             # which could start new animations.
             for c in onFinishedCalls:
                 c()
             self.lastOnPeriodicTime = now
+            if timing: timing.EndPhase(1)
 
             # Check for all collisions
             collisions = {}
-            for ui in allUi:
-                ui.FindCollisions(collisions)
+            broadPhase = self.BuildBounceBroadPhase(allUi, elapsed_time, frames)
+            if broadPhase:
+                for ui in allUi:
+                    ui.FindCollisions(collisions, broadPhase, elapsed_time)
+            if timing: timing.EndPhase(2)
 
             # Perform any bounces
             for (k,v) in collisions.items():
                 v[0].PerformBounce(v, elapsed_time)
                 didRun = True
+            if timing: timing.EndPhase(3)
 
             # Run on_periodic at 30 Hz
             if self.timerCount % 2 == 0 and self.runner.numOnPeriodicsQueued == 0:
                 if self.uiCard.OnPeriodic(event):
                     didRun = True
+            if timing: timing.EndPhase(4)
 
             if didRun:
                 self.runner.EnqueueRefresh()
@@ -246,6 +311,51 @@ class StackManager(object):
                     self.UpdateVars()
             else:
                 self.view.RefreshIfNeeded()
+            if timing:
+                timing.EndPhase(5)
+                timing.EndTick()
+            if tracer:
+                tracer.Complete("tick", "tick", traceStart, args={"count": self.timerCount, "didRun": didRun})
+
+    BOUNCE_MARGIN = 10  # Extra distance, beyond a tick's worth of motion, at which bounce pairs get the exact test
+
+    def BuildBounceBroadPhase(self, allUi, elapsed_time, frames=None):
+        """
+        Returns a SpatialHash of the absolute frames of all visible objects that are moving and bouncing, and of the
+        objects they bounce off of, so FindCollisions() can skip the exact edge test for pairs that are nowhere near
+        each other.  Each frame is inflated by the object's own motion over about two ticks, plus BOUNCE_MARGIN, so
+        pairs start getting checked a little before they can touch.  Returns None if nothing is bouncing.
+        Frames already computed by vectorMotion.MoveBySpeed() this tick can be passed in, as a dict of model -> (x, y,
+        width, height).
+        """
+        movers = [ui.model for ui in allUi if ui.model.bounceObjs and not ui.model.didSetDown and
+                  ui.model.properties["is_visible"] and tuple(ui.model.properties["speed"]) != (0, 0)]
+        if not movers:
+            return None
+
+        models = set(movers)
+        for m in movers:
+            models.update(m.bounceObjs.keys())
+
+        dt = max(elapsed_time, 1/60) * 2
+        boxes = []
+        totalSize = 0
+        for m in models:
+            if m.didSetDown or not m.properties["is_visible"]:
+                continue
+            f = frames.get(m) if frames else None
+            if not f:
+                f = tuple(m.GetAbsoluteFrame())
+            speed = m.properties["speed"]
+            margin = self.BOUNCE_MARGIN + max(abs(speed[0]), abs(speed[1])) * dt
+            boxes.append((m, (f[0] - margin, f[1] - margin, f[0] + f[2] + margin, f[1] + f[3] + margin)))
+            totalSize += f[2] + f[3]
+
+        # Cells about twice the average object size keep most objects in just a few cells
+        broadPhase = SpatialHash(max(32, totalSize / max(1, len(boxes))))
+        for m, box in boxes:
+            broadPhase.Insert(m, box)
+        return broadPhase
 
     def SetTool(self, tool):
         if self.tool:
@@ -270,6 +380,8 @@ class StackManager(object):
                 for childUi in ui.uiViews:
                     DelFromMap(childUi)
         DelFromMap(self.uiCard)
+        self.InvalidateHitIndex()
+        self.InvalidateNameIndex()
 
         self.uiCard.RemoveUiViews()
 
@@ -311,6 +423,7 @@ class StackManager(object):
             if index is not None:
                 cardModel = self.stackModel.GetCardModel(index)
                 self.CreateViews(cardModel)
+                self.PinCardImages()
                 self.SelectUiView(self.uiCard)
                 if self.designer:
                     self.designer.UpdateCardList()
@@ -329,6 +442,11 @@ class StackManager(object):
             if self.designer:
                 self.designer.Thaw()
 
+    def PinCardImages(self):
+        # Keep the ImageCache from evicting the images shown on this card, and let it evict the last card's
+        paths = [ui.imagePath for ui in self.uiCard.GetAllUiViews() if ui.model.type == "image" and ui.imagePath]
+        ImageCache.shared().SetPinnedPaths(paths)
+
     def SetDesigner(self, designer):
         self.designer = designer
 
@@ -627,6 +745,8 @@ class StackManager(object):
                 for childUi in ui.uiViews:
                     AddToMap(childUi)
         AddToMap(uiView)
+        self.InvalidateHitIndex()
+        self.InvalidateNameIndex()
 
         if uiView:
             self.uiCard.uiViews.append(uiView)
@@ -730,13 +850,18 @@ class StackManager(object):
             return self.modelToViewMap[model]
         return None
 
+    def InvalidateNameIndex(self):
+        self.nameToViewMap = None
+
     def GetUiViewByName(self, name):
         if self.uiCard.model.properties["name"] == name:
             return self.uiCard
-        for ui in self.uiCard.GetAllUiViews():
-            if ui.model.properties["name"] == name:
-                return ui
-        return None
+        if self.nameToViewMap is None:
+            nameMap = {}
+            for ui in reversed(self.uiCard.GetAllUiViews()):
+                nameMap[ui.model.properties["name"]] = ui
+            self.nameToViewMap = nameMap
+        return self.nameToViewMap.get(name)
 
     def RemoveUiViewByModel(self, viewModel):
         """
@@ -755,6 +880,8 @@ class StackManager(object):
                     for childUi in ui.uiViews:
                         DelFromMap(childUi)
             DelFromMap(ui)
+            self.InvalidateHitIndex()
+            self.InvalidateNameIndex()
 
             self.uiCard.uiViews.remove(ui)
             if ui.model.parent:
@@ -1027,6 +1154,25 @@ class StackManager(object):
     def UpdateBuffer(self):
         if wx.Platform != '__WXMAC__':
             self.buffer = wx.Bitmap.FromRGBA(self.view.GetSize().Width, self.view.GetSize().Height)
+            self.needsFullPaint = True
+
+    def RefreshCardBox(self, box):
+        """
+        Refresh just the (x1, y1, x2, y2) box of the card, in card coords, or the whole view if box is None.  While
+        editing, selection boxes and tools draw outside of objects' boxes, so always refresh the whole view then.
+        """
+        if box is None or self.isEditing:
+            self.view.Refresh()
+            return
+        x1, y1 = math.floor(box[0]) - 1, math.floor(box[1]) - 1
+        rect = wx.Rect(x1, y1, math.ceil(box[2]) + 2 - x1, math.ceil(box[3]) + 2 - y1)
+        self.view.Refresh(True, self.ConvRect(rect))
+
+    def CardBoxForRect(self, rect):
+        # Convert a rect in view coords into an (x1, y1, x2, y2) box in card coords
+        tl = self.ConvPoint(rect.TopLeft, conv_ToDIP=True)
+        br = self.ConvPoint(rect.BottomRight + (1, 1), conv_ToDIP=True)
+        return (min(tl.x, br.x), min(tl.y, br.y), max(tl.x, br.x), max(tl.y, br.y))
 
     def OnEraseBackground(self, event):
         # No thank you!
@@ -1034,6 +1180,10 @@ class StackManager(object):
         pass
 
     def OnPaint(self, event):
+        timing = self.frameTiming
+        if timing: timing.StartPaint()
+        tracer = TraceRecorder.current
+        if tracer: traceStart = tracer.Now()
         if wx.Platform == '__WXMAC__':
             # Skip double-buffering on Mac, as it's much faster without it, and looks great
             dc = wx.PaintDC(self.view)
@@ -1042,10 +1192,24 @@ class StackManager(object):
                 self.UpdateBuffer()
             dc = wx.MemoryDC(self.buffer)
 
+        # While running, only repaint the objects within the area that needs it
+        viewSize = self.view.GetSize()
+        updateRect = None
+        if not self.isEditing and not self.needsFullPaint:
+            updateRect = self.view.GetUpdateRegion().GetBox()
+            if updateRect.IsEmpty() or updateRect.Contains(wx.Rect(viewSize)):
+                updateRect = None
+        self.needsFullPaint = False
+
         gc = flippedGCDC.FlippedGCDC(dc, self)
         gc.cachedGC = gc.GetGraphicsContext()
 
-        self.uiCard.DoPaint(gc)
+        if updateRect:
+            gc.SetClippingRegion(updateRect)
+        if self.isEditing:
+            self.uiCard.DoPaint(gc)
+        else:
+            self.layerCache.Paint(gc, self.CardBoxForRect(updateRect) if updateRect else None)
         if self.isEditing:
             self.uiCard.DoPaintSelectionBoxes(gc)
             if self.tool:
@@ -1054,6 +1218,8 @@ class StackManager(object):
         if wx.Platform != '__WXMAC__':
             wx.BufferedPaintDC(self.view, self.buffer)
         del gc.cachedGC
+        if timing: timing.EndPaint(updateRect.width * updateRect.height if updateRect else viewSize.width * viewSize.height)
+        if tracer: tracer.Complete("paint", "paint", traceStart)
 
     def HitTest(self, pt, selectedFirst=True):
         # First find selected objects, so you can move a selected object from under another
@@ -1080,10 +1246,41 @@ class StackManager(object):
                     return hit
         return self.uiCard
 
+    HIT_INDEX_CELL_SIZE = 64
+
+    def GetHitIndex(self):
+        """
+        Returns a SpatialHash of the hit test frames of all UiViews on the card, building it if needed.  UiViews keep
+        their own entries up to date as they move, resize and rotate, and adding or removing views invalidates it.
+        """
+        if self.hitIndex is None:
+            self.hitIndex = SpatialHash(self.HIT_INDEX_CELL_SIZE)
+            for uiView in self.uiCard.GetAllUiViews():
+                self.hitIndex.Insert(uiView, uiView.GetHitTestBox())
+        return self.hitIndex
+
+    def InvalidateHitIndex(self):
+        self.hitIndex = None
+
+    def UpdateHitIndex(self, uiView):
+        if self.hitIndex is not None and uiView in self.hitIndex:
+            self.hitIndex.Update(uiView, uiView.GetHitTestBox())
+
+    @staticmethod
+    def ZOrderKey(uiView):
+        # Sorts views in the same order as GetAllUiViews(): back to front, with group children right after their group
+        path = []
+        while uiView.parent and uiView.model.type != "card":
+            path.append(uiView.parent.uiViews.index(uiView))
+            uiView = uiView.parent
+        return tuple(reversed(path))
+
     def HitTestAll(self, pt):
         # Return a list of all views that the given point would touch, all the way down to the card.  Top views first.
+        # Only views whose hit test frames contain the point, according to the hitIndex, get the full HitTest().
         views = []
-        allViews = list(reversed(self.uiCard.GetAllUiViews()))
+        candidates = self.GetHitIndex().QueryPoint(pt)
+        allViews = sorted(candidates, key=self.ZOrderKey, reverse=True)
         for uiView in allViews:
             if uiView.model.IsVisible() and uiView.view:
                 hit = uiView.HitTest(pt)
@@ -52,10 +52,12 @@ class StackModel(ViewModel):
     def AppendCardModel(self, cardModel):
         cardModel.parent = self
         self.childModels.append(cardModel)
+        self.InvalidateChildNames()
 
     def InsertCardModel(self, index, cardModel):
         cardModel.parent = self
         self.childModels.insert(index, cardModel)
+        self.InvalidateChildNames()
 
     def InsertNewCard(self, name, atIndex):
         newCard = CardModel(self.stackManager)
@@ -73,6 +75,7 @@ class StackModel(ViewModel):
     def RemoveCardModel(self, cardModel):
         cardModel.parent = None
         self.childModels.remove(cardModel)
+        self.InvalidateChildNames()
 
     def GetCardModel(self, i):
         return self.childModels[i]
@@ -110,6 +113,7 @@ class StackModel(ViewModel):
 
         super().SetData(stackData)
         self.childModels = []
+        self.InvalidateChildNames()
         for data in stackData["cards"]:
             m = CardModel(self.stackManager)
             m.parent = self
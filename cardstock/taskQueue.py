@@ -0,0 +1,98 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import threading
+from collections import deque
+from time import time
+
+
+class TaskQueue(object):
+    """
+    A thread-safe queue of runner tasks, used like queue.Queue, that adds priorities and coalescing.
+
+    Each task is put into a priority class, where 0 is the most urgent, and get() returns the oldest task from the most
+    urgent class that has one, so tasks stay in FIFO order within a class.  A task put as a barrier (like setting up a
+    new card) splits the queue into epochs: it only runs once every task queued before it has run, whatever their
+    classes, and no task queued after it can run before it.  So priorities only reorder tasks within one epoch.
+
+    A task put with a coalesceKey replaces any older task still waiting in the queue with the same key, so that if a
+    handler runs slowly, we don't build up a backlog of stale events, like old mouse positions, to replay later.  The
+    older task is dropped, and if a mergeFunc is given, it can carry data from the older task into the newer one.
+    """
+
+    def __init__(self, numPriorities=1):
+        self.cond = threading.Condition()
+        # Each slot is [task, coalesceKey, epoch, putTime].  Dropped tasks leave a slot with task=None.
+        self.queues = [deque() for i in range(numPriorities)]
+        self.epoch = 0  # Each barrier task gets an epoch of its own, between the tasks queued before and after it
+        self.pending = {}  # coalesceKey -> slot of the queued task with that key
+        self.droppedCounts = {}  # statsKey -> number of queued tasks dropped because a newer one replaced them
+        self.mergedCounts = {}   # statsKey -> number of those where data from the dropped task was merged into the new one
+        self.waitStats = [[0, 0.0, 0.0] for i in range(numPriorities)]  # [count, total wait, max wait] per priority
+
+    def put(self, task, priority=0, coalesceKey=None, mergeFunc=None, statsKey=None, isBarrier=False):
+        with self.cond:
+            if isBarrier:
+                self.epoch += 1
+            slot = [task, coalesceKey, self.epoch, time()]
+            if coalesceKey is not None:
+                oldSlot = self.pending.get(coalesceKey)
+                if oldSlot:
+                    if mergeFunc:
+                        slot[0] = mergeFunc(oldSlot[0], task)
+                        self.mergedCounts[statsKey] = self.mergedCounts.get(statsKey, 0) + 1
+                    oldSlot[0] = None
+                    self.droppedCounts[statsKey] = self.droppedCounts.get(statsKey, 0) + 1
+                self.pending[coalesceKey] = slot
+            self.queues[priority].append(slot)
+            if isBarrier:
+                self.epoch += 1
+            self.cond.notify()
+
+    def get(self):
+        """ Wait for, and return the next task to run. """
+        with self.cond:
+            while True:
+                # Drop any replaced tasks from the front of each queue, and find the oldest epoch still queued
+                minEpoch = None
+                for q in self.queues:
+                    while q and q[0][0] is None:
+                        q.popleft()
+                    if q and (minEpoch is None or q[0][2] < minEpoch):
+                        minEpoch = q[0][2]
+
+                if minEpoch is not None:
+                    for priority, q in enumerate(self.queues):
+                        if q and q[0][2] == minEpoch:
+                            task, coalesceKey, epoch, putTime = q.popleft()
+                            if coalesceKey is not None:
+                                del self.pending[coalesceKey]
+                            wait = time() - putTime
+                            stats = self.waitStats[priority]
+                            stats[0] += 1
+                            stats[1] += wait
+                            if wait > stats[2]:
+                                stats[2] = wait
+                            return task
+                self.cond.wait()
+
+    def GetStats(self):
+        """
+        Returns the dropped and merged task counts by statsKey, and the wait times for tasks in each priority class:
+        {"dropped": {statsKey: count}, "merged": {statsKey: count}, "wait": [{"count", "mean", "max"}, ...]}
+        """
+        with self.cond:
+            wait = [{"count": count, "mean": (total / count) if count else 0.0, "max": maxWait}
+                    for count, total, maxWait in self.waitStats]
+            return {"dropped": dict(self.droppedCounts), "merged": dict(self.mergedCounts), "wait": wait}
+
+    def ResetStats(self):
+        with self.cond:
+            self.droppedCounts = {}
+            self.mergedCounts = {}
+            self.waitStats = [[0, 0.0, 0.0] for i in range(len(self.queues))]
@@ -0,0 +1,32 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from lruCache import LruCache
+
+
+class TextLayout(object):
+    """
+    Everything UiTextLabel.Paint() needs to draw a label's text: the font at its final (maybe auto-shrunk) size, and
+    each wrapped line with the point to draw it at, in the label's local coords.
+    """
+
+    def __init__(self, font, didShrink, lines):
+        self.font = font
+        self.didShrink = didShrink
+        self.lines = lines  # [(lineText, wx.Point), ...]
+
+
+class TextLayoutCache(LruCache):
+    """
+    Keep the TextLayouts for recently painted labels, keyed by everything that goes into laying them out: the text, font
+    settings, size, alignment, auto-shrink setting and DPI scale.  Word wrapping, measuring and finding an auto-shrink
+    size are slow, and labels like scores often flip between the same few texts, or are copies of each other.  The
+    least recently used layouts are dropped once there are more than MAX_ENTRIES.
+    """
+
+    MAX_ENTRIES = 512
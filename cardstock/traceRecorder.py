@@ -0,0 +1,95 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import json
+import threading
+from time import perf_counter
+
+
+class TraceRecorder(object):
+    """
+    Records handler runs, main thread calls from the runnerThread (sync round trips and async callbacks), paints, and
+    periodic timer ticks, as Chrome trace events, so a session can be opened in chrome://tracing or Perfetto, and show
+    all threads on one timeline.  Tracing is off unless a recorder has been started, and instrumented code only checks
+    TraceRecorder.current before doing any work.
+    """
+
+    current = None  # The active recorder, or None when not tracing
+
+    MAX_EVENTS = 1000000
+
+    @classmethod
+    def Start(cls):
+        if not cls.current:
+            cls.current = TraceRecorder()
+        return cls.current
+
+    @classmethod
+    def Stop(cls, filename=None):
+        """ Stop tracing, and write the trace to filename, if given.  Returns the stopped recorder. """
+        recorder = cls.current
+        cls.current = None
+        if recorder and filename:
+            recorder.WriteJSON(filename)
+        return recorder
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.threadNames = {}
+        self.nextFlowId = 1
+        self.pid = os.getpid()
+
+    @staticmethod
+    def Now():
+        return perf_counter()
+
+    def AddEvent(self, event):
+        thread = threading.current_thread()
+        event["pid"] = self.pid
+        event["tid"] = thread.ident
+        with self.lock:
+            if len(self.events) < self.MAX_EVENTS:
+                self.events.append(event)
+            if thread.ident not in self.threadNames:
+                self.threadNames[thread.ident] = "Main" if thread is threading.main_thread() else thread.name
+
+    def Complete(self, name, category, startTime, endTime=None, args=None):
+        """ Add a span on the current thread, from startTime to endTime (now, if not given), in perf_counter() seconds. """
+        if endTime is None:
+            endTime = perf_counter()
+        event = {"name": name, "cat": category, "ph": "X", "ts": startTime * 1e6, "dur": (endTime - startTime) * 1e6}
+        if args:
+            event["args"] = args
+        self.AddEvent(event)
+
+    def NewFlowId(self):
+        with self.lock:
+            flowId = self.nextFlowId
+            self.nextFlowId += 1
+        return flowId
+
+    def FlowStart(self, name, category, flowId, time):
+        # Draws an arrow from this point on the current thread, to the matching FlowEnd(), usually on another thread
+        self.AddEvent({"name": name, "cat": category, "ph": "s", "id": flowId, "ts": time * 1e6})
+
+    def FlowEnd(self, name, category, flowId, time):
+        self.AddEvent({"name": name, "cat": category, "ph": "f", "bp": "e", "id": flowId, "ts": time * 1e6})
+
+    def GetTraceData(self):
+        with self.lock:
+            events = list(self.events)
+            names = dict(self.threadNames)
+        for tid, name in names.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def WriteJSON(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(self.GetTraceData(), f)
@@ -10,6 +10,7 @@ import wx
 from uiView import *
 from embeddedImages import radio_on, radio_off, checkbox_on, checkbox_off
 from uiTextLabel import wordwrap
+from paintResources import PaintResources
 
 # Native Button Mouse event positions on Mac are offset (?!?)
 MAC_BUTTON_OFFSET_HACK = wx.Point(6,4)
@@ -50,9 +51,7 @@ class UiButton(UiView):
 
     def OnPropertyChanged(self, model, key):
         super().OnPropertyChanged(model, key)
-        if key == "text":
-            self.stackManager.view.Refresh()
-        elif key == "style":
+        if key == "style":
             sm = self.stackManager
             sm.SelectUiView(None)
             sm.LoadCardAtIndex(sm.cardIndex, reload=True)
@@ -60,15 +59,13 @@ class UiButton(UiView):
         elif key == "is_selected":
             if self.view:
                 self.view.SetValue(model.GetProperty("is_selected"))
-            else:
-                self.stackManager.view.Refresh()
 
     def OnMouseDown(self, event):
         style = self.model.GetProperty("style")
         if not self.stackManager.isEditing:
             self.mouseDownInside = True
             self.mouseStillInside = True
-            self.stackManager.view.Refresh()
+            self.RefreshBounds()
             if style == "Radio":
                 self.model.SetProperty("is_selected", True)
             elif style == "Checkbox":
@@ -78,20 +75,20 @@ class UiButton(UiView):
     def OnMouseEnter(self, event):
         if self.mouseDownInside:
             self.mouseStillInside = True
-            self.stackManager.view.Refresh()
+            self.RefreshBounds()
         super().OnMouseEnter(event)
 
     def OnMouseExit(self, event):
         if self.mouseDownInside:
             self.mouseStillInside = False
-            self.stackManager.view.Refresh()
+            self.RefreshBounds()
         super().OnMouseExit(event)
 
     def OnMouseUpOutside(self, event):
         if self.mouseDownInside:
             self.mouseDownInside = False
             if self.stackManager:
-                self.stackManager.view.Refresh()
+                self.RefreshBounds()
 
     def OnMouseUp(self, event):
         if self.stackManager and not self.stackManager.isEditing:
@@ -99,7 +96,7 @@ class UiButton(UiView):
                 if not self.stackManager.isEditing and self.stackManager.runner and self.model.GetHandler("on_click"):
                     self.stackManager.runner.RunHandler(self.model, "on_click", event)
                 self.mouseDownInside = False
-                self.stackManager.view.Refresh()
+                self.RefreshBounds()
         super().OnMouseUp(event)
 
     def Paint(self, gc):
@@ -112,17 +109,18 @@ class UiButton(UiView):
             (width, height) = self.model.GetProperty("size")
 
             # Draw shadow round rect
-            gc.SetPen(wx.Pen('#00000044', fd(1)))
-            gc.SetBrush(wx.Brush('#00000044'))
+            resources = PaintResources.shared()
+            gc.SetPen(resources.Pen('#00000044', fd(1)))
+            gc.SetBrush(resources.Brush('#00000044'))
             gc.DrawRoundedRectangle(wx.Rect(1, 0, width-1, height-1), 5)
             # Draw foreground round rect
-            gc.SetPen(wx.Pen('#444444', fd(1)))
-            gc.SetBrush(wx.Brush('#CCCCCC' if hilighted else 'white'))
+            gc.SetPen(resources.Pen('#444444', fd(1)))
+            gc.SetBrush(resources.Brush('#CCCCCC' if hilighted else 'white'))
             gc.DrawRoundedRectangle(wx.Rect(0, 1, width-1, height-1), 5)
 
             title = self.model.GetProperty("text")
             if len(title):
-                font = wx.Font(wx.FontInfo(wx.Size(0, fd(fd(16)))).Family(wx.FONTFAMILY_DEFAULT))
+                font = PaintResources.shared().Font(fd(fd(16)))
                 lineHeight = td(font.GetPixelSize().height)
                 (startX, startY) = (0, (height+lineHeight)/2 + (1 if fd(100) == 100 else fd(-3)))
 
@@ -130,7 +128,7 @@ class UiButton(UiView):
                 line = lines.split("\n")[0]
 
                 gc.SetFont(font)
-                gc.SetTextForeground(wx.Colour('black'))
+                gc.SetTextForeground(PaintResources.shared().Colour('black'))
                 textWidth = gc.GetTextExtent(line).Width
                 xPos = (startX + (width - td(textWidth)) / 2)
                 gc.DrawText(line, wx.Point(int(xPos), int(startY)))
@@ -139,7 +137,7 @@ class UiButton(UiView):
             title = self.model.GetProperty("text")
             if len(title):
                 (width, height) = self.model.GetProperty("size")
-                font = wx.Font(wx.FontInfo(wx.Size(0, fd(fd(16)))).Family(wx.FONTFAMILY_DEFAULT))
+                font = PaintResources.shared().Font(fd(fd(16)))
                 lineHeight = td(font.GetPixelSize().height)
                 (startX, startY) = (0, (height+lineHeight)/2 + (1 if fd(100) == 100 else fd(-3)))
 
@@ -147,7 +145,7 @@ class UiButton(UiView):
                 line = lines.split("\n")[0]
 
                 gc.SetFont(font)
-                gc.SetTextForeground(wx.Colour('#888888' if hilighted else 'black'))
+                gc.SetTextForeground(PaintResources.shared().Colour('#888888' if hilighted else 'black'))
                 textWidth = gc.GetTextExtent(line).Width
                 xPos = (startX + (width - td(textWidth)) / 2)
                 gc.DrawText(line, wx.Point(int(xPos), int(startY)))
@@ -164,12 +162,12 @@ class UiButton(UiView):
 
             title = self.model.GetProperty("text")
             if len(title):
-                font = wx.Font(wx.FontInfo(wx.Size(0, fd(fd(16)))).Family(wx.FONTFAMILY_DEFAULT))
+                font = PaintResources.shared().Font(fd(fd(16)))
                 lineHeight = td(font.GetPixelSize().height)
                 startY = int((height + lineHeight) / 2) + (1 if fd(100) == 100 else fd(-3))
                 startPos = (25, startY)
                 gc.SetFont(font)
-                gc.SetTextForeground(wx.Colour('black'))
+                gc.SetTextForeground(PaintResources.shared().Colour('black'))
                 lines = wordwrap(title, fd(width-25), gc)
                 line = lines.split("\n")[0]
                 gc.DrawText(line, startPos)
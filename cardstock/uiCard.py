@@ -10,6 +10,7 @@ import wx
 from uiView import *
 import uiShape
 import generator
+from paintResources import PaintResources
 from codeRunnerThread import RunOnMainSync, RunOnMainAsync
 
 
@@ -23,6 +24,7 @@ class UiCard(UiView):
 
     def __init__(self, parent, stackManager, model):
         self.runningInternalResize = False
+        self.periodicSubscribers = None  # (card model, subscriberGen) that hasMouseMoved flags were last cleared for
         super().__init__(parent, stackManager, model, stackManager.view)
 
     def DestroyView(self):
@@ -70,10 +72,7 @@ class UiCard(UiView):
         event.Skip()
 
     def Paint(self, gc):
-        bg = wx.Colour(self.model.GetProperty("fill_color"))
-        if not bg:
-            bg = wx.Colour('white')
-        gc.SetBrush(wx.Brush(bg, wx.BRUSHSTYLE_SOLID))
+        gc.SetBrush(PaintResources.shared().Brush(self.model.GetProperty("fill_color")))
         gc.SetPen(wx.TRANSPARENT_PEN)
         gc.DrawRectangle(self.model.GetFrame().Inflate(1))
 
@@ -81,12 +80,12 @@ class UiCard(UiView):
         if self.isSelected and self.stackManager.tool.name == "hand":
             f = self.model.GetAbsoluteFrame()
             f.Top += 1
-            gc.SetPen(wx.Pen('Blue', self.stackManager.view.FromDIP(3), wx.PENSTYLE_SHORT_DASH))
+            gc.SetPen(PaintResources.shared().Pen('Blue', self.stackManager.view.FromDIP(3), wx.PENSTYLE_SHORT_DASH))
             gc.SetBrush(wx.TRANSPARENT_BRUSH)
             gc.DrawRectangle(f.Deflate(self.stackManager.view.FromDIP(1)))
 
             gc.SetPen(wx.TRANSPARENT_PEN)
-            gc.SetBrush(wx.Brush('blue', wx.BRUSHSTYLE_SOLID))
+            gc.SetBrush(PaintResources.shared().Brush('blue'))
             for box in self.GetLocalResizeBoxRects().values():
                 r = wx.Rect(box.TopLeft + f.TopLeft, box.Size)
                 gc.DrawRectangle(r)
@@ -112,22 +111,38 @@ class UiCard(UiView):
                 ui.OnPropertyChanged(ui.model, "position")
 
     def OnKeyDown(self, event):
-        if not self.stackManager.isEditing and self.stackManager.runner and self.model.GetHandler("on_key_press"):
-            self.stackManager.runner.RunHandler(self.model, "on_key_press", event)
+        if not self.stackManager.isEditing and self.stackManager.runner:
+            for model in self.model.GetSubscribers("on_key_press"):
+                self.stackManager.runner.RunHandler(model, "on_key_press", event)
 
     def OnKeyUp(self, event):
-        if not self.stackManager.isEditing and self.stackManager.runner and self.model.GetHandler("on_key_release"):
-            self.stackManager.runner.RunHandler(self.model, "on_key_release", event)
+        if not self.stackManager.isEditing and self.stackManager.runner:
+            for model in self.model.GetSubscribers("on_key_release"):
+                self.stackManager.runner.RunHandler(model, "on_key_release", event)
 
     def OnPeriodic(self, event):
+        if self.stackManager.isEditing or not self.stackManager.runner:
+            return False
         didRun = False
-        if not self.stackManager.isEditing and self.stackManager.runner and self.model.GetHandler("on_key_hold"):
+        for model in self.model.GetSubscribers("on_key_hold"):
             for key_name in self.stackManager.runner.pressedKeys:
-                self.stackManager.runner.RunHandler(self.model, "on_key_hold", event, key_name)
-                didRun = True
-        for child in reversed(self.GetAllUiViews()):
-            if child.OnPeriodic(event):
+                self.stackManager.runner.RunHandler(model, "on_key_hold", event, key_name)
                 didRun = True
+        # Objects without on_mouse_move code aren't visited below, so their hasMouseMoved flags never get cleared.
+        # Clear them whenever the subscribers change, so a newly added on_mouse_move handler doesn't see an old move.
+        if self.periodicSubscribers != (self.model, self.model.subscriberGen):
+            self.periodicSubscribers = (self.model, self.model.subscriberGen)
+            movers = set(self.model.GetSubscribers("on_mouse_move"))
+            for ui in self.GetAllUiViews():
+                if ui.model not in movers:
+                    ui.hasMouseMoved = False
+        # Only visit the objects with on_periodic or on_mouse_move code, in reverse order, from the top down.
+        # Grouped objects are in this list too, so they get one OnPeriodic() per tick, like ungrouped objects.
+        for model in reversed(self.model.GetSubscribers(CardModel.PERIODIC_EVENTS)):
+            if model is not self.model:
+                ui = self.stackManager.GetUiViewByModel(model)
+                if ui and ui.OnPeriodic(event):
+                    didRun = True
         if super().OnPeriodic(event):
             didRun = True
         return didRun
@@ -152,6 +167,8 @@ class CardModel(ViewModel):
         self.handlers["on_resize"] = ""
         self.handlers["on_hide_card"] = ""
         self.initialEditHandler = "on_setup"
+        self.subscriberIndex = None  # event name -> models with code for that event, rebuilt by GetSubscribers()
+        self.subscriberGen = 0
 
         # Custom property order and mask for the inspector
         self.properties["name"] = "card_1"
@@ -166,6 +183,28 @@ class CardModel(ViewModel):
     def GetAbsoluteFrame(self):
         return self.GetFrame()
 
+    PERIODIC_EVENTS = ("on_periodic", "on_mouse_move")  # Key for the combined list that UiCard.OnPeriodic() visits
+
+    def GetSubscribers(self, eventName):
+        """
+        Returns the list of models on this card, including the card itself, that have code for eventName, in order:
+        the card first, and then each object, followed by its group children.  Pass PERIODIC_EVENTS to get the models
+        with code for either of those events.  Don't change the returned list.
+        """
+        index = self.subscriberIndex
+        if index is None:
+            gen = self.subscriberGen
+            index = {}
+            for m in [self] + self.GetAllChildModels():
+                events = [name for name, code in m.handlers.items() if code.strip()]
+                for name in events:
+                    index.setdefault(name, []).append(m)
+                if any(name in self.PERIODIC_EVENTS for name in events):
+                    index.setdefault(self.PERIODIC_EVENTS, []).append(m)
+            if gen == self.subscriberGen:
+                self.subscriberIndex = index
+        return index.get(eventName, [])
+
     def GetAllChildModels(self):
         allModels = []
         for child in self.childModels:
@@ -188,6 +227,8 @@ class CardModel(ViewModel):
             m = generator.StackGenerator.ModelFromData(self.stackManager, childData)
             m.parent = self
             self.childModels.append(m)
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
 
     def AddChild(self, model):
         self.InsertChild(model, len(self.childModels))
@@ -195,12 +236,17 @@ class CardModel(ViewModel):
     def InsertChild(self, model, index):
         self.childModels.insert(index, model)
         model.parent = self
+        model.InvalidateTransform()
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
         self.isDirty = True
         if not self.stackManager.isEditing and self.stackManager.runner and self.stackManager.uiCard.model == self:
             self.stackManager.runner.SetupForCard(self)
 
     def RemoveChild(self, model):
         self.childModels.remove(model)
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
         model.SetDown()
         self.isDirty = True
         if not self.stackManager.isEditing and self.stackManager.runner and self.stackManager.uiCard.model == self:
@@ -264,11 +310,9 @@ class CardModel(ViewModel):
             self.Notify("size")
 
     def broadcast_message(self, message):
-        def r_broadcast(model):
-            self.stackManager.runner.RunHandler(model, "on_message", None, message)
-            for m in model.childModels:
-                r_broadcast(m)
-        r_broadcast(self)
+        for model in self.GetSubscribers("on_message"):
+            if not model.didSetDown:
+                self.stackManager.runner.RunHandler(model, "on_message", None, message)
 
     def GetDedupNameList(self, exclude):
         names = [m.properties["name"] for m in self.GetAllChildModels()]
@@ -469,6 +513,25 @@ class Card(ViewProxy):
             return g.GetProxy() if g else None
         return func()
 
+    def find_touching(self, obj, candidates=None):
+        if not isinstance(obj, ViewProxy):
+            raise TypeError("find_touching(): obj must be a CardStock object")
+        if candidates is not None:
+            if not isinstance(candidates, (list, tuple)):
+                raise TypeError("find_touching(): candidates, if provided, needs to be a list of cardstock objects")
+            for o in candidates:
+                if not isinstance(o, ViewProxy):
+                    raise TypeError("find_touching(): candidates, if provided, needs to be a list of cardstock objects")
+
+        model = self._model
+        oModel = obj._model
+        if not model or not oModel or oModel.GetCard() is not model: return []
+        if candidates is None:
+            models = model.GetAllChildModels()
+        else:
+            models = [o._model for o in candidates if o._model]
+        return [m.GetProxy() for m in oModel.FindTouchingModels(models)]
+
     def stop_all_animating(self, property_name=None):
         model = self._model
         if not model: return
@@ -9,6 +9,7 @@
 import wx
 from uiView import *
 import generator
+import geometry
 from codeRunnerThread import RunOnMainSync
 
 
@@ -32,13 +33,24 @@ class UiGroup(UiView):
             if uiView.model.type == "group":
                 uiView.GetAllUiViews(allUiViews)
 
+    def GetPaintBox(self):
+        # A group paints nothing itself, so it covers just the union of its children
+        box = None
+        for ui in self.uiViews:
+            uiBox = ui.GetPaintBox()
+            if not uiBox:
+                return None
+            box = geometry.UnionBox(box, uiBox)
+        return box
+
+    def GetHitTestInflation(self):
+        return 20
+
     def HitTest(self, pt):
         f = self.model.GetAbsoluteFrame()
-        f.Inflate(20)
+        f.Inflate(self.GetHitTestInflation())
         if f.Contains(pt):
-            if not self.hitRegion:
-                self.MakeHitRegion()
-            if self.hitRegion.Contains(pt):
+            if self.GetHitRegion().Contains(pt):
                 for ui in reversed(self.uiViews):
                     if ui.model.IsVisible():
                         hit = ui.HitTest(pt)
@@ -61,12 +73,14 @@ class UiGroup(UiView):
             if not self.model.IsVisible():
                 self.hitRegion = wx.Region((0, 0), (0, 0))
 
-            # Only the sub-objects are click targets while running
+            # Only the sub-objects are click targets while running.  Each child's region may come from the
+            # HitRegionCache, but the union depends on their layout, so it isn't shared.
             reg = wx.Region()
             for ui in self.uiViews:
                 uiReg = wx.Region(ui.GetHitRegion())
                 reg.Union(uiReg)
             self.hitRegion = reg
+            self.hitRegionBase = None
             self.hitRegionOffset = self.model.GetAbsolutePosition()
 
     def OnPropertyChanged(self, model, key):
@@ -76,8 +90,11 @@ class UiGroup(UiView):
                 ui.OnPropertyChanged(ui.model, key)
         elif key == "size":
             self.model.ResizeChildModels()
+            self.stackManager.InvalidateHitIndex()
         elif key == "child":
             self.RebuildViews()
+            self.stackManager.InvalidateHitIndex()
+            self.stackManager.InvalidateNameIndex()
             self.stackManager.view.Refresh()
 
     def RemoveChildViews(self):
@@ -99,15 +116,6 @@ class UiGroup(UiView):
             uiView = generator.StackGenerator.UiViewFromModel(self, self.stackManager, m)
             self.uiViews.append(uiView)
 
-    def OnPeriodic(self, event):
-        didRun = False
-        if super().OnPeriodic(event):
-            didRun = True
-        for child in self.uiViews:
-            if child.OnPeriodic(event):
-                didRun = True
-        return didRun
-
 
 class GroupModel(ViewModel):
     """
@@ -156,6 +164,8 @@ class GroupModel(ViewModel):
             self.childModels.append(model)
             model.origGroupSubviewFrame = model.GetFrame()
             model.origGroupSubviewRotation = model.GetProperty("rotation")
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
         self.origFrame = self.GetFrame()
 
     def SetProperty(self, key, value, notify=True):
@@ -170,8 +180,11 @@ class GroupModel(ViewModel):
         for model in models:
             self.childModels.append(model)
             model.parent = self
+            model.InvalidateTransform()
             pos = model.GetProperty("position")
             model.SetProperty("position", [pos[0]-selfPos[0], pos[1]-selfPos[1]], notify=False)
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
         self.UpdateFrame()
         self.origFrame = self.GetFrame()
         for model in models:
@@ -182,12 +195,15 @@ class GroupModel(ViewModel):
 
     def RemoveChild(self, model):
         self.childModels.remove(model)
+        self.InvalidateChildNames()
+        self.InvalidateSubscribers()
         del model.origGroupSubviewFrame
         del model.origGroupSubviewRotation
         pos = model.GetProperty("position")
         selfPos = self.GetProperty("position")
         model.SetProperty("position", [pos[0]+selfPos[0], pos[1]+selfPos[1]], notify=False)
         model.SetDown()
+        self.MarkPaintDirty()
         self.isDirty = True
 
     def UpdateFrame(self):
@@ -10,6 +10,7 @@ import os
 import wx
 import generator
 from uiView import *
+from imageCache import ImageCache
 
 
 class UiImage(UiView):
@@ -18,20 +19,18 @@ class UiImage(UiView):
     An image does not use its own wx.Window as a view, but instead draws itself onto the stack view.
     """
 
-    imgCache = {}
-
     def __init__(self, parent, stackManager, model):
         super().__init__(parent, stackManager, model, None)
         self.scaledBitmap = None
+        self.imagePath = None
         self.origImage = self.GetImg(model)
 
     @classmethod
     def ClearCache(cls, path=None):
         if path:
-            if path in cls.imgCache:
-                del cls.imgCache[path]
+            ImageCache.shared().Remove(path)
         else:
-            cls.imgCache = {}
+            ImageCache.shared().ClearCache()
 
     def AspectStrToInt(self, str):
         if str == "Center":
@@ -47,14 +46,22 @@ class UiImage(UiView):
         file = model.GetProperty("file")
         filepath = self.stackManager.resPathMan.GetAbsPath(file)
 
-        if filepath in self.imgCache:
-            img = self.imgCache[filepath]
-        else:
-            if filepath and os.path.exists(filepath):
-                img = wx.Image(filepath, wx.BITMAP_TYPE_ANY)
-                self.imgCache[filepath] = img
-            else:
-                img = None
+        self.imagePath = filepath
+        if not filepath:
+            return None
+
+        cache = ImageCache.shared()
+        if self.stackManager.uiCard and model.GetCard() == self.stackManager.uiCard.model:
+            # Don't evict images that are showing on the current card.  Pin before adding it, so it can't evict itself.
+            cache.AddPinnedPath(filepath)
+        img = cache.Get(filepath)
+        if img is None:
+            if not os.path.exists(filepath):
+                return None
+            img = wx.Image(filepath, wx.BITMAP_TYPE_ANY)
+            if not img.IsOk():
+                return None
+            cache.Put(filepath, img)
         return img
 
     def MakeScaledBitmap(self):
@@ -108,19 +115,15 @@ class UiImage(UiView):
 
         if key in ["size", "fit", "file", "xFlipped", "yFlipped"]:
             self.scaledBitmap = None
-            self.stackManager.view.Refresh()
 
         if key == "file":
             self.origImage = self.GetImg(self.model)
             self.scaledBitmap = None
-            self.stackManager.view.Refresh()
-        elif key == "fit":
-            self.stackManager.view.Refresh()
 
     def ClearCachedData(self):
         self.scaledBitmap = None
         self.origImage = None
-        self.stackManager.view.Refresh()
+        self.RefreshBounds()
 
     def Paint(self, gc):
         if self.model.GetProperty("file"):
@@ -9,6 +9,7 @@
 import wx
 from uiView import *
 from imageFactory import ImageFactory
+from paintResources import PaintResources
 
 DASHES = {"Solid": wx.PENSTYLE_SOLID,
           "Long-Dashes": wx.PENSTYLE_LONG_DASH,
@@ -26,6 +27,7 @@ class UiShape(UiView):
     def __init__(self, parent, stackManager, model):
         super().__init__(parent, stackManager, model, None)
         self.cachedPaths = {}
+        self.paintTools = None  # (dipScale, pen, brush), until a pen or fill property changes
 
     def SetDown(self):
         self.cachedPaths = None
@@ -76,30 +78,37 @@ class UiShape(UiView):
         flipAff.Scale(1, -1)
         path.Transform(flipAff)
 
-    def Paint(self, gc):
-        hasFill = self.model.type not in ["line", "pen"]
+    def GetPaintTools(self):
+        dipScale = self.stackManager.view.FromDIP(1000)/1000.0
+        if self.paintTools and self.paintTools[0] == dipScale:
+            return self.paintTools[1:]
 
+        hasFill = self.model.type not in ["line", "pen"]
+        fill_color = None
         with self.model.animLock:
             thickness = self.model.properties["pen_thickness"]
             if hasFill:
                 fill_color = self.model.properties["fill_color"]
             pen_color = self.model.properties["pen_color"]
+            pen_style = self.model.properties["pen_style"]
 
-        pen_color = wx.Colour(pen_color)
-        if not pen_color:
-            pen_color = wx.Colour('black')
+        resources = PaintResources.shared()
         if thickness == 0:
             pen = wx.TRANSPARENT_PEN
         else:
-            pen = wx.Pen(pen_color, self.stackManager.view.FromDIP(int(thickness)), DASHES[self.model.properties["pen_style"]])
-        gc.cachedGC.SetPen(pen)
+            pen = resources.Pen(pen_color, self.stackManager.view.FromDIP(int(thickness)), DASHES[pen_style],
+                                wx.JOIN_MITER if hasFill else wx.JOIN_ROUND)
+        brush = resources.Brush(fill_color) if hasFill else None
+        self.paintTools = (dipScale, pen, brush)
+        return pen, brush
 
+    def Paint(self, gc):
+        hasFill = self.model.type not in ["line", "pen"]
+
+        pen, brush = self.GetPaintTools()
+        gc.cachedGC.SetPen(pen)
         if hasFill:
-            pen.SetJoin(wx.JOIN_MITER)
-            fill_color = wx.Colour(fill_color)
-            if not fill_color:
-                fill_color = wx.Colour('white')
-            gc.cachedGC.SetBrush(wx.Brush(fill_color, wx.BRUSHSTYLE_SOLID))
+            gc.cachedGC.SetBrush(brush)
 
         if "paint" in self.cachedPaths:
             path = self.cachedPaths["paint"]
@@ -126,8 +135,8 @@ class UiShape(UiView):
             if (self.model.type in ["pen", "line", "polygon"]):
                 # Make lines extra thick for easier clicking
                 selThickness += self.stackManager.view.FromDIP(6)
-            gc.cachedGC.SetPen(wx.Pen('Blue', selThickness, wx.PENSTYLE_SHORT_DASH))
-            gc.cachedGC.SetBrush(wx.Brush('Blue', wx.BRUSHSTYLE_SOLID))
+            gc.cachedGC.SetPen(PaintResources.shared().Pen('Blue', selThickness, wx.PENSTYLE_SHORT_DASH))
+            gc.cachedGC.SetBrush(PaintResources.shared().Brush('Blue'))
 
             # We're already affine-transformed, so just flip vertically and draw
             if "paintSel" in self.cachedPaths:
@@ -150,11 +159,16 @@ class UiShape(UiView):
                     self.FlipPath(gc, path)
                     gc.cachedGC.FillPath(path)
 
-    def MakeHitRegion(self):
-        # Make a region in absolute/card coordinates
-        if not self.model.IsVisible():
-            self.hitRegion = wx.Region((0,0), (0,0))
+    def GetHitRegionKey(self):
+        if self.stackManager.isEditing and self.isSelected and self.stackManager.tool.name == "hand":
+            return None
+        with self.model.animLock:
+            points = tuple((round(p[0], 3), round(p[1], 3)) for p in self.model.GetScaledPoints())
+            thickness = self.model.GetProperty("pen_thickness")
+            cornerRadius = self.model.GetProperty("corner_radius")
+        return ("shape", self.model.type, points, thickness, cornerRadius, self.AffineKey(self.model.GetAbsoluteAffine()))
 
+    def RasterizeHitRegion(self):
         with self.model.animLock:
             thickness = self.model.GetProperty("pen_thickness")
             s = self.model.GetProperty("size")
@@ -207,9 +221,8 @@ class UiShape(UiView):
 
         reg = img.ConvertToRegion(0,0,0)
         ImageFactory.shared().RecycleImage(img)
-        reg.Offset(int(rotRect.Position.x-regOffset), int(rotRect.Position.y-regOffset))
-        self.hitRegion = reg
-        self.hitRegionOffset = self.model.GetAbsolutePosition()
+        pos = self.model.GetAbsolutePosition()
+        return reg, (rotRect.Position.x - regOffset - pos[0], rotRect.Position.y - regOffset - pos[1])
 
     def GetLocalResizeBoxPoints(self):
         thicknessOffset = self.model.GetProperty("pen_thickness")/2
@@ -223,9 +236,12 @@ class UiShape(UiView):
         super().OnPropertyChanged(model, key)
         if key in ["size", "shape", "pen_color", "pen_thickness", "pen_style",  "fill_color", "corner_radius", "rotation"]:
             self.ClearHitRegion()
-            self.stackManager.view.Refresh()
+        if key in ["shape", "pen_color", "pen_thickness", "pen_style", "fill_color"]:
+            self.paintTools = None
         if key in ["size", "shape", "pen_thickness", "corner_radius", "rotation"]:
             self.cachedPaths = {}
+        if key in ["shape", "pen_thickness"]:
+            self.stackManager.UpdateHitIndex(self)
 
     @staticmethod
     def CreateModelForType(stackManager, name):
@@ -31,9 +31,7 @@ class UiTextBase(UiView):
     def OnPropertyChanged(self, model, key):
         super().OnPropertyChanged(model, key)
         if key == "text":
-            if self.model.type == "textlabel":
-                self.stackManager.view.Refresh()
-            else:
+            if self.model.type != "textlabel":
                 if self.view:
                     wasEditable = self.view.IsEditable()
                     if not wasEditable:
@@ -49,12 +47,8 @@ class UiTextBase(UiView):
             self.OnResize(None)
             if self.view:
                 self.view.Refresh()
-            else:
-                self.stackManager.view.Refresh()
         elif key == "alignment":
-            if self.model.type == "textlabel":
-                self.stackManager.view.Refresh()
-            else:
+            if self.model.type != "textlabel":
                 sm = self.stackManager
                 sm.SelectUiView(None)
                 sm.LoadCardAtIndex(sm.cardIndex, reload=True)
@@ -90,7 +84,7 @@ class UiTextBase(UiView):
         if view is None:
             self.font = font
             self.text_color = colorStr
-            self.stackManager.view.Refresh()
+            self.RefreshBounds()
         elif not isinstance(view, stc.StyledTextCtrl):
             view.SetFont(font)
             view.SetForegroundColour(colorStr)
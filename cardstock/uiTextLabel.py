@@ -11,6 +11,8 @@ from appCommands import SetPropertyCommand
 from uiView import *
 from uiTextBase import *
 from uiTextField import CDSTextCtrl
+from textLayoutCache import TextLayoutCache, TextLayout
+from paintResources import PaintResources
 
 
 class UiTextLabel(UiTextBase):
@@ -18,16 +20,18 @@ class UiTextLabel(UiTextBase):
     This class is a controller that coordinates management of a TextLabel view, based on data from a TextLabelModel.
     """
 
+    LAYOUT_PROPERTIES = ["text", "font", "font_size", "size", "can_auto_shrink", "alignment",
+                         "is_bold", "is_italic", "is_underlined"]
+
     def __init__(self, parent, stackManager, model):
-        self.lastFontSize = None
-        self.lastDidShrink = False
+        self.layout = None  # (dipScale, TextLayout) from the last paint, until a layout property changes
         super().__init__(parent, stackManager, model, None)
         self.UpdateFont(model, None)
 
     def OnPropertyChanged(self, model, key):
         super().OnPropertyChanged(model, key)
-        if key in ["text", "font", "font_size", "size", "can_auto_shrink"]:
-            self.lastFontSize = None
+        if key in self.LAYOUT_PROPERTIES:
+            self.layout = None
 
     def StartInlineEditing(self):
         # Show a temporary StyledTextCtrl with the same frame and font as the label
@@ -86,16 +90,10 @@ class UiTextLabel(UiTextBase):
         return height > lineHeight * numLines
 
     def GetFontSizeFit(self, gc):
-        if self.lastFontSize is not None:
-            return (self.lastFontSize, self.lastDidShrink)
         font_size = self.ScaleFontSize(self.model.GetProperty("font_size"), None)
         if self.DoesTextFitWithSize(gc, font_size):
-            self.lastFontSize = font_size
-            self.lastDidShrink = False
             return (font_size, False)
-        self.lastFontSize = self.FindFittingFontSize(gc, 1, font_size)
-        self.lastDidShrink = True
-        return (self.lastFontSize, True)
+        return (self.FindFittingFontSize(gc, 1, font_size), True)
 
     def FindFittingFontSize(self, gc, lower, upper):
         font_size = int((upper + lower) / 2)
@@ -107,8 +105,26 @@ class UiTextLabel(UiTextBase):
         else:
             return lower
 
-    def Paint(self, gc):
+    def GetLayout(self, gc):
+        """
+        Returns this label's TextLayout, from its own last layout if nothing has changed, or else from the shared
+        TextLayoutCache, only laying out the text again if neither has it.
+        """
         dipScale = self.stackManager.view.FromDIP(1000)/1000.0
+        if self.layout and self.layout[0] == dipScale:
+            return self.layout[1]
+        props = self.model.properties
+        key = (props["text"], props["font"], props["font_size"], props["is_bold"], props["is_italic"],
+               props["is_underlined"], props["can_auto_shrink"], props["alignment"], tuple(props["size"]), dipScale)
+        cache = TextLayoutCache.shared()
+        layout = cache.Get(key)
+        if layout is None:
+            layout = self.MakeLayout(gc, dipScale)
+            cache.Put(key, layout)
+        self.layout = (dipScale, layout)
+        return layout
+
+    def MakeLayout(self, gc, dipScale):
         align = self.model.GetProperty("alignment")
         (width, height) = self.model.GetProperty("size")
 
@@ -126,13 +142,13 @@ class UiTextLabel(UiTextBase):
         width *= dipScale
 
         gc.SetFont(font)
-        gc.SetTextForeground(wx.Colour(self.text_color))
         lines = wordwrap(self.model.GetProperty("text"), width, gc)
 
         offsetY = height * dipScale
         extraLineSpacing = 1.25 if wx.Platform == "__WXMSW__" else 1.1
         lineHeight = int(font_size / dipScale * extraLineSpacing)
 
+        placedLines = []
         for line in lines.split('\n'):
             line = line.rstrip()
             if align in ["Center", "Right"]:
@@ -145,18 +161,26 @@ class UiTextLabel(UiTextBase):
                 xPos = 0
 
             if wx.Platform == "__WXMSW__":
-                gc.DrawText(line, wx.Point(int(xPos), self.stackManager.view.ToDIP(int(offsetY))))
+                placedLines.append((line, wx.Point(int(xPos), self.stackManager.view.ToDIP(int(offsetY)))))
             else:
-                gc.DrawText(line, wx.Point(int(xPos), int(offsetY)))
+                placedLines.append((line, wx.Point(int(xPos), int(offsetY))))
 
             if offsetY < lineHeight * 9 / 5:  # Don't clip a line due to the extra line spacing
                 break
 
             offsetY -= lineHeight
 
+        return TextLayout(font, didShrink, placedLines)
+
+    def Paint(self, gc):
+        layout = self.GetLayout(gc)
+        gc.SetFont(layout.font)
+        gc.SetTextForeground(PaintResources.shared().Colour(self.text_color))
+        for (line, pt) in layout.lines:
+            gc.DrawText(line, pt)
 
         if self.stackManager.isEditing:
-            self.PaintBoundingBox(gc, 'red' if didShrink else 'gray')
+            self.PaintBoundingBox(gc, 'red' if layout.didShrink else 'gray')
 
 
 class TextLabelModel(TextBaseModel):
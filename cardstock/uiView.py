@@ -19,6 +19,9 @@ from cardstockFrameParts import *
 import sanitizer
 import math
 from imageFactory import ImageFactory
+from hitRegionCache import HitRegionCache
+from paintResources import PaintResources
+import geometry
 
 
 class UiView(object):
@@ -34,11 +37,15 @@ class UiView(object):
         self.uiViews = []
         self.view = view
         self.model = None
+        self.lastPaintBox = None  # Card-coords box this object covered when we last asked for it to be repainted
         self.SetModel(model)
         self.hitRegion = None
+        self.hitRegionBase = None  # Shared region from the HitRegionCache, that hitRegion is a placed copy of
+        self.hitRegionRelOrigin = None
         self.isSelected = False
         self.hasMouseMoved = False
         self.SetView(view)
+        self.lastPaintBox = self.GetPaintBox()
 
         self.lastEditedHandler = None
         self.delta = ((0, 0))
@@ -57,6 +64,7 @@ class UiView(object):
         self.uiViews = None
         self.model = None
         self.hitRegion = None
+        self.hitRegionBase = None
 
     def BindEvents(self, view):
         view.Bind(wx.EVT_LEFT_DOWN, self.FwdOnMouseDown)
@@ -107,7 +115,29 @@ class UiView(object):
         else:
             return None
 
+    NON_VISUAL_PROPERTIES = ("name", "data", "speed", "can_save", "can_resize")
+
+    def GetPaintBox(self):
+        """ Returns the (x1, y1, x2, y2) card-coords box this object paints into, or None if that is unknown. """
+        if self.model.type in ["stack", "card"]:
+            return None
+        return geometry.FrameBox(self.model)
+
+    def RefreshBounds(self):
+        """
+        Repaint only the area this object covered the last time we refreshed it, plus the area it covers now.
+        """
+        box = self.GetPaintBox()
+        oldBox = self.lastPaintBox
+        self.lastPaintBox = box
+        self.stackManager.layerCache.MarkChanged(self)
+        self.stackManager.RefreshCardBox(geometry.UnionBox(oldBox, box) if oldBox and box else None)
+
     def OnPropertyChanged(self, model, key):
+        if key == "name":
+            self.stackManager.InvalidateNameIndex()
+        if key not in self.NON_VISUAL_PROPERTIES:
+            self.RefreshBounds()
         if key in ["position", "size", "rotation"]:
             if self.view:
                 s = model.GetProperty("size")
@@ -126,11 +156,10 @@ class UiView(object):
                 self.MoveHitRegion()
             else:
                 self.ClearHitRegion()
-            self.stackManager.view.Refresh()
+            self.stackManager.UpdateHitIndex(self)
         elif key == "is_visible":
             if self.view:
                 self.view.Show(self.model.IsVisible())
-            self.stackManager.view.Refresh()
 
     def OnResize(self, event):
         pass
@@ -181,13 +210,13 @@ class UiView(object):
             self.stackManager.runner.RunHandler(self.model, "on_mouse_exit", event)
         event.Skip()
 
-    def RunAnimations(self, onFinishedCalls, elapsed_time):
-        # Move the object by speed.x and speed.y pixels per second
+    def RunAnimations(self, onFinishedCalls, elapsed_time, moveBySpeed=True):
+        # Move the object by speed.x and speed.y pixels per second, unless the StackManager already moved everything
         updateList = []
         finishList = []
         didRun = False
         with self.model.animLock:
-            if self.model.type not in ["stack", "card"]:
+            if moveBySpeed and self.model.type not in ["stack", "card"]:
                 speed = self.model.properties["speed"]
                 if speed != (0,0) and "position" not in self.model.animations:
                     pos = self.model.properties["position"]
@@ -217,23 +246,31 @@ class UiView(object):
             onFinishedCalls.append(deferFinish(key))
         return didRun
 
-    def FindCollisions(self, collisions):
+    def FindCollisions(self, collisions, broadPhase=None, elapsed_time=0):
         # Find collisions between this object and others in its bounceObjs list
         # and add them to the collisions list, to be handled after all are found.
+        # If given a broadPhase SpatialHash, skip the exact test for outside objects that aren't nearby.
+        # If given the elapsed_time of this tick, also catch fast objects that passed right through each other.
         removeFromBounceObjs = []
         if not self.model.didSetDown and self.model.GetProperty("is_visible") and tuple(self.model.GetProperty("speed")) != (0, 0):
+            nearby = broadPhase.QueryItem(self.model) if broadPhase else None
             for k,v in self.model.bounceObjs.items():
-                other_ui = self.stackManager.GetUiViewByModel(k)
                 (mode, last_dist) = v
 
-                if not other_ui.model.GetProperty("is_visible"):
-                    continue
-
-                if other_ui.model.didSetDown:
+                if k.didSetDown:
                     # remove deleted objects from the bounceObjs list, after this loop is done
                     removeFromBounceObjs.append(k)
                     continue
 
+                if nearby is not None and mode == "Out" and k not in nearby:
+                    # Too far apart to touch this tick.  last_dist gets refreshed once they're within the margin.
+                    continue
+
+                other_ui = self.stackManager.GetUiViewByModel(k)
+
+                if not other_ui.model.GetProperty("is_visible"):
+                    continue
+
                 sc = self.model.GetProxy().center       # sc = self center
                 oc = other_ui.model.GetProxy().center   # oc = other center
                 new_dist = (abs(sc[0]-oc[0]), abs(sc[1]-oc[1]))
@@ -245,6 +282,12 @@ class UiView(object):
                     continue
 
                 edges = self.model.GetProxy().is_touching_edge(other_ui.model.GetProxy(), mode == "In")
+                toi = None
+                if mode == "Out" and not edges and elapsed_time:
+                    impact = self.FindSweptImpact(other_ui.model, elapsed_time)
+                    if impact:
+                        (toi, edge) = impact
+                        edges = [edge]
                 if mode == "In" and not edges:
                     if not other_ui.model.GetProxy().is_touching_point(self.model.GetCenter()):
                         edges = []
@@ -259,7 +302,16 @@ class UiView(object):
                     otherBounceAxes = ""
                     ss = self.model.GetProxy().speed
                     os = other_ui.model.GetProxy().speed
-                    if mode == "In":
+                    if toi is not None:
+                        # They passed through each other, so bounce each object that was moving toward the other
+                        axis = "H" if edges[0] in ("Left", "Right") else "V"
+                        i = 0 if axis == "H" else 1
+                        rel = ss[i] - os[i]
+                        if ss[i] * rel > 0:
+                            selfBounceAxes += axis
+                        if os[i] * rel < 0:
+                            otherBounceAxes += axis
+                    elif mode == "In":
                         # Bounce if hitting an edge of the enclosing object, and only if moving toward the other object's edge
                         if ("Left" in edges or "Right" in edges) and new_dist[0] > last_dist[0]:
                             if (ss[0] > 0 and oc[0] < sc[0]) or (ss[0] < 0 and oc[0] > sc[0]):
@@ -293,16 +345,29 @@ class UiView(object):
                             edgeList = []
                             for eStr in ("Top", "Bottom", "Left", "Right"):
                                 if eStr in edges: edgeList.append(eStr)
-                            collisions[key] = (self, other_ui, selfBounceAxes, otherBounceAxes, tuple(edgeList), mode)
+                            collisions[key] = (self, other_ui, selfBounceAxes, otherBounceAxes, tuple(edgeList), mode, toi)
 
                 self.model.bounceObjs[k][1] = new_dist
 
             for k in removeFromBounceObjs:
                 del self.model.bounceObjs[k]
 
+    def FindSweptImpact(self, otherModel, elapsed_time):
+        # Returns (toi, edge) if this object's frame passed right through the other's during the last tick, where toi
+        # is the fraction of the tick at which they met, and edge is the edge of the other object that it hit.
+        # Frames are unrotated bounding boxes, so edges of rotated objects are named in card coordinates.
+        ss = self.model.properties["speed"]
+        os = otherModel.properties["speed"]
+        f = self.model.GetAbsoluteFrame()
+        of = otherModel.GetAbsoluteFrame()
+        return geometry.SweptBoxImpact((f.x, f.y, f.x + f.width, f.y + f.height),
+                                       (ss[0] * elapsed_time, ss[1] * elapsed_time),
+                                       (of.x, of.y, of.x + of.width, of.y + of.height),
+                                       (os[0] * elapsed_time, os[1] * elapsed_time))
+
     def PerformBounce(self, info, elapsed_time):
         # Perform this bounce for this object, and the other object
-        (this_ui, other_ui, selfAxes, otherAxes, edges, mode) = info
+        (this_ui, other_ui, selfAxes, otherAxes, edges, mode, toi) = info
         ss = self.model.GetProxy().speed
         os = other_ui.model.GetProxy().speed
 
@@ -311,8 +376,14 @@ class UiView(object):
         selfBounceInside = False if not selfBounce else self.model.bounceObjs[other_ui.model][0] == "In"
         otherBounce = self.model in other_ui.model.bounceObjs
 
-        # Back up to avoid overlap
-        self.model.SetProperty("position", self.model.GetProperty("position") - tuple(ss*(elapsed_time/2)))
+        if toi is None:
+            # Back up to avoid overlap
+            self.model.SetProperty("position", self.model.GetProperty("position") - tuple(ss*(elapsed_time/2)))
+        else:
+            # Back both objects up to where they met, instead of where they ended up, on the far side
+            back = elapsed_time * (1 - toi)
+            self.model.SetProperty("position", self.model.GetProperty("position") - tuple(ss*back))
+            other_ui.model.SetProperty("position", other_ui.model.GetProperty("position") - tuple(os*back))
 
         # Finally perform the actual bounces
         if selfBounce and "H" in selfAxes:
@@ -358,13 +429,17 @@ class UiView(object):
 
         return didRun
 
-    def DoPaint(self, gc):
-        # Recursively paint this object and all children
+    def DoPaint(self, gc, updateBox=None):
+        # Recursively paint this object and all children, skipping any that are outside of updateBox
         self.PrePaint(gc)
         if self.model.IsVisible():
             self.Paint(gc)
             for ui in self.uiViews:
-                ui.DoPaint(gc)
+                if updateBox:
+                    box = ui.GetPaintBox()
+                    if box and not geometry.BoxesOverlap(box, updateBox):
+                        continue
+                ui.DoPaint(gc, updateBox)
         self.PostPaint(gc)
 
     def DoPaintSelectionBoxes(self, gc):
@@ -400,7 +475,7 @@ class UiView(object):
     def PaintBoundingBox(self, gc, color='Gray'):
         if self.stackManager.isEditing:
             gc.SetBrush(wx.TRANSPARENT_BRUSH)
-            gc.SetPen(wx.Pen(color, self.stackManager.view.FromDIP(1), wx.PENSTYLE_DOT))
+            gc.SetPen(PaintResources.shared().Pen(color, self.stackManager.view.FromDIP(1), wx.PENSTYLE_DOT))
 
             pos = wx.Point(0,0)-[int(x) for x in self.model.GetProperty("position")]
             f = self.model.GetFrame()
@@ -413,13 +488,13 @@ class UiView(object):
             f = self.model.GetFrame()
             f.Offset(pos)
 
-            gc.SetPen(wx.Pen('Blue', self.stackManager.view.FromDIP(3), wx.PENSTYLE_SHORT_DASH))
+            gc.SetPen(PaintResources.shared().Pen('Blue', self.stackManager.view.FromDIP(3), wx.PENSTYLE_SHORT_DASH))
             gc.SetBrush(wx.TRANSPARENT_BRUSH)
             gc.DrawRectangle(f.Inflate(2))
 
             if self.model.parent and self.model.parent.type != "group":
                 gc.SetPen(wx.TRANSPARENT_PEN)
-                gc.SetBrush(wx.Brush('Blue', wx.BRUSHSTYLE_SOLID))
+                gc.SetBrush(PaintResources.shared().Brush('Blue'))
                 for box in self.GetLocalResizeBoxRects().values():
                     gc.DrawRectangle(wx.Rect(box.TopLeft + f.TopLeft, box.Size))
                 rotPt = self.GetLocalRotationHandlePoint()
@@ -430,16 +505,23 @@ class UiView(object):
         # Un-transform the coordinate system after drawing this object
         gc.cachedGC.PopState()
 
-    def HitTest(self, pt):
-        f = self.model.GetAbsoluteFrame()
+    def GetHitTestInflation(self):
         inflate = 20
         if "pen_thickness" in self.model.properties:
             inflate += self.model.properties["pen_thickness"]
-        f.Inflate(int(inflate))
+        return int(inflate)
+
+    def GetHitTestBox(self):
+        # The (x1, y1, x2, y2) box of points that HitTest() checks against the hit region, for the StackManager's hitIndex
+        f = self.model.GetAbsoluteFrame()
+        f.Inflate(self.GetHitTestInflation())
+        return (f.x, f.y, f.x + f.width, f.y + f.height)
+
+    def HitTest(self, pt):
+        f = self.model.GetAbsoluteFrame()
+        f.Inflate(self.GetHitTestInflation())
         if f.Contains(pt):
-            if not self.hitRegion:
-                self.MakeHitRegion()
-            if self.hitRegion.Contains(pt):
+            if self.GetHitRegion().Contains(pt):
                 return self
         return None
 
@@ -488,28 +570,74 @@ class UiView(object):
 
     def ClearHitRegion(self, noParent=False):
         self.hitRegion = None
+        self.hitRegionBase = None
         if self.parent and noParent == False and self.parent.model.type == "group":
             self.parent.ClearHitRegion()
 
     def GetHitRegion(self):
         if not self.hitRegion:
-            self.MakeHitRegion()
+            if self.hitRegionBase:
+                self.PlaceHitRegion()
+            else:
+                self.MakeHitRegion()
         return self.hitRegion
 
     def MoveHitRegion(self):
         if self.hitRegion:
-            oldPos = self.hitRegionOffset
-            newPos = self.model.GetAbsolutePosition()
-            self.hitRegion.Offset(wx.Point(newPos-oldPos))
-            self.hitRegionOffset += tuple(wx.Point(newPos-oldPos))
+            if self.hitRegionBase:
+                # Place a copy of the base region at the new position lazily, the next time it's needed
+                self.hitRegion = None
+            else:
+                oldPos = self.hitRegionOffset
+                newPos = self.model.GetAbsolutePosition()
+                self.hitRegion.Offset(wx.Point(newPos-oldPos))
+                self.hitRegionOffset += tuple(wx.Point(newPos-oldPos))
             if self.parent and self.parent.model.type == "group":
                 self.parent.ClearHitRegion()
 
+    @staticmethod
+    def AffineKey(aff):
+        # The rotation and scale part of an affine tuple, which, unlike the translation, changes a hit region's shape
+        return (round(aff[0], 6), round(aff[1], 6), round(aff[2], 6), round(aff[3], 6))
+
+    def GetHitRegionKey(self):
+        """
+        Returns a key for the HitRegionCache describing everything that this object's hit region's shape depends on,
+        or None if it shouldn't be shared, like while it's showing resize handles.
+        """
+        if self.stackManager.isEditing and self.isSelected and self.stackManager.tool.name == "hand":
+            return None
+        s = self.model.GetProperty("size")
+        return ("view", int(s.Width), int(s.Height), self.AffineKey(self.model.GetAbsoluteAffine()))
+
     def MakeHitRegion(self):
-        # Make a region in absolute/card coordinates
-        if not self.model.IsVisible():
-            self.hitRegion = wx.Region((0,0), (0,0))
+        # Make a region in absolute/card coordinates, reusing a cached region of the same shape if there is one
+        cache = HitRegionCache.shared()
+        key = self.GetHitRegionKey()
+        cached = cache.Get(key) if key else None
+        if cached:
+            base, relOrigin = cached
+        else:
+            base, relOrigin = self.RasterizeHitRegion()
+            if key:
+                cache.Put(key, (base, relOrigin))
+        self.hitRegionBase = base
+        self.hitRegionRelOrigin = relOrigin
+        self.PlaceHitRegion()
+
+    def PlaceHitRegion(self):
+        # Offset a copy of the base region to this object's current absolute position
+        pos = self.model.GetAbsolutePosition()
+        reg = wx.Region(self.hitRegionBase)
+        reg.Offset(int(round(pos[0] + self.hitRegionRelOrigin[0], 6)), int(round(pos[1] + self.hitRegionRelOrigin[1], 6)))
+        self.hitRegion = reg
+        self.hitRegionOffset = pos
 
+    def RasterizeHitRegion(self):
+        """
+        Draw this object's hit region, and return it, un-offset, along with the offset from this object's absolute
+        position to where the region belongs.
+        """
         s = self.model.GetProperty("size")
         rect = wx.Rect(0, 0, s.Width + 1, s.Height + 1)
         points = self.model.RotatedRectPoints(rect)
@@ -557,9 +685,8 @@ class UiView(object):
 
         reg = img.ConvertToRegion(0,0,0)
         ImageFactory.shared().RecycleImage(img)
-        reg.Offset(int(rotPos_x-regOffset), int(rotPos_y-regOffset))
-        self.hitRegion = reg
-        self.hitRegionOffset = self.model.GetAbsolutePosition()
+        pos = self.model.GetAbsolutePosition()
+        return reg, (rotPos_x - regOffset - pos[0], rotPos_y - regOffset - pos[1])
 
     def MakeRegionFromLocalRect(self, rect):
         # Make a region in absolute/card coordinates
@@ -629,11 +756,16 @@ class ViewModel(object):
 
     minSize = wx.Size(20, 20)
     reservedNames = helpDataGen.HelpData.ReservedNames()
+    transformRebuilds = 0  # How many absolute transforms have been rebuilt, for the Profiler window
 
     def __init__(self, stackManager):
         super().__init__()
         self.type = None
         self.parent = None
+        self.transformGen = 0
+        self.paintGen = 0  # Bumped whenever this model, or anything inside it, may look different
+        self.transformCache = None  # (transformGen, affine tuple)
+        self.frameCache = None  # (transformGen, wx.Rect)
         self.handlers = {"on_setup": "",
                          "on_mouse_enter": "",
                          "on_mouse_press": "",
@@ -665,6 +797,8 @@ class ViewModel(object):
                               }
 
         self.childModels = []
+        self.childNameIndex = None  # name -> child model, rebuilt by GetChildByName() after any changes
+        self.childNameGen = 0
         self.stackManager = stackManager
         self.isDirty = False
         self.proxy = None
@@ -687,6 +821,7 @@ class ViewModel(object):
             for child in self.childModels:
                 child.SetBackUp(stackManager)
                 child.parent = self
+            self.InvalidateTransform()
 
     def SetDown(self):
         with self.animLock:
@@ -705,6 +840,7 @@ class ViewModel(object):
         for child in self.childModels:
             child.DismantleChildTree()
         self.childModels = None
+        self.InvalidateChildNames()
 
     def CreateCopy(self, name=None):
         data = self.GetData()
@@ -773,22 +909,59 @@ class ViewModel(object):
         for m in self.childModels:
             m.SetStackManager(stackManager)
 
+    def InvalidateTransform(self):
+        # Drop the cached absolute transform and frame of this model, and of its children, which are built on it.
+        # Call this after moving, resizing or rotating this model, or moving it into or out of a group.
+        self.transformGen += 1
+        self.InvalidatePaint()
+        for child in self.childModels:
+            child.InvalidateTransform()
+            child.MarkPaintDirty()
+
+    def InvalidatePaint(self):
+        # Bump paintGen here and on any enclosing groups, so cached renders of them, like LayerCache layers, get
+        # rebuilt even for changes that don't go through Notify()
+        self.paintGen += 1
+        parent = self.parent
+        while parent and parent.type == "group":
+            parent.paintGen += 1
+            parent = parent.parent
+
+    def MarkPaintDirty(self):
+        # Make sure this model's view gets repainted, for changes that don't go through Notify()
+        if self.stackManager:
+            self.stackManager.view.MarkModelDirty(self)
+
+    def GetAbsoluteAffine(self):
+        """
+        Returns the transform that converts local coords to abs coords, as an (m11, m12, m21, m22, tx, ty) tuple,
+        built on the parent's, and cached until this model or an ancestor moves, resizes, rotates, or is regrouped.
+        """
+        if self.type in ["card", "stack"]:
+            return geometry.IDENTITY
+        cache = self.transformCache
+        if cache and cache[0] == self.transformGen:
+            return cache[1]
+
+        gen = self.transformGen
+        aff = self.parent.GetAbsoluteAffine() if self.parent else geometry.IDENTITY
+        pos = self.properties["position"]
+        size = self.properties["size"]
+        rot = self.properties.get("rotation")
+        aff = geometry.AffineTranslate(aff, pos[0] + size[0]/2, pos[1] + size[1]/2)
+        if rot:
+            aff = geometry.AffineRotate(aff, math.radians(-rot))
+        aff = geometry.AffineTranslate(aff, -size[0]/2, -size[1]/2)
+        # If anything changed while we were building it, gen will be stale, and the next call will rebuild it
+        self.transformCache = (gen, aff)
+        ViewModel.transformRebuilds += 1
+        return aff
+
     def GetAffineTransform(self):
-        # Get the transform that converts local coords to abs coords
-        m = self
-        ancestors = []
+        # Get the transform that converts local coords to abs coords.  This is a new copy, so callers can change it.
+        m = self.GetAbsoluteAffine()
         aff = wx.AffineMatrix2D()
-        while m and m.type not in ["card", "stack"]:
-            ancestors.append(m)
-            m = m.parent
-        for m in reversed(ancestors):
-            pos = m.GetProperty("position")
-            size = m.GetProperty("size")
-            rot = m.GetProperty("rotation")
-            aff.Translate(pos[0] + size[0]/2, pos[1] + size[1]/2)
-            if rot:
-                aff.Rotate(math.radians(-rot))
-            aff.Translate(-size[0]/2, -size[1]/2)
+        aff.Set(wx.Matrix2D(m[0], m[1], m[2], m[3]), wx.Point2D(m[4], m[5]))
         return aff
 
     def RotatedPoints(self, points, aff=None):
@@ -887,7 +1060,13 @@ class ViewModel(object):
     def GetAbsoluteFrame(self):
         if self.parent and self.parent.type == "card" and not self.GetProperty("rotation"):
             return self.GetFrame()
-        return self.RotatedRect(wx.Rect(wx.Point(0,0), self.properties["size"]))
+        cache = self.frameCache
+        if cache and cache[0] == self.transformGen:
+            return wx.Rect(cache[1])
+        gen = self.transformGen
+        rect = self.RotatedRect(wx.Rect(wx.Point(0,0), self.properties["size"]))
+        self.frameCache = (gen, rect)
+        return wx.Rect(rect)
 
     def SetFrame(self, rect):
         self.SetProperty("position", rect.Position)
@@ -918,6 +1097,7 @@ class ViewModel(object):
     def SetData(self, data):
         for k, v in data["handlers"].items():
             self.handlers[k] = v
+        self.InvalidateSubscribers()
         for k, v in data["properties"].items():
             if k in self.propertyTypes:
                 if self.propertyTypes[k] == "point":
@@ -932,6 +1112,7 @@ class ViewModel(object):
     def SetFromModel(self, model):
         for k, v in model.handlers.items():
             self.handlers[k] = v
+        self.InvalidateSubscribers()
         for k, v in model.properties.items():
             if self.propertyTypes[k] == "point":
                 self.SetProperty(k, wx.Point(tuple(int(x) for x in v)), notify=False)
@@ -991,6 +1172,26 @@ class ViewModel(object):
             m = m.parent
         return False
 
+    def InvalidateChildNames(self):
+        # Call this after adding, removing, reordering or renaming any of this model's childModels
+        self.childNameGen += 1
+        self.childNameIndex = None
+
+    def GetChildByName(self, name):
+        """ Returns the first of this model's direct childModels with this name, or None, using childNameIndex. """
+        if self.childModels is None:
+            # Already dismantled by DismantleChildTree()
+            return None
+        index = self.childNameIndex
+        if index is None:
+            gen = self.childNameGen
+            index = {}
+            for m in reversed(self.childModels):
+                index[m.properties["name"]] = m
+            if gen == self.childNameGen:
+                self.childNameIndex = index
+        return index.get(name)
+
     def GetChildModelByName(self, name):
         if self.properties["name"] == name:
             return self
@@ -1013,6 +1214,29 @@ class ViewModel(object):
             m = m.parent
         return m
 
+    def FindTouchingModels(self, models):
+        """
+        Returns the models in this list that are touching this model, in list order, without duplicates.  Skips
+        models that aren't on this model's card, and this model's own group ancestors and children.
+        """
+        card = self.GetCard()
+        if not card or self.didSetDown:
+            return []
+        skip = {self}
+        m = self.parent
+        while m and m.type == "group":
+            skip.add(m)
+            m = m.parent
+        if self.type == "group":
+            skip.update(self.GetAllChildModels())
+
+        candidates = []
+        for m in models:
+            if m not in skip and not m.didSetDown and m.type not in ["card", "stack"] and m.GetCard() is card:
+                skip.add(m)
+                candidates.append(m)
+        return geometry.FindTouching(self, candidates)
+
     def GetProperties(self):
         return self.properties
 
@@ -1028,6 +1252,7 @@ class ViewModel(object):
             return
         self.parent.childModels.remove(self)
         self.parent.childModels.insert(index, self)
+        self.parent.InvalidateChildNames()
         if self.GetCard() == self.stackManager.uiCard.model:
             ui = self.stackManager.GetUiViewByModel(self)
             if ui.view:
@@ -1035,7 +1260,8 @@ class ViewModel(object):
             else:
                 ui.parent.uiViews.remove(ui)
                 ui.parent.uiViews.insert(index, ui)
-                self.stackManager.view.Refresh()
+                self.stackManager.InvalidateNameIndex()
+                ui.RefreshBounds()
 
     def OrderMoveBy(self, delta):
         index = self.parent.childModels.index(self) + delta
@@ -1088,8 +1314,16 @@ class ViewModel(object):
 
         if self.properties[key] != value:
             self.properties[key] = value
+            if key in ["position", "size", "rotation"]:
+                self.InvalidateTransform()
+            elif key == "name" and self.parent:
+                self.parent.InvalidateChildNames()
+            if key not in UiView.NON_VISUAL_PROPERTIES:
+                self.InvalidatePaint()
             if notify:
                 self.Notify(key)
+            elif key not in UiView.NON_VISUAL_PROPERTIES:
+                self.MarkPaintDirty()
             self.isDirty = True
 
     @staticmethod
@@ -1135,6 +1369,14 @@ class ViewModel(object):
         if self.handlers[key] != value:
             self.handlers[key] = value
             self.isDirty = True
+            self.InvalidateSubscribers()
+
+    def InvalidateSubscribers(self):
+        # Call this after changing this model's handlers, or adding or removing objects on its card
+        card = self.GetCard()
+        if card:
+            card.subscriberGen += 1
+            card.subscriberIndex = None
 
     def SetBounceModels(self, models):
         objs = {}
@@ -1252,9 +1494,9 @@ class ViewProxy(object):
     def __getattr__(self, item):
         model = self._model
         if model:
-            for m in model.childModels:
-                if m.properties["name"] == item:
-                    return m.GetProxy()
+            m = model.GetChildByName(item)
+            if m:
+                return m.GetProxy()
         return super().__getattribute__(item)
 
     def send_message(self, message):
@@ -1542,6 +1784,7 @@ class ViewProxy(object):
             raise TypeError(f"set_code_for_event(): this object has no event called '{eventName}'")
 
         model.handlers[eventName] = code
+        model.InvalidateSubscribers()
         model.stackManager.runner.HandlerChanged(model, eventName)
 
     def set_bounce_objects(self, objects):
@@ -1564,17 +1807,8 @@ class ViewProxy(object):
             raise ValueError("is_touching_point(): point needs to be a point or a list of two numbers")
 
         model = self._model
-        if not model: return False
-
-        @RunOnMainSync
-        def f():
-            if model.didSetDown: return False
-            s = model.stackManager.GetUiViewByModel(model)
-            if not s:
-                return False
-            sreg = s.GetHitRegion()
-            return sreg.Contains(wx.Point(tuple(int(x) for x in point))) == wx.InRegion
-        return f()
+        if not model or model.didSetDown: return False
+        return geometry.ShapeContainsPoint(geometry.ShapeForModel(model), point)
 
     def is_touching(self, obj):
         if not isinstance(obj, ViewProxy):
@@ -1582,20 +1816,10 @@ class ViewProxy(object):
 
         model = self._model
         oModel = obj._model
-        if not model or not oModel: return False
-
-        @RunOnMainSync
-        def f():
-            if model.didSetDown: return False
-            s = model.stackManager.GetUiViewByModel(model)
-            o = model.stackManager.GetUiViewByModel(oModel)
-            if not s or not o:
-                return False
-            sreg = wx.Region(s.GetHitRegion())
-            oreg = o.GetHitRegion()
-            sreg.Intersect(oreg)
-            return not sreg.IsEmpty()
-        return f()
+        if not model or not oModel or model.didSetDown or oModel.didSetDown: return False
+        if model.GetCard() is not oModel.GetCard(): return False
+        # Decided analytically from model data, so this doesn't need to wait for the main thread
+        return geometry.ShapesTouch(geometry.ShapeForModel(model), geometry.ShapeForModel(oModel))
 
     def is_touching_edge(self, obj, skipIsTouchingCheck=False):
         if not isinstance(obj, ViewProxy):
@@ -1603,67 +1827,25 @@ class ViewProxy(object):
 
         model = self._model
         oModel = obj._model
-        if not model or not oModel: return []
-        ui = model.stackManager.GetUiViewByModel(model)
-        oUi = model.stackManager.GetUiViewByModel(oModel)
+        if not model or not oModel or model.didSetDown or oModel.didSetDown: return []
+        if model.GetCard() is not oModel.GetCard(): return []
 
-        @RunOnMainSync
-        def f():
-            if model.didSetDown or oModel.didSetDown: return []
-
-            if not skipIsTouchingCheck and not self.is_touching(obj):
-                return []
-
-            def intersectTest(r, edge):
-                testReg = wx.Region(r)
-                testReg.Intersect(edge)
-                return not testReg.IsEmpty()
-
-            reg = ui.GetHitRegion()
-            oRot = oModel.GetProperty("rotation")
-            if oRot is None: oRot = 0
-
-            rect = oModel.GetFrame() # other frame in card coords
-            cornerSetback = 4
-            # Pull edge lines away from the corners, so we don't always hit a corner when 2 objects touch
-            rects = [wx.Rect(rect.TopLeft+(cornerSetback,0), rect.TopRight+(-cornerSetback,1)),
-                      wx.Rect(rect.TopRight+(-1,cornerSetback), rect.BottomRight+(0,-cornerSetback)),
-                      wx.Rect(rect.BottomLeft+(cornerSetback,-1), rect.BottomRight+(-cornerSetback,0)),
-                      wx.Rect(rect.TopLeft+(0,cornerSetback), rect.BottomLeft+(1,-cornerSetback))]
-
-            if oRot == 0:
-                bottom = rects[0]
-                right = rects[1]
-                top = rects[2]
-                left = rects[3]
-            else:
-                for r in rects:
-                    r.Offset(wx.Point(0,0)-rect.TopLeft)
-                bottom = oUi.MakeRegionFromLocalRect(rects[0])
-                right = oUi.MakeRegionFromLocalRect(rects[1])
-                top = oUi.MakeRegionFromLocalRect(rects[2])
-                left = oUi.MakeRegionFromLocalRect(rects[3])
-
-            def RotEdge(rot):
-                # Rotate reported edge hits according to other object's rotation
-                edgesMap = [["Top"], ["Top", "Right"], ["Right"], ["Bottom", "Right"],
-                            ["Bottom"], ["Bottom", "Left"], ["Left"], ["Top", "Left"]]
-                i = int(((rot+22.5)%360)/45)
-                return edgesMap[i]
-
-            edges = set()
-            if intersectTest(reg, top): [edges.add(e) for e in RotEdge(oRot)]
-            if intersectTest(reg, bottom): [edges.add(e) for e in RotEdge(oRot+180)]
-            if intersectTest(reg, left): [edges.add(e) for e in RotEdge(oRot+270)]
-            if intersectTest(reg, right): [edges.add(e) for e in RotEdge(oRot+90)]
-            if len(edges) == 3 and "Top" in edges and "Bottom" in edges:
-                edges.remove("Top")
-                edges.remove("Bottom")
-            if len(edges) == 3 and "Left" in edges and "Right" in edges:
-                edges.remove("Left")
-                edges.remove("Right")
-            return edges
-        return f()
+        parts = geometry.ShapeForModel(model)
+        if not skipIsTouchingCheck and not geometry.ShapesTouch(parts, geometry.ShapeForModel(oModel)):
+            return []
+        return geometry.TouchingEdges(parts, oModel)
+
+    def touching_any(self, objects):
+        if not isinstance(objects, (list, tuple)):
+            raise TypeError("touching_any(): objects needs to be a list of cardstock objects")
+        for o in objects:
+            if not isinstance(o, ViewProxy):
+                raise TypeError("touching_any(): objects needs to be a list of cardstock objects")
+
+        model = self._model
+        if not model: return []
+        models = [o._model for o in objects if o._model]
+        return [m.GetProxy() for m in model.FindTouchingModels(models)]
 
     def animate_position(self, duration, end_position, easing=None, on_finished=None):
         if not isinstance(duration, (int, float)):
@@ -10,6 +10,7 @@ import wx
 from uiView import *
 from urllib.parse import urlparse
 import wx.html2
+from paintResources import PaintResources
 
 
 class UiWebView(UiView):
@@ -70,7 +71,7 @@ class UiWebView(UiView):
     def PaintBoundingBox(self, gc, color='Gray'):
         if self.stackManager.isEditing:
             gc.SetBrush(wx.TRANSPARENT_BRUSH)
-            gc.SetPen(wx.Pen(color, 1, wx.PENSTYLE_DOT))
+            gc.SetPen(PaintResources.shared().Pen(color, 1, wx.PENSTYLE_DOT))
 
             pos = wx.Point(0,0)-tuple(int(x) for x in self.model.GetProperty("position"))
             f = self.model.GetFrame()
@@ -29,6 +29,7 @@ import helpDialogs
 from findEngineViewer import FindEngine
 from consoleWindow import ConsoleWindow
 from variablesWindow import VariablesWindow
+from profilerWindow import ProfilerWindow
 from codeRunnerThread import RunOnMainSync, RunOnMainAsync
 
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -41,6 +42,7 @@ ID_MENU_FIND_PREV = wx.NewIdRef()
 ID_MENU_REPLACE = wx.NewIdRef()
 ID_SHOW_VARIABLES = wx.NewIdRef()
 ID_SHOW_CONSOLE = wx.NewIdRef()
+ID_SHOW_PROFILER = wx.NewIdRef()
 ID_CLEAR_CONSOLE = wx.NewIdRef()
 
 # ----------------------------------------------------------------------
@@ -81,8 +83,10 @@ class ViewerFrame(wx.Frame):
         self.consoleWindow = ConsoleWindow(self, not self.isStandalone)
         if self.isStandalone:
             self.variablesWindow = None
+            self.profilerWindow = None
         else:
             self.variablesWindow = VariablesWindow(self, self.stackManager)
+            self.profilerWindow = ProfilerWindow(self, self.stackManager)
 
     def Destroy(self):
         if self.consoleWindow:
@@ -156,6 +160,8 @@ class ViewerFrame(wx.Frame):
         if not self.isStandalone:
             helpMenu.Append(ID_SHOW_VARIABLES, "&Show/Hide Variables\tCtrl-Alt-V", "Toggle Variables")
         helpMenu.Append(ID_SHOW_CONSOLE, "&Show/Hide Console\tCtrl-Alt-O", "Toggle Console")
+        if not self.isStandalone:
+            helpMenu.Append(ID_SHOW_PROFILER, "&Show/Hide Profiler\tCtrl-Alt-P", "Toggle Profiler")
 
         # and add them to a menubar
         menuBar = wx.MenuBar()
@@ -188,6 +194,7 @@ class ViewerFrame(wx.Frame):
 
         if not self.isStandalone:
             self.Bind(wx.EVT_MENU, self.OnMenuShowVariablesWindow, id=ID_SHOW_VARIABLES)
+            self.Bind(wx.EVT_MENU, self.OnMenuShowProfilerWindow, id=ID_SHOW_PROFILER)
         self.Bind(wx.EVT_MENU, self.OnMenuShowConsoleWindow, id=ID_SHOW_CONSOLE)
 
     def MakeConsoleMenuBar(self):
@@ -209,6 +216,8 @@ class ViewerFrame(wx.Frame):
             helpMenu.Append(ID_SHOW_VARIABLES, "&Show/Hide Variables\tCtrl-Alt-V", "Toggle Variables")
         helpMenu.Append(ID_SHOW_CONSOLE, "&Hide Console\tCtrl-Alt-O", "Toggle Console")
         helpMenu.Append(ID_CLEAR_CONSOLE, "&Clear Console\tCtrl-Alt-C", "Clear Console")
+        if not self.isStandalone:
+            helpMenu.Append(ID_SHOW_PROFILER, "&Show/Hide Profiler\tCtrl-Alt-P", "Toggle Profiler")
 
         # and add them to a menubar
         menuBar = wx.MenuBar()
@@ -224,6 +233,7 @@ class ViewerFrame(wx.Frame):
 
         if not self.isStandalone:
             self.consoleWindow.Bind(wx.EVT_MENU, self.OnMenuShowVariablesWindow, id=ID_SHOW_VARIABLES)
+            self.consoleWindow.Bind(wx.EVT_MENU, self.OnMenuShowProfilerWindow, id=ID_SHOW_PROFILER)
         self.consoleWindow.Bind(wx.EVT_MENU, self.OnMenuShowConsoleWindow, id=ID_SHOW_CONSOLE)
         self.consoleWindow.Bind(wx.EVT_MENU, self.OnMenuClearConsoleWindow, id=ID_CLEAR_CONSOLE)
 
@@ -244,6 +254,7 @@ class ViewerFrame(wx.Frame):
         helpMenu = wx.Menu()
         helpMenu.Append(ID_SHOW_VARIABLES, "&Hide Variables\tCtrl-Alt-V", "Toggle Variables")
         helpMenu.Append(ID_SHOW_CONSOLE, "&Show/Hide Console\tCtrl-Alt-O", "Toggle Console")
+        helpMenu.Append(ID_SHOW_PROFILER, "&Show/Hide Profiler\tCtrl-Alt-P", "Toggle Profiler")
 
         # and add them to a menubar
         menuBar = wx.MenuBar()
@@ -256,6 +267,30 @@ class ViewerFrame(wx.Frame):
 
         self.variablesWindow.Bind(wx.EVT_MENU, self.OnMenuShowVariablesWindow, id=ID_SHOW_VARIABLES)
         self.variablesWindow.Bind(wx.EVT_MENU, self.OnMenuShowConsoleWindow, id=ID_SHOW_CONSOLE)
+        self.variablesWindow.Bind(wx.EVT_MENU, self.OnMenuShowProfilerWindow, id=ID_SHOW_PROFILER)
+
+    def MakeProfilerMenuBar(self):
+        # create the file menu
+        fileMenu = wx.Menu()
+        fileMenu.Append(ID_SHOW_PROFILER, "&Close\tCtrl-W", "Close Profiler")
+
+        # and the help menu
+        helpMenu = wx.Menu()
+        helpMenu.Append(ID_SHOW_VARIABLES, "&Show/Hide Variables\tCtrl-Alt-V", "Toggle Variables")
+        helpMenu.Append(ID_SHOW_CONSOLE, "&Show/Hide Console\tCtrl-Alt-O", "Toggle Console")
+        helpMenu.Append(ID_SHOW_PROFILER, "&Hide Profiler\tCtrl-Alt-P", "Toggle Profiler")
+
+        # and add them to a menubar
+        menuBar = wx.MenuBar()
+        menuBar.Append(fileMenu, "&File")
+        menuBar.Append(helpMenu, "&Help")
+        self.profilerWindow.SetMenuBar(menuBar)
+
+        self.profilerWindow.Bind(wx.EVT_MENU,   self.OnMenuClose, id=wx.ID_CLOSE)
+
+        self.profilerWindow.Bind(wx.EVT_MENU, self.OnMenuShowVariablesWindow, id=ID_SHOW_VARIABLES)
+        self.profilerWindow.Bind(wx.EVT_MENU, self.OnMenuShowConsoleWindow, id=ID_SHOW_CONSOLE)
+        self.profilerWindow.Bind(wx.EVT_MENU, self.OnMenuShowProfilerWindow, id=ID_SHOW_PROFILER)
 
     wildcard = "CardStock files (*.cds)|*.cds"
 
@@ -449,6 +484,13 @@ class ViewerFrame(wx.Frame):
     def UpdateVars(self):
         self.variablesWindow.UpdateVars()
 
+    def OnMenuShowProfilerWindow(self, event):
+        if self.profilerWindow.IsShown():
+            self.profilerWindow.Hide()
+        else:
+            self.profilerWindow.Show()
+            self.profilerWindow.Raise()
+
     def OnMenuShowConsoleWindow(self, event):
         if self.consoleWindow.IsShown():
             self.consoleWindow.Hide()
@@ -566,6 +608,8 @@ class ViewerFrame(wx.Frame):
             self.MakeConsoleMenuBar()
         if self.variablesWindow:
             self.MakeVariablesMenuBar()
+        if self.profilerWindow:
+            self.MakeProfilerMenuBar()
 
         if self.designer:
             runner.AddSyntaxErrors(self.designer.stackManager.analyzer.syntaxErrors)
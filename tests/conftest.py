@@ -0,0 +1,35 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import sys
+import pytest
+
+# CardStock's modules import each other by their bare names, so run them from the cardstock directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cardstock"))
+
+
+@pytest.fixture(scope="session")
+def wxApp():
+    wx = pytest.importorskip("wx")
+    app = wx.App()
+    yield app
+    app.Destroy()
+
+
+@pytest.fixture
+def stackManager(wxApp):
+    """ A StackManager showing an empty card, in a hidden frame, with its periodic timer stopped. """
+    import wx
+    from stackManager import StackManager
+    frame = wx.Frame(None)
+    sm = StackManager(frame, False)
+    if sm.timer:
+        sm.timer.Stop()
+    yield sm
+    frame.Destroy()
@@ -0,0 +1,48 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+"""
+Random object corpora and reference checks shared by the tests that need real views.  perfBench has its own copies,
+so changing a benchmark can't change what these tests check.
+"""
+
+import wx
+import generator
+
+
+def MakeTouchingCorpus(stackManager, count, rng, area=300):
+    """ Adds count random objects to the stackManager's card: views and shapes, some rotated, in an area x area square. """
+    types = ["button", "label", "rect", "oval", "roundrect", "line", "pen", "polygon"]
+    uis = []
+    for i in range(count):
+        typeStr = rng.choice(types)
+        model = generator.StackGenerator.ModelFromType(stackManager, typeStr)
+        x, y = rng.randint(0, area - 40), rng.randint(0, area - 40)
+        w, h = rng.randint(4, 80), rng.randint(4, 80)
+        if typeStr in ["button", "label"]:
+            model.SetProperty("position", (x, y), notify=False)
+            model.SetProperty("size", (w, h), notify=False)
+        else:
+            if typeStr in ["rect", "oval", "roundrect", "line"]:
+                points = [(x, y), (x + w, y + h)]
+            else:
+                points = [(x + rng.randint(0, w), y + rng.randint(0, h)) for j in range(rng.randint(3, 8))]
+            model.SetShape({"type": typeStr, "pen_color": "black", "thickness": rng.choice([0, 1, 2, 4, 8]),
+                            "points": points})
+            model.ReCropShape()
+        if rng.random() < 0.4:
+            model.SetProperty("rotation", rng.choice([15.0, 30.0, 45.0, 90.0, 137.0, 180.0]), notify=False)
+        uis.append(stackManager.AddUiViewInternal(model))
+    return uis
+
+
+def RegionIsTouching(ui, oUi):
+    # The wx.Region based is_touching() that ViewProxy used before switching to the geometry module
+    sreg = wx.Region(ui.GetHitRegion())
+    sreg.Intersect(oUi.GetHitRegion())
+    return not sreg.IsEmpty()
@@ -0,0 +1,105 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+import frameTiming
+from frameTiming import FrameTiming
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(frameTiming, "perf_counter", clock)
+    return clock
+
+
+def RunTick(timing, clock, interval, phaseTimes):
+    clock.now += interval
+    timing.StartTick()
+    for i, t in enumerate(phaseTimes):
+        clock.now += t
+        timing.EndPhase(i)
+    timing.EndTick()
+
+
+def test_records_phases_and_skipped_frames(clock):
+    timing = FrameTiming()
+    RunTick(timing, clock, 0, [0.001, 0.002])
+    RunTick(timing, clock, 3 / 60 - 0.003, [0.001, 0.002])
+    ticks = timing.GetRecentTicks()
+    assert len(ticks) == 2
+    assert ticks[1]["interval"] == pytest.approx(3 / 60)
+    assert ticks[1]["skipped"] == 2
+    assert ticks[1]["jitter"] == pytest.approx(2 / 60)
+    assert ticks[1]["animations"] == pytest.approx(0.001)
+    assert ticks[1]["on_finished"] == pytest.approx(0.002)
+    assert ticks[1]["total"] == pytest.approx(0.003)
+    assert timing.GetSummary()["skipped"] == 2
+
+
+def test_ring_buffer_wraps_around(clock, monkeypatch):
+    monkeypatch.setattr(FrameTiming, "BUFFER_SIZE", 4)
+    timing = FrameTiming()
+    for i in range(10):
+        RunTick(timing, clock, 1 / 60, [i / 1000])
+    assert timing.numTicks == 10
+    ticks = timing.GetRecentTicks()
+    assert [round(t["animations"] * 1000) for t in ticks] == [6, 7, 8, 9]
+    assert [round(t["animations"] * 1000) for t in timing.GetRecentTicks(2)] == [8, 9]
+    summary = timing.GetSummary()
+    assert summary["animations"]["max"] == pytest.approx(0.009)
+    assert summary["animations"]["mean"] == pytest.approx(0.0075)
+
+
+def test_paints_wrap_around(clock, monkeypatch):
+    monkeypatch.setattr(FrameTiming, "BUFFER_SIZE", 3)
+    timing = FrameTiming()
+    for i in range(5):
+        timing.StartPaint()
+        clock.now += 0.01
+        timing.EndPaint(pixels=i)
+    assert [p["pixels"] for p in timing.GetRecentPaints()] == [2, 3, 4]
+    assert timing.GetSummary()["paint"]["mean"] == pytest.approx(0.01)
+
+
+def test_percentiles(clock):
+    timing = FrameTiming()
+    for i in range(1, 101):
+        RunTick(timing, clock, 1 / 60, [i / 1000])
+    summary = timing.GetSummary()
+    assert summary["animations"]["p95"] == pytest.approx(0.096)
+    assert summary["animations"]["max"] == pytest.approx(0.1)
+    assert summary["animations"]["mean"] == pytest.approx(0.0505)
+
+
+def test_empty_summary():
+    summary = FrameTiming().GetSummary()
+    assert summary["ticks"] == 0
+    assert summary["paint"] == {"mean": 0.0, "p95": 0.0, "max": 0.0}
+
+
+def test_log_file(clock, tmp_path):
+    filename = str(tmp_path / "timing.csv")
+    timing = FrameTiming(filename)
+    RunTick(timing, clock, 1 / 60, [0.001])
+    timing.StartPaint()
+    timing.EndPaint(pixels=50)
+    timing.Close()
+    with open(filename) as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("kind,start,interval")
+    assert lines[1].startswith("tick,")
+    assert lines[2].startswith("paint,") and lines[2].endswith(",50")
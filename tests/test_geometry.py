@@ -0,0 +1,175 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import math
+import random
+import pytest
+import geometry
+from geometry import Part, RectPoints
+
+
+def Rect(x1, y1, x2, y2, radius=0):
+    return [Part(RectPoints(x1, y1, x2, y2), True, True, True, radius)]
+
+
+def Line(points, radius):
+    return [Part(points, False, False, False, radius)]
+
+
+def test_overlapping_rects_touch():
+    assert geometry.ShapesTouch(Rect(0, 0, 10, 10), Rect(5, 5, 15, 15))
+    assert geometry.ShapesTouch(Rect(0, 0, 10, 10), Rect(2, 2, 4, 4))
+
+
+def test_edge_to_edge_rects_dont_touch():
+    # Like pixel regions, rects that only share an edge don't overlap
+    assert not geometry.ShapesTouch(Rect(0, 0, 10, 10), Rect(10, 0, 20, 10))
+    assert not geometry.ShapesTouch(Rect(0, 0, 10, 10), Rect(0, 10, 10, 20))
+    assert not geometry.ShapesTouch(Rect(0, 0, 10, 10), Rect(30, 30, 40, 40))
+
+
+def test_rotated_rects():
+    diamond = [Part([(10, 0), (20, 10), (10, 20), (0, 10)], True, True, True, 0)]
+    # Overlaps the diamond's bounding box corner, but not the diamond itself
+    assert not geometry.ShapesTouch(diamond, Rect(0, 0, 4, 4))
+    assert geometry.ShapesTouch(diamond, Rect(8, 8, 12, 12))
+
+
+def test_lines_use_their_radius():
+    line = Line([(0, 0), (100, 0)], 2)
+    assert geometry.ShapesTouch(line, Rect(50, 1, 60, 10))
+    assert not geometry.ShapesTouch(line, Rect(50, 3, 60, 10))
+    assert geometry.ShapesTouch(line, Line([(50, -50), (50, 50)], 0.5))
+
+
+def test_shape_inside_filled_polygon():
+    polygon = [Part([(0, 0), (100, 0), (50, 100)], True, True, False, 0)]
+    assert geometry.ShapesTouch(polygon, Rect(45, 20, 55, 30))
+    outline = [Part([(0, 0), (100, 0), (50, 100)], True, False, False, 1)]
+    assert not geometry.ShapesTouch(outline, Rect(45, 20, 55, 30))
+
+
+def test_point_in_polygon_is_even_odd():
+    square = RectPoints(0, 0, 10, 10)
+    assert geometry.PointInPolygon((5, 5), square)
+    assert not geometry.PointInPolygon((15, 5), square)
+    star = [(0, 0), (10, 10), (10, 0), (0, 10)]  # Self-intersecting bowtie
+    assert geometry.PointInPolygon((2, 5), star)
+    assert not geometry.PointInPolygon((5, 9), star)
+
+
+def test_shape_contains_point():
+    parts = Rect(0, 0, 10, 10)
+    assert geometry.ShapeContainsPoint(parts, (5, 5))
+    assert not geometry.ShapeContainsPoint(parts, (20, 5))
+
+
+def test_boxes():
+    assert geometry.BoxesOverlap((0, 0, 10, 10), (5, 5, 15, 15))
+    assert not geometry.BoxesOverlap((0, 0, 10, 10), (10, 0, 20, 10))
+    assert geometry.BoxesOverlap((0, 0, 10, 10), (11, 0, 20, 10), margin=2)
+    assert geometry.UnionBox((0, 0, 10, 10), (5, -5, 20, 5)) == (0, -5, 20, 10)
+    assert geometry.UnionBox(None, (1, 2, 3, 4)) == (1, 2, 3, 4)
+    assert geometry.ShapeBox([]) is None
+    assert geometry.ShapeBox(Rect(0, 0, 10, 10, radius=1)) == (-1, -1, 11, 11)
+
+
+def test_affine():
+    m = geometry.AffineTranslate(geometry.IDENTITY, 10, 20)
+    m = geometry.AffineRotate(m, math.pi / 2)
+    (x, y), = geometry.AffineTransformPoints(m, [(1, 0)])
+    assert x == pytest.approx(10)
+    assert y == pytest.approx(21)
+
+
+def test_ellipse_points_stay_on_the_ellipse():
+    points = geometry.EllipsePoints(0, 0, 100, 50)
+    assert 8 <= len(points) <= 256
+    for x, y in points:
+        assert ((x - 50) / 50) ** 2 + ((y - 25) / 25) ** 2 == pytest.approx(1)
+
+
+def test_swept_box_impact():
+    # A box moving right by 100 passed right through a wall from x=50 to x=52
+    hit = geometry.SweptBoxImpact((110, 0, 120, 10), (100, 0), (50, 0, 52, 10), (0, 0))
+    assert hit is not None
+    toi, edge = hit
+    assert edge == "Left"
+    assert toi == pytest.approx(0.3)
+    # Never reached the wall
+    assert geometry.SweptBoxImpact((40, 0, 45, 10), (30, 0), (50, 0, 52, 10), (0, 0)) is None
+    # Passed beside it
+    assert geometry.SweptBoxImpact((110, 20, 120, 30), (100, 0), (50, 0, 52, 10), (0, 0)) is None
+
+
+def test_rotated_edge_names():
+    assert geometry.RotatedEdgeNames(0) == ["Top"]
+    assert geometry.RotatedEdgeNames(90) == ["Right"]
+    assert geometry.RotatedEdgeNames(45) == ["Top", "Right"]
+    assert geometry.RotatedEdgeNames(360) == ["Top"]
+
+
+NEAR_MISS = 2  # Pixels.  Every allowed disagreement must flip when the shapes are moved this far.
+
+
+def DisagreementReason(modelA, modelB):
+    """
+    Returns which documented edge case a region vs. geometry disagreement between these two models falls under, or
+    None if they must agree exactly.  Each case comes from how wx rasterizes a hit region:
+    "rotated": rotated objects are drawn through a rotated path, so their edges land on anti-aliased, rounded pixels.
+    "curved": ovals and roundrects are rasterized curves, while geometry uses a tessellated oval or a swept rect.
+    "stroked": lines, pens, polygons and outlined shapes are rasterized with a pen of whole-pixel width and its own
+    joins and caps, while geometry sweeps them by exactly half the pen thickness.
+    """
+    for model in (modelA, modelB):
+        if model.GetProperty("rotation"):
+            return "rotated"
+    for model in (modelA, modelB):
+        if model.type in ["oval", "roundrect"]:
+            return "curved"
+    for model in (modelA, modelB):
+        if model.type in ["line", "pen", "polygon"] or (model.type == "rect" and model.GetProperty("pen_thickness")):
+            return "stroked"
+    return None
+
+
+def Inflated(parts, d):
+    return [Part(p.points, p.closed, p.filled, p.convex, p.radius + d) for p in parts]
+
+
+def Moved(parts, dx, dy):
+    return [Part([(x + dx, y + dy) for x, y in p.points], p.closed, p.filled, p.convex, p.radius) for p in parts]
+
+
+def test_touching_agrees_with_regions(stackManager):
+    """
+    Compares is_touching() from the geometry module against the wx.Region based test it replaced, over a corpus of
+    random, crowded, sometimes rotated views and shapes.  Pairs must agree exactly, unless they fall under one of the
+    edge cases in DisagreementReason(), and even then, only when they're within NEAR_MISS pixels of flipping.
+    """
+    from corpus import MakeTouchingCorpus, RegionIsTouching
+
+    uis = MakeTouchingCorpus(stackManager, 60, random.Random(1))
+    for a in uis:
+        for b in uis:
+            if a is b:
+                continue
+            shapeA = geometry.ShapeForModel(a.model)
+            shapeB = geometry.ShapeForModel(b.model)
+            region = RegionIsTouching(a, b)
+            if region == geometry.ShapesTouch(shapeA, shapeB):
+                continue
+            pair = (a.model.type, a.model.GetProperty("rotation"), b.model.type, b.model.GetProperty("rotation"))
+            assert DisagreementReason(a.model, b.model), pair
+            if region:
+                # A near miss: they touch once grown a little
+                assert geometry.ShapesTouch(Inflated(shapeA, NEAR_MISS / 2), Inflated(shapeB, NEAR_MISS / 2)), pair
+            else:
+                # A shallow overlap: moving one of them a little pulls them apart
+                assert any(not geometry.ShapesTouch(shapeA, Moved(shapeB, dx, dy))
+                           for dx, dy in [(NEAR_MISS, 0), (-NEAR_MISS, 0), (0, NEAR_MISS), (0, -NEAR_MISS)]), pair
@@ -0,0 +1,104 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import os
+import ast
+import pytest
+from handlerCache import HandlerCache, CompileHandlerSource, HasModuleReturn
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Keep the cache file out of the real user's cache folder
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    return HandlerCache()
+
+
+def Run(code):
+    env = {}
+    try:
+        exec(code, env)
+    except RuntimeError as e:
+        assert str(e) == "Return"
+    return env
+
+
+def test_compile_rewrites_module_level_returns():
+    env = Run(CompileHandlerSource("x = 1\nif x:\n    return\nx = 2"))
+    assert env["x"] == 1
+
+
+def test_compile_keeps_function_returns():
+    env = Run(CompileHandlerSource("def f():\n    return 3\ny = f()\nreturn\ny = 4"))
+    assert env["y"] == 3
+
+
+def test_compile_evaluates_returned_expressions():
+    env = Run(CompileHandlerSource("hits = []\nreturn hits.append(1)"))
+    assert env["hits"] == [1]
+
+
+def test_has_module_return():
+    assert HasModuleReturn(ast.parse("for i in range(3):\n    if i:\n        return"))
+    assert not HasModuleReturn(ast.parse("def f():\n    return 1\nclass A:\n    def g(self):\n        return 2"))
+    assert not HasModuleReturn(ast.parse("x = lambda: 1"))
+
+
+def test_compile_raises_syntax_errors():
+    with pytest.raises(SyntaxError):
+        CompileHandlerSource("x = (")
+
+
+def test_get_and_put(cache):
+    assert cache.Get("card_1.on_setup", "x = 1") is None
+    code = CompileHandlerSource("x = 1")
+    cache.Put("card_1.on_setup", "x = 1", code)
+    assert cache.Get("card_1.on_setup", "x = 1") is code
+    assert cache.Get("card_1.on_setup", "x = 2") is None
+    assert cache.GetStats()["hits"] == 1
+    assert cache.GetStats()["misses"] == 2
+
+
+def test_same_source_at_different_paths_gets_different_entries(cache):
+    codeA = CompileHandlerSource("x = 1")
+    codeB = CompileHandlerSource("x = 1")
+    cache.Put("card_1.button_1.on_click", "x = 1", codeA)
+    cache.Put("card_1.button_2.on_click", "x = 1", codeB)
+    assert cache.Get("card_1.button_1.on_click", "x = 1") is codeA
+    assert cache.Get("card_1.button_2.on_click", "x = 1") is codeB
+
+
+def test_save_and_load(cache):
+    cache.Put("card_1.on_setup", "x = 5", CompileHandlerSource("x = 5"))
+    cache.Save()
+    reloaded = HandlerCache()
+    code = reloaded.Get("card_1.on_setup", "x = 5")
+    assert code is not None
+    assert Run(code)["x"] == 5
+
+
+def test_other_versions_are_ignored(cache, monkeypatch):
+    cache.Put("card_1.on_setup", "x = 5", CompileHandlerSource("x = 5"))
+    cache.Save()
+    monkeypatch.setattr(HandlerCache, "CACHE_VERSION", HandlerCache.CACHE_VERSION + 1)
+    assert HandlerCache().Get("card_1.on_setup", "x = 5") is None
+
+
+def test_corrupt_file_is_ignored(cache):
+    os.makedirs(os.path.dirname(cache.path))
+    with open(cache.path, 'wb') as f:
+        f.write(cache.header + b"garbage")
+    assert HandlerCache().Get("card_1.on_setup", "x = 5") is None
+
+
+def test_clear_cache(cache):
+    cache.Put("card_1.on_setup", "x = 5", CompileHandlerSource("x = 5"))
+    cache.ClearCache()
+    assert cache.Get("card_1.on_setup", "x = 5") is None
+    assert cache.GetStats()["entries"] == 0
@@ -0,0 +1,60 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+from handlerProfiler import HandlerProfiler
+
+
+def test_stats_per_key():
+    profiler = HandlerProfiler()
+    for duration in [0.1, 0.2, 0.3]:
+        profiler.Record("card_1.button_1", "on_click", "", duration)
+    profiler.Record("card_1.button_1", "on_click", "helper", 1.0)
+    stats = profiler.GetStats()
+    assert [s["function"] for s in stats] == ["helper", ""]  # Sorted by total time
+    s = stats[1]
+    assert (s["path"], s["handler"], s["count"]) == ("card_1.button_1", "on_click", 3)
+    assert abs(s["total"] - 0.6) < 1e-9
+    assert abs(s["mean"] - 0.2) < 1e-9
+    assert s["max"] == 0.3
+
+
+def test_p95():
+    profiler = HandlerProfiler()
+    for i in range(100):
+        profiler.Record("card_1", "on_periodic", "", i / 100)
+    assert profiler.GetStats()[0]["p95"] == 0.95
+
+
+def test_percentiles_only_use_recent_samples():
+    profiler = HandlerProfiler()
+    profiler.MAX_SAMPLES = 10
+    profiler.Record("card_1", "on_periodic", "", 5.0)
+    for i in range(10):
+        profiler.Record("card_1", "on_periodic", "", 0.1)
+    s = profiler.GetStats()[0]
+    assert s["count"] == 11
+    assert s["max"] == 5.0
+    assert s["p95"] == 0.1
+
+
+def test_clear():
+    profiler = HandlerProfiler()
+    profiler.Record("card_1", "on_setup", "", 0.1)
+    profiler.Clear()
+    assert profiler.GetStats() == []
+
+
+def test_export_json(tmp_path):
+    profiler = HandlerProfiler()
+    profiler.Record("card_1", "on_setup", "", 0.5)
+    filename = str(tmp_path / "profile.json")
+    profiler.ExportJSON(filename)
+    with open(filename) as f:
+        data = json.load(f)
+    assert data == profiler.GetStats()
@@ -0,0 +1,60 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+wx = pytest.importorskip("wx")
+
+import generator
+from hitRegionCache import HitRegionCache
+
+
+def test_region_bytes_grow_with_rects(wxApp):
+    one = wx.Region(0, 0, 10, 10)
+    two = wx.Region(0, 0, 10, 10)
+    two.Union(wx.Rect(50, 50, 10, 10))
+    assert HitRegionCache.RegionBytes(two) > HitRegionCache.RegionBytes(one)
+
+
+def test_entries_are_sized_by_region(wxApp):
+    cache = HitRegionCache()
+    region = wx.Region(0, 0, 10, 10)
+    cache.Put("a", (region, (1, 2)))
+    assert cache.Get("a") == (region, (1, 2))
+    assert cache.numBytes == HitRegionCache.RegionBytes(region)
+    cache.MAX_BYTES = cache.numBytes
+    cache.Put("b", (wx.Region(0, 0, 5, 5), (0, 0)))
+    assert cache.Get("a") is None
+    assert cache.Get("b") is not None
+
+
+def AddButton(stackManager, pos, size=(40, 30), rotation=0.0):
+    model = generator.StackGenerator.ModelFromType(stackManager, "button")
+    model.SetProperty("position", pos, notify=False)
+    model.SetProperty("size", size, notify=False)
+    model.SetProperty("rotation", rotation, notify=False)
+    return stackManager.AddUiViewInternal(model)
+
+
+def test_same_shapes_share_one_region(stackManager):
+    cache = HitRegionCache.shared()
+    cache.ClearCache()
+    a = AddButton(stackManager, (10, 10), rotation=30.0)
+    b = AddButton(stackManager, (200, 100), rotation=30.0)
+    c = AddButton(stackManager, (10, 10), rotation=45.0)
+    regionA = a.GetHitRegion()
+    regionB = b.GetHitRegion()
+    c.GetHitRegion()
+    assert a.hitRegionBase is b.hitRegionBase
+    assert a.hitRegionBase is not c.hitRegionBase
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Each object still gets its own region, placed at its own position
+    offset = wx.Region(regionA)
+    offset.Offset(190, 90)
+    assert offset.GetBox() == regionB.GetBox()
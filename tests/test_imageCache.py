@@ -0,0 +1,79 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from imageCache import ImageCache
+
+
+class FakeImage(object):
+    # Just enough of a wx.Image for ImageCache to measure it
+    def __init__(self, width, height, alpha=False):
+        self.width = width
+        self.height = height
+        self.alpha = alpha
+
+    def GetWidth(self):
+        return self.width
+
+    def GetHeight(self):
+        return self.height
+
+    def HasAlpha(self):
+        return self.alpha
+
+
+def MakeCache(maxImages):
+    cache = ImageCache()
+    cache.MAX_BYTES = maxImages * 100 * 3
+    return cache
+
+
+def test_image_bytes():
+    assert ImageCache.ImageBytes(FakeImage(10, 10)) == 300
+    assert ImageCache.ImageBytes(FakeImage(10, 10, alpha=True)) == 400
+
+
+def test_entries_are_sized_by_image_bytes():
+    cache = MakeCache(10)
+    cache.Put("a.png", FakeImage(10, 10))
+    cache.Put("b.png", FakeImage(10, 10, alpha=True))
+    assert cache.numBytes == 700
+    assert cache.GetStats()["bytes"] == 700
+
+
+def test_pinned_images_are_never_evicted():
+    cache = MakeCache(2)
+    cache.SetPinnedPaths(["a", "b"])
+    cache.Put("a", FakeImage(10, 10))
+    cache.Put("b", FakeImage(10, 10))
+    cache.Put("c", FakeImage(10, 10))
+    assert cache.Get("a") is not None
+    assert cache.Get("b") is not None
+    assert cache.Get("c") is None
+
+
+def test_image_pinned_before_put_cant_evict_itself():
+    cache = MakeCache(2)
+    cache.Put("a", FakeImage(10, 10))
+    cache.Put("b", FakeImage(10, 10))
+    cache.AddPinnedPath("big")
+    cache.Put("big", FakeImage(20, 20))
+    assert cache.Get("big") is not None
+    assert cache.Get("a") is None
+    assert cache.Get("b") is None
+
+
+def test_unpinning_evicts_down_to_budget():
+    cache = MakeCache(2)
+    cache.SetPinnedPaths(["a", "b", "c"])
+    for name in ["a", "b", "c"]:
+        cache.Put(name, FakeImage(10, 10))
+    assert cache.numBytes == 900
+    cache.SetPinnedPaths(["c"])
+    assert cache.numBytes <= cache.MAX_BYTES
+    assert cache.Get("c") is not None
+    assert cache.GetStats()["pinned"] == 1
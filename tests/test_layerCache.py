@@ -0,0 +1,111 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import random
+import pytest
+
+wx = pytest.importorskip("wx")
+
+import flippedGCDC
+from corpus import MakeTouchingCorpus
+
+
+def PaintToImage(stackManager, paint):
+    """ Runs paint(gc) into a white bitmap at the view's backing resolution, and returns the result as a wx.Image. """
+    size = stackManager.view.GetSize()
+    scale = stackManager.view.GetContentScaleFactor()
+    bitmap = wx.Bitmap.FromRGBA(int(size.width * scale), int(size.height * scale), 255, 255, 255, 255)
+    bitmap.SetScaleFactor(scale)
+    dc = wx.MemoryDC(bitmap)
+    gc = flippedGCDC.FlippedGCDC(dc, stackManager)
+    gc.cachedGC = gc.GetGraphicsContext()
+    paint(gc)
+    del gc.cachedGC
+    del gc
+    dc.SelectObject(wx.NullBitmap)
+    return bitmap.ConvertToImage()
+
+
+def CountDifferentPixels(imgA, imgB, tolerance=32):
+    a = imgA.GetData()
+    b = imgB.GetData()
+    assert len(a) == len(b)
+    count = 0
+    for i in range(0, len(a), 3):
+        if max(abs(a[i] - b[i]), abs(a[i+1] - b[i+1]), abs(a[i+2] - b[i+2])) > tolerance:
+            count += 1
+    return count
+
+
+def SettleLayers(stackManager):
+    layerCache = stackManager.layerCache
+    for i in range(layerCache.STATIC_PAINTS + 1):
+        PaintToImage(stackManager, layerCache.Paint)
+
+
+def test_layered_paint_matches_unlayered(stackManager):
+    MakeTouchingCorpus(stackManager, 40, random.Random(1))
+    stackManager.view.SetSize((300, 300))
+    layerCache = stackManager.layerCache
+
+    SettleLayers(stackManager)
+    assert layerCache.GetStats()["layers"] > 0
+
+    unlayered = PaintToImage(stackManager, stackManager.uiCard.DoPaint)
+    layered = PaintToImage(stackManager, layerCache.Paint)
+    assert layered.GetSize() == unlayered.GetSize()
+    # Allow for a few anti-aliased edge pixels that blend differently through a layer
+    numPixels = layered.GetWidth() * layered.GetHeight()
+    assert CountDifferentPixels(layered, unlayered) <= numPixels * 0.002
+
+
+def test_layers_use_backing_resolution(stackManager):
+    MakeTouchingCorpus(stackManager, 20, random.Random(2))
+    stackManager.view.SetSize((200, 150))
+    layerCache = stackManager.layerCache
+
+    SettleLayers(stackManager)
+    scale = stackManager.view.GetContentScaleFactor()
+    assert layerCache.scale == scale
+    for bitmap in layerCache.layers.values():
+        assert bitmap.GetWidth() == int(200 * scale)
+        assert bitmap.GetHeight() == int(150 * scale)
+        assert bitmap.GetScaleFactor() == scale
+
+
+def test_changed_object_leaves_its_layer(stackManager):
+    uis = MakeTouchingCorpus(stackManager, 20, random.Random(3))
+    stackManager.view.SetSize((300, 300))
+    layerCache = stackManager.layerCache
+
+    SettleLayers(stackManager)
+    ui = uis[len(uis) // 2]
+    assert any(ui in key for key in layerCache.layers)
+
+    ui.model.SetProperty("position", (10, 10), notify=False)
+    ui.RefreshBounds()
+    PaintToImage(stackManager, layerCache.Paint)
+    assert not any(ui in key for key in layerCache.layers)
+
+
+def test_notify_false_change_rebuilds_its_layer(stackManager):
+    uis = MakeTouchingCorpus(stackManager, 20, random.Random(4))
+    stackManager.view.SetSize((300, 300))
+    layerCache = stackManager.layerCache
+
+    SettleLayers(stackManager)
+    ui = uis[len(uis) // 2]
+    assert any(ui in key for key in layerCache.layers)
+
+    # No Notify() and no RefreshBounds(), so only the model's paintGen says it changed
+    ui.model.SetProperty("position", (200, 200), notify=False)
+    layered = PaintToImage(stackManager, layerCache.Paint)
+    assert not any(ui in key for key in layerCache.layers)
+    unlayered = PaintToImage(stackManager, stackManager.uiCard.DoPaint)
+    numPixels = layered.GetWidth() * layered.GetHeight()
+    assert CountDifferentPixels(layered, unlayered) <= numPixels * 0.002
@@ -0,0 +1,127 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+from lruCache import LruCache
+from textLayoutCache import TextLayoutCache
+from imageCache import ImageCache
+
+
+class SizedCache(LruCache):
+    # Values are their own size in bytes
+    def EntryBytes(self, value):
+        return value
+
+
+def MakeCache(maxEntries=None, maxBytes=None):
+    cache = SizedCache()
+    cache.MAX_ENTRIES = maxEntries
+    cache.MAX_BYTES = maxBytes
+    return cache
+
+
+def test_get_and_put():
+    cache = MakeCache()
+    assert cache.Get("a") is None
+    cache.Put("a", 10)
+    assert cache.Get("a") == 10
+    stats = cache.GetStats()
+    assert (stats["hits"], stats["misses"], stats["entries"], stats["bytes"]) == (1, 1, 1, 10)
+    assert stats["hitRate"] == 0.5
+
+
+def test_evicts_least_recently_used_past_max_entries():
+    cache = MakeCache(maxEntries=3)
+    for key in ["a", "b", "c"]:
+        cache.Put(key, 1)
+    cache.Get("a")
+    cache.Put("d", 1)
+    assert cache.Get("b") is None
+    assert [cache.Get(key) for key in ["a", "c", "d"]] == [1, 1, 1]
+    assert cache.GetStats()["evictions"] == 1
+    assert len(cache.entries) == 3
+
+
+def test_evicts_least_recently_used_past_max_bytes():
+    cache = MakeCache(maxBytes=30)
+    for key in ["a", "b", "c"]:
+        cache.Put(key, 10)
+    cache.Get("a")
+    cache.Put("d", 15)
+    assert cache.Get("b") is None
+    assert cache.Get("c") is None
+    assert cache.Get("a") == 10
+    assert cache.numBytes == 25
+    assert cache.GetStats()["evictions"] == 2
+
+
+def test_putting_an_existing_key_replaces_and_refreshes_it():
+    cache = MakeCache(maxEntries=2)
+    cache.Put("a", 1)
+    cache.Put("b", 1)
+    cache.Put("a", 5)
+    assert cache.numBytes == 6
+    cache.Put("c", 1)
+    assert cache.Get("a") == 5
+    assert cache.Get("b") is None
+
+
+def test_lookup_makes_missing_values_once():
+    cache = MakeCache()
+    made = []
+
+    def make():
+        made.append(1)
+        return 7
+    assert cache.Lookup("a", make) == 7
+    assert cache.Lookup("a", make) == 7
+    assert len(made) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_a_zero_limit_keeps_nothing():
+    cache = MakeCache(maxEntries=0)
+    assert cache.Lookup("a", lambda: 1) == 1
+    assert cache.Get("a") is None
+
+
+def test_entries_that_cant_be_evicted_keep_their_order():
+    cache = MakeCache(maxEntries=2)
+    cache.CanEvict = lambda key: key in ["c", "d"]
+    for key in ["a", "b", "c", "d"]:
+        cache.Put(key, 1)
+    assert list(cache.entries.keys()) == ["a", "b"]
+    cache.CanEvict = lambda key: True
+    cache.Put("e", 1)
+    assert list(cache.entries.keys()) == ["b", "e"]
+
+
+def test_remove_and_clear_cache():
+    cache = MakeCache()
+    cache.Put("a", 10)
+    cache.Put("b", 10)
+    cache.Remove("a")
+    cache.Remove("missing")
+    assert cache.numBytes == 10
+    cache.ClearCache()
+    assert cache.Get("b") is None
+    assert cache.numBytes == 0
+    assert cache.GetStats()["misses"] == 1
+
+
+def test_reset_stats():
+    cache = MakeCache()
+    cache.Get("a")
+    cache.ResetStats()
+    assert (cache.hits, cache.misses, cache.evictions) == (0, 0, 0)
+
+
+def test_each_subclass_is_shared_separately():
+    assert TextLayoutCache.shared() is TextLayoutCache.shared()
+    assert ImageCache.shared() is ImageCache.shared()
+    assert TextLayoutCache.shared() is not ImageCache.shared()
+    assert isinstance(ImageCache.shared(), ImageCache)
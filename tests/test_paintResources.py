@@ -0,0 +1,41 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+wx = pytest.importorskip("wx")
+
+from paintResources import PaintResources
+
+
+@pytest.fixture
+def resources(wxApp):
+    return PaintResources()
+
+
+def test_resources_are_shared(resources):
+    assert resources.Pen("red", 2) is resources.Pen("red", 2)
+    assert resources.Brush("blue") is resources.Brush("blue")
+    assert resources.Font(14) is resources.Font(14)
+    assert resources.Pen("red", 2) is not resources.Pen("red", 4)
+    assert resources.Pen("red", 2) is not resources.Pen("green", 2)
+
+
+def test_resources_match_new_ones(resources):
+    pen = resources.Pen("#FF0000", 3)
+    assert pen.GetColour() == wx.Colour("#FF0000")
+    assert pen.GetWidth() == 3
+    assert pen.GetJoin() == wx.JOIN_ROUND
+    assert resources.Brush("white").GetColour() == wx.Colour("white")
+    assert resources.Font(20).GetPixelSize().height == 20
+
+
+def test_bad_colours_use_the_default(resources):
+    assert resources.Colour("not a colour") == wx.Colour("black")
+    assert resources.Colour("not a colour", "white") == wx.Colour("white")
+    assert resources.Brush("not a colour").GetColour() == wx.Colour("white")
@@ -0,0 +1,74 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import pytest
+
+pytest.importorskip("wx")
+
+from runner import Runner
+from handlerCache import HandlerCache
+from uiButton import ButtonModel
+
+
+class StubRunner(Runner):
+    # Never run the queue, so there's no stack or viewer needed
+    def StartRunLoop(self):
+        pass
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    # Keep the shared HandlerCache out of the real user's cache folder
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path))
+    monkeypatch.setattr(HandlerCache, "sharedCache", None)
+    r = StubRunner(None, None)
+    r.runnerDepth = 1
+    return r
+
+
+def test_key_hold_binds_key_name_without_arg(runner):
+    bindings = runner.BindEventArgs(ButtonModel(None), "on_key_hold", None, "Space", None)
+    assert runner.clientVars["key_name"] == "Space"
+    assert "elapsed_time" not in runner.clientVars
+    runner.UnbindEventArgs(bindings)
+    assert "key_name" not in runner.clientVars
+
+
+def test_key_hold_binds_elapsed_time_with_arg(runner):
+    runner.keyTimings["Space"] = 0
+    bindings = runner.BindEventArgs(ButtonModel(None), "on_key_hold", None, "Space", "Space")
+    assert runner.clientVars["key_name"] == "Space"
+    assert runner.clientVars["elapsed_time"] > 0
+    runner.UnbindEventArgs(bindings)
+    assert "elapsed_time" not in runner.clientVars
+
+
+def test_unchecked_event_binds_nothing_extra(runner):
+    bindings = runner.BindEventArgs(ButtonModel(None), "on_key_press", None, None, None)
+    assert "key_name" not in runner.clientVars
+    assert "self" in runner.clientVars
+    runner.UnbindEventArgs(bindings)
+    assert "self" not in runner.clientVars
+
+
+def test_user_functions_are_profiled_per_call(runner):
+    model = ButtonModel(None)
+    oldVars = runner.clientVars.copy()
+    exec("def helper(n):\n    return n * 2\n\ndef outer():\n    return helper(1) + helper(2)\n", runner.clientVars)
+    runner.ScrapeNewFuncDefs(oldVars, runner.clientVars, model, "on_click")
+    assert runner.funcDefs["helper"] == (model, "on_click")
+
+    assert runner.clientVars["outer"]() == 6
+    assert runner.profiler.GetStats() == []
+
+    runner.EnableProfiling(True)
+    assert runner.clientVars["outer"]() == 6
+    counts = {s["function"]: s["count"] for s in runner.profiler.GetStats()}
+    assert counts == {"outer": 1, "helper": 2}
+    assert runner.clientVars["helper"].__name__ == "helper"
@@ -0,0 +1,87 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import sys
+import threading
+from time import sleep
+from sampleProfiler import SampleProfiler
+
+
+class FakeModel(object):
+    def __init__(self, path):
+        self.path = path
+
+    def GetPath(self):
+        return self.path
+
+
+class FakeRunner(object):
+    # Just the parts of a Runner that the SampleProfiler reads
+    def __init__(self):
+        self.runnerThread = None
+        self.compileCache = {}
+        self.funcDefs = {}
+
+
+HANDLER = """\
+def busy():
+    return grab()
+frame = busy()
+"""
+
+BUSY_HANDLER = """\
+n = 0
+while not state["stop"]:
+    n += 1
+"""
+
+
+def test_sample_attributes_handler_and_function_frames():
+    runner = FakeRunner()
+    code = compile(HANDLER, "<string>", "exec")
+    runner.compileCache["card_1.button_1.on_click"] = code
+    runner.funcDefs["busy"] = (FakeModel("card_1.button_2"), "on_setup")
+    env = {"grab": lambda: sys._getframe(1)}
+    exec(code, env)
+
+    sample = SampleProfiler(runner).SampleFromFrame(env["frame"])
+    # This test's own frames aren't handler code, so they're left out
+    assert sample == (("card_1.button_1.on_click", "", 3), ("card_1.button_2.on_setup", "busy", 2))
+
+
+def test_sampler_finds_a_busy_line():
+    runner = FakeRunner()
+    code = compile(BUSY_HANDLER, "<string>", "exec")
+    runner.compileCache["card_1.on_periodic"] = code
+    state = {"stop": False}
+    runner.runnerThread = threading.Thread(target=exec, args=(code, {"state": state}), daemon=True)
+    runner.runnerThread.start()
+
+    sampler = SampleProfiler(runner, rate=500)
+    sampler.Start()
+    for i in range(200):
+        if sampler.numSamples >= 20:
+            break
+        sleep(0.01)
+    sampler.Stop()
+    state["stop"] = True
+    runner.runnerThread.join()
+
+    assert sampler.numSamples >= 20
+    hot = sampler.GetHotLines(maxLines=3)
+    assert hot[0][0] == "card_1.on_periodic"
+    assert hot[0][1] in (2, 3)
+    assert sum(fraction for path, line, fraction in hot) > 0.9
+    flat = sampler.GetFlatProfile()
+    assert all(e["path"] == "card_1.on_periodic" for e in flat)
+    tree = sampler.GetCallTree()
+    assert sum(node["count"] for node in tree.values()) == sampler.numSamples
+
+
+def test_no_hot_lines_without_samples():
+    assert SampleProfiler(FakeRunner()).GetHotLines() == []
@@ -0,0 +1,81 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import random
+from spatialHash import SpatialHash
+
+
+def Overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def RandomBox(rng, area=1000, maxSize=150):
+    x, y = rng.uniform(-area/2, area), rng.uniform(-area/2, area)
+    return (x, y, x + rng.uniform(0, maxSize), y + rng.uniform(0, maxSize))
+
+
+def test_query_matches_brute_force():
+    rng = random.Random(1)
+    h = SpatialHash(cellSize=50)
+    boxes = {i: RandomBox(rng) for i in range(300)}
+    for item, box in boxes.items():
+        h.Insert(item, box)
+    assert len(h) == 300
+    for i in range(200):
+        query = RandomBox(rng)
+        assert h.Query(query) == {item for item, box in boxes.items() if Overlaps(box, query)}
+
+
+def test_query_point():
+    h = SpatialHash(cellSize=10)
+    h.Insert("a", (0, 0, 25, 25))
+    h.Insert("b", (20, 20, 30, 30))
+    assert h.QueryPoint((5, 5)) == {"a"}
+    assert h.QueryPoint((22, 22)) == {"a", "b"}
+    assert h.QueryPoint((28, 28)) == {"b"}
+    assert h.QueryPoint((100, 100)) == set()
+    assert h.QueryPoint((-5, -5)) == set()
+
+
+def test_query_item_skips_itself():
+    h = SpatialHash()
+    h.Insert("a", (0, 0, 10, 10))
+    h.Insert("b", (5, 5, 15, 15))
+    h.Insert("c", (100, 100, 110, 110))
+    assert h.QueryItem("a") == {"b"}
+    assert h.QueryItem("c") == set()
+    assert h.QueryItem("missing") == set()
+
+
+def test_update_and_remove():
+    h = SpatialHash(cellSize=10)
+    h.Insert("a", (0, 0, 5, 5))
+    h.Update("a", (1, 1, 6, 6))  # Same cells
+    assert h.GetBox("a") == (1, 1, 6, 6)
+    h.Update("a", (100, 100, 105, 105))  # New cells
+    assert h.Query((0, 0, 10, 10)) == set()
+    assert h.Query((100, 100, 101, 101)) == {"a"}
+    h.Remove("a")
+    assert "a" not in h
+    assert h.cells == {}
+    h.Remove("a")  # Removing a missing item is fine
+
+
+def test_update_inserts_new_items():
+    h = SpatialHash()
+    h.Update("a", (0, 0, 5, 5))
+    assert "a" in h
+    assert h.Query((0, 0, 1, 1)) == {"a"}
+
+
+def test_clear():
+    h = SpatialHash()
+    h.Insert("a", (0, 0, 5, 5))
+    h.Clear()
+    assert len(h) == 0
+    assert h.Query((0, 0, 5, 5)) == set()
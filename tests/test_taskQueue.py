@@ -0,0 +1,101 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import threading
+from taskQueue import TaskQueue
+
+
+def Drain(queue, count):
+    return [queue.get() for i in range(count)]
+
+
+def test_fifo_within_a_priority():
+    q = TaskQueue()
+    for i in range(5):
+        q.put(i)
+    assert Drain(q, 5) == [0, 1, 2, 3, 4]
+
+
+def test_more_urgent_priorities_go_first():
+    q = TaskQueue(3)
+    q.put("low-1", 2)
+    q.put("mid", 1)
+    q.put("high", 0)
+    q.put("low-2", 2)
+    assert Drain(q, 4) == ["high", "mid", "low-1", "low-2"]
+
+
+def test_coalescing_drops_the_older_task():
+    q = TaskQueue(2)
+    q.put("move-1", 0, coalesceKey="move", statsKey="move")
+    q.put("click", 0)
+    q.put("move-2", 0, coalesceKey="move", statsKey="move")
+    assert Drain(q, 2) == ["click", "move-2"]
+    assert q.GetStats()["dropped"] == {"move": 1}
+    # Once a task has been taken, its key can be queued again without replacing anything
+    q.put("move-3", 0, coalesceKey="move", statsKey="move")
+    assert Drain(q, 1) == ["move-3"]
+    assert q.GetStats()["dropped"] == {"move": 1}
+
+
+def test_merge_func_carries_data_forward():
+    q = TaskQueue()
+    q.put([1], coalesceKey="k", mergeFunc=lambda old, new: old + new, statsKey="k")
+    q.put([2], coalesceKey="k", mergeFunc=lambda old, new: old + new, statsKey="k")
+    q.put([3], coalesceKey="k", mergeFunc=lambda old, new: old + new, statsKey="k")
+    assert Drain(q, 1) == [[1, 2, 3]]
+    assert q.GetStats()["merged"] == {"k": 2}
+
+
+def test_barrier_waits_for_every_earlier_task():
+    q = TaskQueue(3)
+    q.put("timer-old", 2)
+    q.put("periodic-old", 2)
+    q.put("setup-card", 0, isBarrier=True)
+    q.put("mouse", 0)
+    q.put("periodic-new", 2)
+    q.put("key", 1)
+    assert Drain(q, 6) == ["timer-old", "periodic-old", "setup-card", "mouse", "key", "periodic-new"]
+
+
+def test_nothing_after_a_barrier_runs_before_it():
+    q = TaskQueue(3)
+    q.put("callback", 2, isBarrier=True)
+    q.put("mouse", 0)
+    assert Drain(q, 2) == ["callback", "mouse"]
+
+
+def test_coalesced_barrier_neighbours():
+    q = TaskQueue(2)
+    q.put("move-1", 0, coalesceKey="move")
+    q.put("barrier", 1, isBarrier=True)
+    # Replacing move-1 after the barrier moves the move to after the barrier
+    q.put("move-2", 0, coalesceKey="move")
+    assert Drain(q, 2) == ["barrier", "move-2"]
+
+
+def test_get_waits_for_a_put():
+    q = TaskQueue()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(q.get()))
+    thread.start()
+    q.put("wake")
+    thread.join(5)
+    assert results == ["wake"]
+
+
+def test_wait_stats():
+    q = TaskQueue(2)
+    q.put("a", 0)
+    q.put("b", 1)
+    q.put("c", 1)
+    Drain(q, 3)
+    wait = q.GetStats()["wait"]
+    assert [w["count"] for w in wait] == [1, 2]
+    q.ResetStats()
+    assert [w["count"] for w in q.GetStats()["wait"]] == [0, 0]
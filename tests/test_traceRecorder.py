@@ -0,0 +1,85 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import json
+import threading
+import pytest
+from traceRecorder import TraceRecorder
+
+
+@pytest.fixture
+def recorder():
+    recorder = TraceRecorder.Start()
+    yield recorder
+    TraceRecorder.Stop()
+
+
+def test_start_and_stop(recorder, tmp_path):
+    assert TraceRecorder.current is recorder
+    assert TraceRecorder.Start() is recorder
+    filename = str(tmp_path / "trace.json")
+    assert TraceRecorder.Stop(filename) is recorder
+    assert TraceRecorder.current is None
+    with open(filename) as f:
+        assert json.load(f) == recorder.GetTraceData()
+
+
+def test_trace_json_shape(recorder, tmp_path):
+    recorder.Complete("card_1.on_setup", "handler", 1.0, 1.5, args={"count": 1})
+    filename = str(tmp_path / "trace.json")
+    recorder.WriteJSON(filename)
+    with open(filename) as f:
+        data = json.load(f)
+    assert data["displayTimeUnit"] == "ms"
+    spans = [e for e in data["traceEvents"] if e["ph"] == "X"]
+    assert spans == [{"name": "card_1.on_setup", "cat": "handler", "ph": "X", "ts": 1e6, "dur": 0.5e6,
+                      "args": {"count": 1}, "pid": recorder.pid, "tid": threading.get_ident()}]
+    names = [e for e in data["traceEvents"] if e["ph"] == "M"]
+    assert names == [{"name": "thread_name", "ph": "M", "pid": recorder.pid, "tid": threading.get_ident(),
+                      "args": {"name": "Main"}}]
+
+
+def test_nested_spans(recorder):
+    # Spans are added when they end, so an inner span comes first, and nests inside the outer one by its times
+    outerStart = recorder.Now()
+    innerStart = recorder.Now()
+    recorder.Complete("inner", "callback", innerStart)
+    recorder.Complete("outer", "handler", outerStart)
+    inner, outer = [e for e in recorder.GetTraceData()["traceEvents"] if e["ph"] == "X"]
+    assert (inner["name"], outer["name"]) == ("inner", "outer")
+    assert inner["tid"] == outer["tid"]
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+
+
+def test_flows_and_threads(recorder):
+    flowId = recorder.NewFlowId()
+    assert recorder.NewFlowId() == flowId + 1
+    recorder.FlowStart("RunOnMainSync", "main", flowId, 2.0)
+
+    def runOnOtherThread():
+        recorder.FlowEnd("RunOnMainSync", "main", flowId, 2.5)
+    thread = threading.Thread(target=runOnOtherThread, name="Runner")
+    thread.start()
+    thread.join()
+
+    events = recorder.GetTraceData()["traceEvents"]
+    start = next(e for e in events if e["ph"] == "s")
+    end = next(e for e in events if e["ph"] == "f")
+    assert start["id"] == end["id"] == flowId
+    assert end["bp"] == "e"
+    assert start["tid"] != end["tid"]
+    names = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    assert names == {start["tid"]: "Main", end["tid"]: "Runner"}
+
+
+def test_max_events(recorder):
+    recorder.MAX_EVENTS = 3
+    for i in range(5):
+        recorder.Complete("tick", "tick", i, i + 0.5)
+    assert len(recorder.events) == 3
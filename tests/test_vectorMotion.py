@@ -0,0 +1,87 @@
+# This file is part of CardStock.
+#     https://github.com/benjie-git/CardStock
+#
+# Copyright Ben Levitt 2020-2023
+#
+# This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.  If a copy
+# of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+import threading
+import pytest
+import vectorMotion
+
+
+class FakeModel(object):
+    # Just the parts of a ViewModel that MoveBySpeed() uses
+    def __init__(self, position, speed, size=(10, 10), parent=None):
+        self.type = "button"
+        self.parent = parent
+        self.didSetDown = False
+        self.properties = {"position": position, "speed": speed, "size": size, "rotation": 0.0}
+        self.animations = {}
+        self.animLock = threading.Lock()
+
+    def SetProperty(self, key, value):
+        self.properties[key] = value
+
+
+class RacingLock(object):
+    # A lock that runs some event code right as MoveBySpeed() takes it, after it has read the model's properties
+    def __init__(self, action):
+        self.action = action
+
+    def __enter__(self):
+        self.action()
+
+    def __exit__(self, *args):
+        pass
+
+
+def MakeMovers(n, speed=(60, -30)):
+    card = FakeModel((0, 0), (0, 0))
+    card.type = "card"
+    return [FakeModel((i, 2 * i), speed, parent=card) for i in range(n)]
+
+
+def test_falls_back_without_numpy(monkeypatch):
+    monkeypatch.setattr(vectorMotion, "numpy", None)
+    models = MakeMovers(vectorMotion.MIN_MOVERS * 2)
+    assert vectorMotion.MoveBySpeed(models, 0.5) is None
+    assert models[1].properties["position"] == (1, 2)
+
+
+def test_falls_back_below_min_movers():
+    pytest.importorskip("numpy")
+    models = MakeMovers(vectorMotion.MIN_MOVERS - 1)
+    models.append(FakeModel((0, 0), (0, 0)))  # Not moving, so it doesn't count
+    assert vectorMotion.MoveBySpeed(models, 0.5) is None
+    assert models[0].properties["position"] == (0, 0)
+
+
+def test_moves_by_speed():
+    pytest.importorskip("numpy")
+    models = MakeMovers(vectorMotion.MIN_MOVERS)
+    still = FakeModel((5, 5), (0, 0))
+    animating = FakeModel((5, 5), (10, 10))
+    animating.animations["position"] = {}
+    didRun, frames = vectorMotion.MoveBySpeed(models + [still, animating], 0.5)
+    assert didRun
+    assert models[3].properties["position"] == [33.0, -9.0]
+    assert frames[models[3]] == (33, -9, 10, 10)
+    assert still.properties["position"] == (5, 5)
+    assert animating.properties["position"] == (5, 5)
+    assert still not in frames and animating not in frames
+
+
+def test_skips_models_changed_while_moving():
+    pytest.importorskip("numpy")
+    models = MakeMovers(vectorMotion.MIN_MOVERS)
+    moved, sped = models[0], models[1]
+    moved.animLock = RacingLock(lambda: moved.SetProperty("position", (100, 100)))
+    sped.animLock = RacingLock(lambda: sped.SetProperty("speed", (0, 0)))
+    didRun, frames = vectorMotion.MoveBySpeed(models, 0.5)
+    assert didRun
+    assert moved.properties["position"] == (100, 100)
+    assert sped.properties["position"] == (1, 2)
+    assert moved not in frames and sped not in frames
+    assert models[2].properties["position"] == [32.0, -11.0]